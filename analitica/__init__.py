@@ -0,0 +1,33 @@
+"""
+Motor de cálculo del portafolio: funciones puras sobre DataFrames / arrays.
+No depende de Streamlit ni de la base — los datos entran como argumentos —
+así que se puede testear y medir por separado. La caché vive en cartera.py.
+"""
+from analitica.fx import DOLAR_ESTIMADO, fx_en_fechas, ars_a_usd, moneda_ticker, usd_a_moneda, exposicion_moneda
+from analitica.series import matriz_tenencias, precios_en_usd, valorar, indice_mezcla, rendimiento_desde
+from analitica.lotes import METODOS, imputar_lotes, resumen_lotes
+from analitica.rendimientos import flujos_operaciones, flujos_diarios, retornos_twr, indice_twr, xirr, tir_cartera, serie_rendimiento
+from analitica.riesgo import (
+    RUEDAS_ANIO, curva_drawdown, max_drawdown, beta_correlacion, contribucion_riesgo, metricas_riesgo,
+    VENTANAS, matrices_por_ventana,
+)
+from analitica.proyeccion import RUEDAS_MES, PERCENTILES, METODOS_SIM, retornos_cartera, simular_trayectorias
+from analitica.rebalanceo import COLUMNAS_REBALANCEO, calcular_rebalanceo
+from analitica.dividendos import (
+    FRECUENCIAS, frecuencia_anual, resumen_dividendos, proyectar_calendario, dividendos_cobrados,
+)
+from analitica.ajustes import resolver_cambios, factores_split, ajustar_operaciones
+from analitica.posiciones import (
+    COLUMNAS_POSICION, agrupar_operaciones, calcular_posiciones, valuar_posiciones, cantidades_abiertas,
+)
+from analitica.asof import indice_asof, estado_asof, precios_en_fecha, posiciones_asof
+from analitica.atribucion import POR_POSICION, valores_y_flujos, atribuir, agrupar_atribucion
+from analitica.comparacion import posiciones_por_portafolio, evolucion_por_portafolio, resumen_portafolios
+from analitica.cedears import MAX_DIAS_LOCAL, fx_implicito, precio_sintetico, completar_cedears, cedears_incompletos, cotizaciones_cedears
+from analitica.calendario import MESES, DIAS_SEMANA, retornos_compuestos, tabla_mensual, grilla_calendario
+from analitica.recurrencias import FRECUENCIAS_RECURRENTES, fechas_recurrencia, ocurrencias
+from analitica.categorizacion import (
+    COLUMNAS_REGLA, normalizar_texto, clave_descripcion, leer_extracto, aprender_reglas, categorizar, marcar_duplicados,
+)
+from analitica.presupuestos import acumulado_mes, ritmo_presupuestos
+from analitica.busqueda import terminos_busqueda, patron_like, fragmento, resaltar
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+# ─────────────────────────────────────────────
+#  AJUSTES CORPORATIVOS — splits y cambios de ticker
+# ─────────────────────────────────────────────
+# Los precios del store vienen ajustados (auto_adjust), así que todo se lleva
+# a las unidades de hoy: una operación anterior a un split de 4:1 cuenta 4×
+# acciones a ¼ del precio. Se aplica al calcular; la tabla operaciones no se
+# toca. Los cambios de ticker se resuelven primero (el historial de Yahoo
+# del ticker nuevo incluye el tramo anterior).
+
+def resolver_cambios(tickers, cambios):
+    """
+    Ticker vigente para cada uno de `tickers` siguiendo cadenas A→B→C.
+    cambios — DataFrame con ticker, nuevo_ticker (y fecha, para el orden).
+    """
+    if cambios is None or cambios.empty:
+        return pd.Series(list(tickers), index=list(tickers))
+    mapa = dict(zip(cambios.sort_values('fecha')['ticker'], cambios.sort_values('fecha')['nuevo_ticker']))
+    def final(t):
+        vistos = set()
+        while t in mapa and t not in vistos:
+            vistos.add(t); t = mapa[t]
+        return t
+    return pd.Series([final(t) for t in tickers], index=list(tickers))
+
+def factores_split(df_ops, splits):
+    """
+    Factor acumulado por operación: producto de los splits del ticker con
+    fecha ex posterior a la operación (1 si no hay). Un merge_asof hacia
+    adelante sobre los productos acumulados desde el final.
+    """
+    if df_ops.empty or splits is None or splits.empty:
+        return pd.Series(1.0, index=df_ops.index)
+    sp = splits[['ticker', 'fecha', 'factor']].copy()
+    sp['fecha'] = pd.to_datetime(sp['fecha'])
+    sp = sp[sp['factor'] > 0].sort_values(['ticker', 'fecha'], ascending=[True, False])
+    # producto de este split y todos los posteriores del mismo ticker
+    sp['acumulado'] = sp.groupby('ticker')['factor'].cumprod()
+    sp = sp.sort_values('fecha')
+
+    ops = pd.DataFrame({
+        'ticker': df_ops['ticker'].to_numpy(),
+        'fecha':  pd.to_datetime(df_ops['fecha']).to_numpy(),
+        'orden':  np.arange(len(df_ops)),
+    }).sort_values('fecha')
+    unido = pd.merge_asof(
+        ops, sp[['ticker', 'fecha', 'acumulado']], on='fecha', by='ticker',
+        direction='forward', allow_exact_matches=False,
+    ).sort_values('orden')
+    return pd.Series(unido['acumulado'].fillna(1.0).to_numpy(), index=df_ops.index)
+
+def ajustar_operaciones(df_ops, acciones):
+    """
+    Operaciones en unidades de hoy: ticker vigente, cantidad × factor y
+    precio ÷ factor (el monto no cambia). `acciones` es el store de acciones
+    corporativas (ticker, fecha, tipo, factor, nuevo_ticker). Agrega
+    `factor_split` y `ticker_original`.
+    """
+    df = df_ops.copy()
+    if df.empty or acciones is None or acciones.empty:
+        df['factor_split'] = 1.0
+        df['ticker_original'] = df['ticker'] if 'ticker' in df else []
+        return df
+    cambios = acciones[acciones['tipo'] == 'cambio_ticker']
+    splits  = acciones[acciones['tipo'] == 'split'].copy()
+
+    df['ticker_original'] = df['ticker']
+    df['ticker'] = df['ticker'].map(resolver_cambios(df['ticker'].unique(), cambios))
+    if not splits.empty:
+        # splits anotados con el ticker viejo también se aplican al nuevo
+        splits['ticker'] = splits['ticker'].map(resolver_cambios(splits['ticker'].unique(), cambios))
+    factor = factores_split(df, splits).to_numpy()
+    df['factor_split'] = factor
+    df['cantidad'] = df['cantidad'] * factor
+    df['precio']   = df['precio'] / factor
+    return df
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+from analitica.lotes import imputar_lotes
+from analitica.posiciones import valuar_posiciones
+
+# ─────────────────────────────────────────────
+#  AS-OF — la cartera en cualquier fecha pasada
+# ─────────────────────────────────────────────
+# La imputación de ventas es causal (cada venta solo mira compras previas),
+# así que la cartera a una fecha es la suma de los efectos de las operaciones
+# hasta ese día. Se guarda, por (ticker, moneda) y en orden de fecha, la suma
+# acumulada de cantidad, coste abierto y ganancia realizada. Las claves
+# (código del ticker, día) quedan ordenadas en un solo array, así que la
+# consulta de todos los tickers a una fecha es un único searchsorted.
+
+_DIAS = 1_000_000           # separa códigos de ticker en la clave compuesta
+
+def indice_asof(df_ops, metodo='fifo'):
+    """
+    Índice para consultas as-of (dict de arrays, serializable para la caché):
+      claves                — código·_DIAS + día, ordenadas
+      cantidad/coste/ganancia — acumulados por (ticker, moneda) tras cada fecha
+      grupos                — DataFrame ticker, moneda (posición = código)
+    """
+    vacio = {'claves': np.array([], dtype=np.int64), 'cantidad': np.array([]), 'coste': np.array([]),
+             'ganancia': np.array([]), 'grupos': pd.DataFrame(columns=['ticker', 'moneda'])}
+    if df_ops.empty: return vacio
+
+    df = df_ops.copy()
+    df['moneda'] = df['moneda'].fillna('USD')
+    df['fecha']  = pd.to_datetime(df['fecha'])
+    if 'id' not in df.columns:
+        df['id'] = np.arange(len(df))
+    _, ventas = imputar_lotes(df, metodo)
+
+    compras = df[df['tipo'] == 'Compra']
+    efectos = pd.concat([
+        pd.DataFrame({
+            'ticker': compras['ticker'], 'moneda': compras['moneda'], 'fecha': compras['fecha'],
+            'cantidad': compras['cantidad'], 'coste': compras['cantidad'] * compras['precio'], 'ganancia': 0.0,
+        }),
+        pd.DataFrame({
+            'ticker': ventas['ticker'], 'moneda': ventas['moneda'], 'fecha': ventas['fecha'],
+            'cantidad': -ventas['cantidad'], 'coste': -ventas['coste'], 'ganancia': ventas['ganancia'],
+        }),
+    ], ignore_index=True)
+    efectos['dia'] = efectos['fecha'].dt.normalize().values.astype('datetime64[D]').astype(np.int64)
+
+    # una fila por (ticker, moneda, día) con los acumulados al cierre de ese día
+    diario = efectos.groupby(['ticker', 'moneda', 'dia'], sort=True)[['cantidad', 'coste', 'ganancia']].sum()
+    acum   = diario.groupby(level=['ticker', 'moneda']).cumsum().reset_index()
+    grupos = acum[['ticker', 'moneda']].drop_duplicates().reset_index(drop=True)
+    codigo = pd.MultiIndex.from_frame(grupos).get_indexer(pd.MultiIndex.from_frame(acum[['ticker', 'moneda']]))
+    return {
+        'claves':   codigo.astype(np.int64) * _DIAS + acum['dia'].to_numpy(dtype=np.int64),
+        'cantidad': acum['cantidad'].to_numpy(dtype=float),
+        'coste':    acum['coste'].to_numpy(dtype=float),
+        'ganancia': acum['ganancia'].to_numpy(dtype=float),
+        'grupos':   grupos,
+    }
+
+def estado_asof(indice, fecha):
+    """ticker, moneda, cantidad, coste_abierto, ganancia_realizada al cierre de `fecha`."""
+    grupos = indice['grupos']
+    if grupos.empty:
+        return pd.DataFrame(columns=['ticker', 'moneda', 'cantidad', 'coste_abierto', 'ganancia_realizada'])
+    dia    = np.datetime64(pd.Timestamp(fecha).normalize(), 'D').astype(np.int64)
+    codigo = np.arange(len(grupos), dtype=np.int64)
+    pos    = np.searchsorted(indice['claves'], codigo * _DIAS + dia, side='right') - 1
+    valido = (pos >= 0) & (indice['claves'][np.clip(pos, 0, None)] // _DIAS == codigo)
+    p = np.clip(pos, 0, None)
+    return grupos.assign(
+        cantidad           = np.where(valido, indice['cantidad'][p], 0.0),
+        coste_abierto      = np.where(valido, indice['coste'][p], 0.0),
+        ganancia_realizada = np.where(valido, indice['ganancia'][p], 0.0),
+    )
+
+def precios_en_fecha(precios, fecha):
+    """Último cierre ≤ `fecha` de cada columna de la matriz de precios ({ticker: precio})."""
+    if precios is None or precios.empty: return {}
+    hasta = precios.loc[:pd.Timestamp(fecha)].ffill()
+    if hasta.empty: return {}
+    ultimo = hasta.iloc[-1]
+    return {t: float(v) for t, v in ultimo.items() if pd.notna(v)}
+
+def posiciones_asof(indice, fecha, precios, precio_dolar):
+    """
+    Como calcular_posiciones pero a `fecha`: mismas columnas, valuadas a
+    `precios` ({ticker: precio} de ese día) y al dólar de ese día.
+    """
+    est = estado_asof(indice, fecha).rename(columns={'cantidad': 'cantidad_total'})
+    return valuar_posiciones(est, precios, precio_dolar)
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+from analitica.series import precios_en_usd
+from analitica.rendimientos import flujos_operaciones
+
+# ─────────────────────────────────────────────
+#  ATRIBUCIÓN — qué explicó el rendimiento de un período
+# ─────────────────────────────────────────────
+# Misma convención que el TWR (flujos al cierre): el resultado del día de cada
+# posición es V_t − V_{t−1} − F_t, y su contribución es ese resultado sobre
+# la base de la cartera del día. La suma de contribuciones es el retorno del
+# día; para que sumen el TWR compuesto del período, cada día se escala por el
+# crecimiento acumulado hasta el día anterior (Σ R_t·Π_{s<t}(1+R_s) = Π(1+R_t)−1).
+# Las matrices se arman una vez con toda la historia; elegir otro período es
+# recortar filas.
+
+POR_POSICION = ('portfolio_id', 'ticker')
+
+def valores_y_flujos(df_ops, precios, serie_dolar, por=POR_POSICION):
+    """
+    Valor en USD y flujo neto por rueda de cada posición (columnas MultiIndex
+    `por`, con 'ticker' entre ellas). Dos matrices fechas × posiciones con
+    las mismas columnas; flujos con la convención de flujos_diarios.
+    """
+    por = list(por)
+    df  = df_ops.copy()
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    if 'portfolio_id' in por:
+        df['portfolio_id'] = df['portfolio_id'].fillna(0).astype(int)
+    indice = precios.index
+
+    neta = df['cantidad'].where(df['tipo'] == 'Compra', -df['cantidad'])
+    diaria = neta.groupby([df['fecha']] + [df[c] for c in por]).sum().unstack(por, fill_value=0)
+    tenencias = diaria.sort_index().cumsum().reindex(indice, method='ffill').fillna(0)
+    columnas  = tenencias.columns
+
+    en_usd = precios_en_usd(precios.ffill(), serie_dolar)
+    p = en_usd.reindex(columns=columnas.get_level_values('ticker')).fillna(0).to_numpy()
+    valores = pd.DataFrame(tenencias.to_numpy() * p, index=indice, columns=columnas)
+
+    # cada operación suma en (rueda siguiente o igual, su posición)
+    flujo = np.zeros(valores.shape)
+    fila  = np.searchsorted(indice.values, df['fecha'].values.astype(indice.values.dtype), side='left')
+    col   = columnas.get_indexer(pd.MultiIndex.from_frame(df[por]))
+    ok    = (fila < len(indice)) & (col >= 0)
+    np.add.at(flujo, (fila[ok], col[ok]), flujos_operaciones(df, serie_dolar).to_numpy()[ok])
+    return valores, pd.DataFrame(flujo, index=indice, columns=columnas)
+
+def atribuir(valores, flujos, desde=None, hasta=None):
+    """
+    Atribución del período [desde, hasta] sobre las matrices de
+    valores_y_flujos. Devuelve (detalle, twr):
+      detalle — una fila por posición: valor_inicial, valor_final, flujos,
+                resultado_usd, peso_medio, retorno (TWR propio) y contribucion
+                (aporte al TWR de la cartera; suman `twr`)
+      twr     — retorno ponderado por tiempo de la cartera en el período
+    """
+    v = valores.to_numpy(dtype=float)
+    f = flujos.to_numpy(dtype=float)
+    prev = np.vstack([np.zeros((1, v.shape[1])), v[:-1]])
+    resultado = v - prev - f
+
+    prev_total = prev.sum(axis=1)
+    base = np.where(prev_total > 1e-9, prev_total, np.maximum(f.sum(axis=1), 0))
+    base_pos = np.where(prev > 1e-9, prev, np.maximum(f, 0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        c     = np.where(base[:, None] > 1e-9, resultado / base[:, None], 0.0)
+        r_pos = np.where(base_pos > 1e-9, resultado / base_pos, 0.0)
+        peso  = np.where(prev_total[:, None] > 1e-9, prev / prev_total[:, None], np.nan)
+
+    fechas = valores.index
+    filas  = np.ones(len(fechas), dtype=bool)
+    if desde is not None: filas &= fechas >= pd.Timestamp(desde)
+    if hasta is not None: filas &= fechas <= pd.Timestamp(hasta)
+    if not filas.any():
+        return pd.DataFrame(columns=list(valores.columns.names) + [
+            'valor_inicial', 'valor_final', 'flujos', 'resultado_usd', 'peso_medio', 'retorno', 'contribucion'
+        ]), 0.0
+    c, r_pos = c[filas], r_pos[filas]
+
+    r_total = c.sum(axis=1)
+    crecimiento = np.concatenate(([1.0], np.cumprod(1 + r_total)[:-1]))     # Π_{s<t}(1+R_s)
+    with np.errstate(invalid='ignore'):
+        peso_medio = np.nanmean(peso[filas], axis=0) if (prev_total[filas] > 1e-9).any() else np.zeros(v.shape[1])
+    detalle = pd.DataFrame({
+        'valor_inicial': prev[filas][0],
+        'valor_final':   v[filas][-1],
+        'flujos':        f[filas].sum(axis=0),
+        'resultado_usd': resultado[filas].sum(axis=0),
+        'peso_medio':    np.nan_to_num(peso_medio),
+        'retorno':       np.prod(1 + r_pos, axis=0) - 1,
+        'contribucion':  (c * crecimiento[:, None]).sum(axis=0),
+    }, index=valores.columns)
+    # fuera las posiciones que no existieron en el período
+    activo = (np.abs(v[filas]).sum(axis=0) > 1e-9) | (np.abs(f[filas]).sum(axis=0) > 1e-9) \
+             | (detalle['valor_inicial'].to_numpy() > 1e-9)
+    detalle = detalle[activo].reset_index()
+    return detalle, float(np.prod(1 + r_total) - 1)
+
+def agrupar_atribucion(detalle, por):
+    """Suma de la atribución por `por` (p. ej. 'moneda' o 'portfolio_id'); el retorno propio se omite."""
+    cols = ['valor_inicial', 'valor_final', 'flujos', 'resultado_usd', 'peso_medio', 'contribucion']
+    if detalle.empty:
+        return pd.DataFrame(columns=[por] + cols)
+    return detalle.groupby(por, as_index=False)[cols].sum().sort_values('contribucion', ascending=False,
+                                                                          ignore_index=True)
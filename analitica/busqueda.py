@@ -0,0 +1,47 @@
+import html
+import re
+
+# ─────────────────────────────────────────────
+#  BÚSQUEDA — términos y resaltado
+# ─────────────────────────────────────────────
+# La búsqueda en sí corre en la base (índices trigram); acá solo se arman
+# los patrones LIKE de cada término y se marcan las coincidencias en el
+# texto que vuelve, escapado para mostrarlo como HTML.
+
+def terminos_busqueda(consulta):
+    """Palabras de la consulta (sin repetir, en orden); las comillas agrupan frases."""
+    partes = re.findall(r'"([^"]+)"|(\S+)', consulta or '')
+    vistos, terminos = set(), []
+    for frase, palabra in partes:
+        t = (frase or palabra).strip()
+        if t and t.lower() not in vistos:
+            vistos.add(t.lower()); terminos.append(t)
+    return terminos
+
+def patron_like(termino):
+    """'%termino%' con los comodines de LIKE escapados."""
+    return '%' + re.sub(r'([\\%_])', r'\\\1', termino) + '%'
+
+def fragmento(texto, terminos, ancho=160):
+    """Recorte de `texto` alrededor de la primera coincidencia (textos largos como las tesis)."""
+    texto = texto if isinstance(texto, str) else ''
+    if len(texto) <= ancho:
+        return texto
+    m = re.search('|'.join(map(re.escape, terminos)), texto, re.IGNORECASE) if terminos else None
+    inicio = max(0, (m.start() if m else 0) - ancho // 3)
+    fin = min(len(texto), inicio + ancho)
+    return ('…' if inicio > 0 else '') + texto[inicio:fin] + ('…' if fin < len(texto) else '')
+
+def resaltar(texto, terminos, estilo='background:rgba(245,158,11,0.25);color:#fbbf24;border-radius:3px;padding:0 2px'):
+    """HTML de `texto` (escapado) con cada término envuelto en <mark>."""
+    texto = texto if isinstance(texto, str) else ''
+    if not terminos:
+        return html.escape(texto)
+    patron = re.compile('|'.join(re.escape(t) for t in sorted(terminos, key=len, reverse=True)), re.IGNORECASE)
+    partes, ultimo = [], 0
+    for m in patron.finditer(texto):
+        partes.append(html.escape(texto[ultimo:m.start()]))
+        partes.append(f'<mark style="{estilo}">{html.escape(m.group())}</mark>')
+        ultimo = m.end()
+    partes.append(html.escape(texto[ultimo:]))
+    return ''.join(partes)
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+# ─────────────────────────────────────────────
+#  CALENDARIO — retornos diarios y tabla mensual
+# ─────────────────────────────────────────────
+# Sale de los retornos TWR diarios (serie_rendimiento['retorno']); los
+# períodos se componen con resample, así que diez años son unas pocas
+# operaciones vectorizadas.
+
+MESES = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+DIAS_SEMANA = ['Lun', 'Mar', 'Mié', 'Jue', 'Vie', 'Sáb', 'Dom']
+
+def retornos_compuestos(retornos, frecuencia):
+    """Retorno compuesto por período ('ME', 'YE', 'W'…): Π(1+r) − 1; NaN donde no hubo ruedas."""
+    r = retornos.dropna()
+    agrupado = (1 + r).resample(frecuencia)
+    return (agrupado.prod() - 1).where(agrupado.count() > 0)
+
+def tabla_mensual(retornos):
+    """Grilla año × mes de retornos compuestos, con la columna 'Año' (el anual)."""
+    if retornos.dropna().empty:
+        return pd.DataFrame(columns=MESES + ['Año'])
+    mensual = retornos_compuestos(retornos, 'ME')
+    tabla = pd.DataFrame({
+        'anio': mensual.index.year, 'mes': mensual.index.month, 'r': mensual.to_numpy(),
+    }).pivot(index='anio', columns='mes', values='r').reindex(columns=range(1, 13))
+    tabla.columns = MESES
+    anual = retornos_compuestos(retornos, 'YE')
+    tabla['Año'] = pd.Series(anual.to_numpy(), index=anual.index.year).reindex(tabla.index)
+    return tabla.rename_axis(None).sort_index(ascending=False)
+
+def grilla_calendario(retornos, anio):
+    """
+    Grilla estilo calendario de un año: (días de la semana × semanas) con el
+    retorno de cada rueda (NaN sin rueda), más las fechas para el hover. La
+    columna 0 es la semana (de lunes) del 1 de enero, así que son 53 columnas,
+    o 54 en un bisiesto que empieza en domingo.
+    Devuelve (valores 7×N, fechas 7×N como texto).
+    """
+    dias = pd.date_range(f'{anio}-01-01', f'{anio}-12-31', freq='D')
+    r = retornos.reindex(dias)
+    # semana contada desde el lunes de la semana del 1 de enero
+    semana = ((dias - (dias[0] - pd.Timedelta(days=dias[0].weekday()))).days // 7).to_numpy()
+    dia    = dias.weekday.to_numpy()
+    valores = np.full((7, semana.max() + 1), np.nan)
+    fechas  = np.full((7, semana.max() + 1), '', dtype=object)
+    valores[dia, semana] = r.to_numpy()
+    fechas[dia, semana]  = dias.strftime('%d %b %Y').to_numpy()
+    return valores, fechas
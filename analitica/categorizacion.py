@@ -0,0 +1,199 @@
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+
+# ─────────────────────────────────────────────
+#  CATEGORIZACIÓN — extractos bancarios y reglas
+# ─────────────────────────────────────────────
+# Las reglas del usuario combinan un patrón (texto o regex; vacío = solo
+# monto) sobre la descripción normalizada, un tipo y un rango de montos
+# opcionales. Van en una alternancia nombrada por orden de prioridad, una por
+# cada condición (tipo, rango) distinta: un finditer por línea da la regla
+# de mayor prioridad que aparece. Las aprendidas del historial son claves
+# exactas de descripción y se cruzan con un merge.
+
+COLUMNAS_REGLA = ['patron', 'es_regex', 'tipo', 'categoria', 'monto_min', 'monto_max', 'prioridad']
+
+_GRUPO_NOMBRADO = re.compile(r'\(\?P<[^>]*>')
+_REFERENCIA     = re.compile(r'\(\?P=|\\[1-9]')
+_FLAGS_INICIO   = re.compile(r'^\(\?([aiLmsux]+)\)')
+
+ALIAS_EXTRACTO = {
+    'fecha':       ['fecha', 'fecha operacion', 'fecha de operacion', 'fecha movimiento', 'fecha origen', 'date'],
+    'descripcion': ['descripcion', 'concepto', 'detalle', 'movimiento', 'referencia', 'description'],
+    'monto':       ['monto', 'importe', 'importe en pesos', 'importe pesos', 'amount', 'valor'],
+    'debito':      ['debito', 'debitos', 'debe', 'egreso', 'egresos'],
+    'credito':     ['credito', 'creditos', 'haber', 'ingreso', 'ingresos'],
+}
+
+def normalizar_texto(serie):
+    """Minúsculas, sin acentos ni espacios repetidos (para comparar descripciones)."""
+    s = pd.Series(serie, dtype=object).fillna('').astype(str)
+    s = s.map(lambda t: unicodedata.normalize('NFKD', t).encode('ascii', 'ignore').decode())
+    return s.str.lower().str.replace(r'\s+', ' ', regex=True).str.strip()
+
+def clave_descripcion(serie):
+    """Descripción sin números ni símbolos: agrupa 'UBER *TRIP 8841' y 'UBER *TRIP 1203'."""
+    s = normalizar_texto(serie).str.replace(r'[^a-z ]+', ' ', regex=True)
+    return s.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+def a_numero(serie):
+    """Importes como texto ('1.234,56', '-1,234.56', '$ 500') a float; el separador decimal es el último."""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(float)
+    s = serie.astype(str).str.replace(r'[^\d,.\-]', '', regex=True)
+    coma_decimal = s.str.rfind(',') > s.str.rfind('.')
+    s = s.where(~coma_decimal, s.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    s = s.where(coma_decimal, s.str.replace(',', '', regex=False))
+    return pd.to_numeric(s, errors='coerce')
+
+def leer_extracto(archivo, gastos_positivos=False):
+    """
+    CSV de banco o tarjeta → fecha, descripcion, monto (positivo), tipo.
+    Reconoce las columnas por nombre (ALIAS_EXTRACTO): un importe con signo
+    o un par débito/crédito. `gastos_positivos`: el resumen trae los
+    consumos en positivo (tarjetas). Lanza ValueError si no reconoce el formato.
+    """
+    crudo = pd.read_csv(archivo, sep=None, engine='python', dtype=str)
+    nombres = dict(zip(normalizar_texto(crudo.columns), crudo.columns))
+    col = {k: next((nombres[a] for a in alias if a in nombres), None) for k, alias in ALIAS_EXTRACTO.items()}
+    if col['fecha'] is None or col['descripcion'] is None:
+        raise ValueError("No se encontraron las columnas de fecha y descripción.")
+
+    if col['monto'] is not None:
+        importe = a_numero(crudo[col['monto']])
+        if gastos_positivos: importe = -importe
+    elif col['debito'] is not None or col['credito'] is not None:
+        deb = a_numero(crudo[col['debito']]).fillna(0) if col['debito'] else 0.0
+        cre = a_numero(crudo[col['credito']]).fillna(0) if col['credito'] else 0.0
+        importe = cre - deb.abs()
+    else:
+        raise ValueError("No se encontró la columna de importe (o débito/crédito).")
+
+    fechas = crudo[col['fecha']].str.strip()
+    iso = fechas.str.match(r'\d{4}-\d{2}-\d{2}', na=False)
+    df = pd.DataFrame({
+        'fecha':       pd.to_datetime(fechas.where(iso), format='ISO8601', errors='coerce')
+                       .fillna(pd.to_datetime(fechas.where(~iso), dayfirst=True, errors='coerce')),
+        'descripcion': crudo[col['descripcion']].fillna('').str.strip(),
+        'importe':     importe,
+    }).dropna(subset=['fecha', 'importe'])
+    df = df[df['importe'] != 0]
+    return pd.DataFrame({
+        'fecha':       df['fecha'].dt.normalize(),
+        'descripcion': df['descripcion'],
+        'monto':       df['importe'].abs(),
+        'tipo':        np.where(df['importe'] > 0, 'Ingreso', 'Gasto'),
+    }).reset_index(drop=True)
+
+def aprender_reglas(historial, minimo=2):
+    """
+    Categorías aprendidas de movimientos ya cargados (descripcion, tipo,
+    categoria y opcionalmente 'veces'): por cada (clave de descripción,
+    tipo), la categoría más usada si apareció al menos `minimo` veces.
+    Devuelve clave, tipo, categoria, veces.
+    """
+    cols = ['clave', 'tipo', 'categoria', 'veces']
+    if historial.empty:
+        return pd.DataFrame(columns=cols)
+    h = historial.assign(clave=clave_descripcion(historial['descripcion']))
+    h['veces'] = h['veces'] if 'veces' in h.columns else 1
+    h = h[h['clave'].str.len() >= 3]
+    conteo = h.groupby(['clave', 'tipo', 'categoria'], as_index=False)['veces'].sum()
+    conteo = conteo.sort_values('veces', ascending=False).drop_duplicates(['clave', 'tipo'])
+    return conteo[conteo['veces'] >= minimo][cols].reset_index(drop=True)
+
+def _patron_usuario(patron, es_regex):
+    """Patrón listo para combinar ('' = solo monto); None si la regex no sirve."""
+    if not es_regex:
+        return re.escape(normalizar_texto([patron]).iloc[0])
+    p = _GRUPO_NOMBRADO.sub('(?:', patron)      # los nombres los pone la alternancia
+    if _REFERENCIA.search(p):
+        return None                             # las referencias cambian de número al combinar
+    # '(?i)...' solo vale al principio de la regex entera: pasa a ser un grupo con flags
+    m = _FLAGS_INICIO.match(p)
+    if m:
+        p = f'(?{m.group(1)}:{p[m.end():]})'
+    try:
+        re.compile(f'(?=(?:(?P<r0>{p})))', re.IGNORECASE)   # tal como queda en la alternancia
+    except re.error:
+        return None
+    return p
+
+def compilar_reglas(reglas):
+    """
+    Reglas ordenadas por prioridad (índice = rango) y, por cada condición
+    (tipo, monto_min, monto_max), (máscara de la condición en las reglas,
+    regex combinada o None, rango de la mejor regla sin patrón o None).
+    Las regex inválidas o con referencias se descartan.
+    """
+    r = reglas.sort_values('prioridad', ascending=False, kind='stable').reset_index(drop=True)
+    r['re'] = [_patron_usuario(p, e) for p, e in
+               zip(r['patron'].fillna('').astype(str), r['es_regex'].fillna(False).astype(bool))]
+    r = r[r['re'].notna()].reset_index(drop=True)
+    r['tipo'] = r['tipo'].fillna('')
+    r['monto_min'] = r['monto_min'].astype(float).fillna(-np.inf)
+    r['monto_max'] = r['monto_max'].astype(float).fillna(np.inf)
+
+    grupos = []
+    for _, g in r.groupby(['tipo', 'monto_min', 'monto_max'], sort=False):
+        con, sin = g[g['re'] != ''], g[g['re'] == '']
+        regex = None
+        if not con.empty:
+            # lookahead: prueba cada posición, así una regla no tapa a otra que empieza adentro;
+            # cada patrón ya se validó envuelto igual, así que la combinación compila
+            regex = re.compile(
+                '(?=(?:' + '|'.join(f'(?P<r{i}>{p})' for i, p in zip(con.index, con['re'])) + '))',
+                re.IGNORECASE
+            )
+        grupos.append((g.index, regex, sin.index.min() if not sin.empty else None))
+    return r, grupos
+
+def categorizar(movimientos, reglas, aprendidas=None):
+    """
+    Categoría sugerida para cada movimiento (descripcion, monto, tipo): la de
+    la regla de mayor prioridad que coincide en texto, tipo y rango de monto;
+    si ninguna, la aprendida para esa clave de descripción; NaN si no hay.
+    """
+    categoria = pd.Series(np.nan, index=movimientos.index, dtype=object)
+    if movimientos.empty:
+        return categoria
+
+    if reglas is not None and not reglas.empty:
+        orden, grupos = compilar_reglas(reglas)
+        texto = normalizar_texto(movimientos['descripcion']).tolist()
+        monto = movimientos['monto'].to_numpy(dtype=float)
+        tipo  = movimientos['tipo'].to_numpy(dtype=object)
+        mejor = np.full(len(movimientos), np.inf)
+        for indices, regex, vacia in grupos:
+            cond = orden.loc[indices[0]]
+            filas = np.flatnonzero((monto >= cond['monto_min']) & (monto <= cond['monto_max'])
+                                   & ((cond['tipo'] == '') | (tipo == cond['tipo'])))
+            if vacia is not None:
+                mejor[filas] = np.minimum(mejor[filas], vacia)
+            if regex is not None:
+                mejor[filas] = np.minimum(mejor[filas], [
+                    min((int(m.lastgroup[1:]) for m in regex.finditer(texto[f])), default=np.inf) for f in filas
+                ])
+        hay = np.isfinite(mejor)
+        categoria[hay] = orden['categoria'].to_numpy(dtype=object)[mejor[hay].astype(int)]
+
+    if aprendidas is not None and not aprendidas.empty and categoria.isna().any():
+        claves = pd.DataFrame({'clave': clave_descripcion(movimientos['descripcion']).to_numpy(),
+                               'tipo': movimientos['tipo'].to_numpy()})
+        sugerida = claves.merge(aprendidas[['clave', 'tipo', 'categoria']], on=['clave', 'tipo'], how='left')['categoria']
+        categoria = categoria.fillna(pd.Series(sugerida.to_numpy(), index=movimientos.index))
+    return categoria
+
+def marcar_duplicados(extracto, existentes):
+    """True para las líneas que ya están cargadas (misma fecha, tipo, monto y descripción)."""
+    if existentes.empty or extracto.empty:
+        return pd.Series(False, index=extracto.index)
+    clave = lambda d: pd.DataFrame({
+        'fecha': pd.to_datetime(d['fecha']).dt.normalize(), 'tipo': d['tipo'],
+        'monto': d['monto'].astype(float).round(2), 'desc': normalizar_texto(d['descripcion']).to_numpy(),
+    })
+    ya = clave(existentes).drop_duplicates()
+    cruce = clave(extracto).reset_index().merge(ya, on=['fecha', 'tipo', 'monto', 'desc'], how='left', indicator=True)
+    return pd.Series((cruce['_merge'] == 'both').to_numpy(), index=cruce['index'].to_numpy()).reindex(extracto.index)
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+from analitica.fx import fx_en_fechas
+
+# ─────────────────────────────────────────────
+#  CEDEARS — .BA valuados desde la acción subyacente
+# ─────────────────────────────────────────────
+# ratio = CEDEARs por acción subyacente (20 → 20 CEDEARs equivalen a 1 acción),
+# así que precio_local ≈ precio_subyacente × fx / ratio. El fx implícito sale
+# de los días con las dos cotizaciones (local × ratio / subyacente); si nunca
+# hubo cotización local se usa el CCL del store.
+
+MAX_DIAS_LOCAL = 3      # una cotización local más vieja que esto se considera vencida
+
+def fx_implicito(local, subyacente, ratio):
+    """Tipo de cambio implícito del CEDEAR (NaN donde falta alguna cotización)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(np.asarray(subyacente) > 0, np.asarray(local) * ratio / np.asarray(subyacente), np.nan)
+
+def precio_sintetico(subyacente, ratio, fx):
+    """Precio local equivalente: subyacente × fx / ratio."""
+    return np.asarray(subyacente, dtype=float) * np.asarray(fx, dtype=float) / ratio
+
+def _huecos(fechas, local, max_dias):
+    """True donde falta la cotización local y la última conocida es más vieja que `max_dias`."""
+    dias = (fechas.values.astype('datetime64[D]').astype(np.int64))[:, None]
+    ultima = pd.DataFrame(np.where(np.isnan(local), np.nan, dias), index=fechas).ffill().to_numpy()
+    return np.isnan(local) & (np.isnan(ultima) | (dias - ultima > max_dias))
+
+def cedears_incompletos(precios, cedears, max_dias=MAX_DIAS_LOCAL):
+    """
+    Tickers de `cedears` que necesitan el subyacente en `precios`: sin serie
+    local o con algún hueco que completar_cedears rellenaría.
+    """
+    locales = [t for t in cedears if t in precios.columns]
+    faltan  = [t for t in cedears if t not in precios.columns]
+    if locales and not precios.empty:
+        hueco = _huecos(precios.index, precios[locales].to_numpy(dtype=float), max_dias).any(axis=0)
+        faltan += [t for t, h in zip(locales, hueco) if h]
+    return sorted(faltan)
+
+def completar_cedears(precios, cedears, serie_ccl=None, max_dias=MAX_DIAS_LOCAL):
+    """
+    Matriz de cierres (fechas × tickers) con los .BA mapeados completados
+    donde la cotización local falta o está vencida. `cedears` es
+    {ticker: (subyacente, ratio)}; la columna del subyacente tiene que estar
+    en `precios`. Todas las columnas mapeadas se resuelven en una pasada.
+    """
+    pares = [(t, s, r) for t, (s, r) in cedears.items()
+             if t in precios.columns and s in precios.columns and r and r > 0]
+    if not pares or precios.empty:
+        return precios
+    locales = [t for t, _, _ in pares]
+    ratios  = np.array([r for _, _, r in pares], dtype=float)
+    local   = precios[locales].to_numpy(dtype=float)
+    sub     = precios[[s for _, s, _ in pares]].ffill().to_numpy(dtype=float)
+
+    # fx implícito arrastrado desde el último día con ambas cotizaciones; CCL antes de eso
+    fx = pd.DataFrame(fx_implicito(local, sub, ratios), index=precios.index).ffill().to_numpy()
+    ccl = fx_en_fechas(serie_ccl, precios.index)
+    fx = np.where(np.isnan(fx), ccl[:, None], fx)
+
+    usar = ~np.isnan(sub) & _huecos(precios.index, local, max_dias)
+
+    completado = precios.copy()
+    completado[locales] = np.where(usar, precio_sintetico(sub, ratios, fx), local)
+    return completado
+
+def cotizaciones_cedears(cotizaciones, cedears, fx):
+    """
+    {ticker .BA: precio} sintético para los mapeados cuyo subyacente está en
+    `cotizaciones` ({ticker: precio}), al tipo de cambio `fx`.
+    """
+    return {
+        t: float(precio_sintetico(cotizaciones[s], r, fx))
+        for t, (s, r) in cedears.items() if s in cotizaciones and r and r > 0
+    }
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from analitica.lotes import imputar_lotes, resumen_lotes
+from analitica.posiciones import COLUMNAS_POSICION, valuar_posiciones
+from analitica.rendimientos import flujos_operaciones, indice_twr
+
+# ─────────────────────────────────────────────
+#  COMPARACIÓN — todos los portafolios en una pasada
+# ─────────────────────────────────────────────
+# Parte de las operaciones consolidadas (una sola consulta) y usa
+# portfolio_id como una clave más: los lotes se imputan por (portafolio,
+# ticker, moneda) en el mismo recorrido, y la evolución sale de agrupar por
+# portafolio las columnas de valores_y_flujos. Las operaciones sin portafolio
+# quedan en el id 0.
+
+def _con_portafolio(df_ops):
+    df = df_ops.copy()
+    df['portfolio_id'] = df['portfolio_id'].fillna(0).astype(int)
+    return df
+
+def posiciones_por_portafolio(df_ops, precios, precio_dolar, metodo='fifo'):
+    """(abiertas, realizadas) como calcular_posiciones, con portfolio_id al frente."""
+    if df_ops.empty:
+        return pd.DataFrame(columns=['portfolio_id'] + COLUMNAS_POSICION), pd.DataFrame(
+            columns=['portfolio_id', 'ticker', 'moneda', 'ganancia_realizada', 'ganancia_realizada_usd']
+        )
+    por = ['portfolio_id']
+    pos = resumen_lotes(*imputar_lotes(_con_portafolio(df_ops), metodo, por), por).rename(columns={
+        'cantidad': 'cantidad_total', 'ganancia': 'ganancia_realizada'
+    })
+    return valuar_posiciones(pos, precios, precio_dolar, por)
+
+def evolucion_por_portafolio(valores, flujos):
+    """
+    De las matrices de valores_y_flujos (columnas portafolio × ticker) a
+    (valor, indice): fechas × portafolios, valor en USD e índice TWR base 1.
+    """
+    valor = valores.T.groupby(level='portfolio_id').sum().T
+    flujo = flujos.T.groupby(level='portfolio_id').sum().T
+    return valor, indice_twr(valor, flujo)
+
+def resumen_portafolios(abiertas, realizadas, df_ops, serie_dolar, indice=None):
+    """
+    Una fila por portafolio: posiciones abiertas, valor de mercado, coste,
+    no realizado, realizado, capital neto aportado y TWR (último valor de
+    `indice`, si se pasa).
+    """
+    cols = ['portfolio_id', 'posiciones', 'valor_mercado_usd', 'coste_total_usd',
+            'ganancia_no_realizada_usd', 'ganancia_realizada_usd', 'capital_neto_usd', 'twr']
+    if df_ops.empty:
+        return pd.DataFrame(columns=cols)
+    df = _con_portafolio(df_ops)
+    res = abiertas.groupby('portfolio_id').agg(
+        posiciones=('ticker', 'nunique'),
+        valor_mercado_usd=('valor_mercado_usd', 'sum'),
+        coste_total_usd=('coste_total_usd', 'sum'),
+        ganancia_no_realizada_usd=('ganancia_no_realizada_usd', 'sum'),
+    ).join(realizadas.groupby('portfolio_id')[['ganancia_realizada_usd']].sum(), how='outer') \
+     .join(flujos_operaciones(df, serie_dolar).groupby(df['portfolio_id']).sum().rename('capital_neto_usd'),
+           how='outer')
+    res = res.fillna(0)
+    res['posiciones'] = res['posiciones'].astype(int)
+    if indice is not None and not indice.empty:
+        ultimo = indice.ffill().iloc[-1]
+        res['twr'] = (ultimo - 1).reindex(res.index)
+    else:
+        res['twr'] = np.nan
+    return res.rename_axis('portfolio_id').reset_index()[cols]
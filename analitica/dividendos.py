@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+from analitica.fx import moneda_ticker
+from analitica.series import matriz_tenencias
+
+# ─────────────────────────────────────────────
+#  DIVIDENDOS — historia, cobrados y calendario
+# ─────────────────────────────────────────────
+# Los eventos son (ticker, fecha ex, monto por acción) del store local. La
+# frecuencia sale de la distancia típica entre pagos; el calendario repite el
+# último monto cada período a partir del último ex-dividend. Lo cobrado es la
+# tenencia al cierre del día anterior a cada fecha ex × monto.
+
+FRECUENCIAS = {12: 'Mensual', 4: 'Trimestral', 2: 'Semestral', 1: 'Anual'}
+DESFASE_PAGO = 21       # días ex → pago cuando no hay dato del emisor
+
+def frecuencia_anual(fechas):
+    """Pagos por año (12, 4, 2 o 1) según la mediana de los últimos intervalos."""
+    f = np.sort(pd.to_datetime(pd.Series(fechas)).to_numpy())
+    if len(f) < 2: return 1
+    dias = np.diff(f[-9:]) / np.timedelta64(1, 'D')
+    por_anio = 365.25 / max(np.median(dias), 1)
+    opciones = np.array(list(FRECUENCIAS))
+    return int(opciones[np.abs(np.log(opciones / por_anio)).argmin()])
+
+def resumen_dividendos(eventos, hoy=None):
+    """
+    Por ticker: frecuencia, último ex, último monto, monto anual por acción
+    (último × frecuencia) y si sigue activo (último ex dentro de un período más
+    60 días de margen por demoras en los datos).
+    """
+    cols = ['ticker', 'frecuencia', 'ultimo_ex', 'ultimo_monto', 'anual_por_accion', 'activo']
+    if eventos.empty:
+        return pd.DataFrame(columns=cols)
+    hoy = pd.Timestamp(hoy or pd.Timestamp.today().normalize())
+    ev  = eventos.assign(fecha=pd.to_datetime(eventos['fecha'])).sort_values(['ticker', 'fecha'])
+    ultimo = ev.groupby('ticker').tail(1).set_index('ticker')
+    frec   = ev.groupby('ticker')['fecha'].agg(frecuencia_anual)
+    res = pd.DataFrame({
+        'frecuencia':   frec,
+        'ultimo_ex':    ultimo['fecha'],
+        'ultimo_monto': ultimo['monto'],
+    })
+    res['anual_por_accion'] = res['ultimo_monto'] * res['frecuencia']
+    periodo = pd.to_timedelta(365.25 / res['frecuencia'], unit='D')
+    res['activo'] = res['ultimo_ex'] >= hoy - periodo - pd.Timedelta(days=60)
+    return res.rename_axis('ticker').reset_index()[cols]
+
+def proyectar_calendario(resumen, cantidades, meses=12, hoy=None, desfases=None):
+    """
+    Pagos esperados en los próximos `meses` para las tenencias actuales.
+    cantidades — {ticker: cantidad}; desfases — {ticker: días ex → pago}.
+    Devuelve ticker, fecha_ex, fecha_pago, por_accion, cantidad, monto, moneda.
+    """
+    cols = ['ticker', 'fecha_ex', 'fecha_pago', 'por_accion', 'cantidad', 'monto', 'moneda']
+    hoy = pd.Timestamp(hoy or pd.Timestamp.today().normalize())
+    fin = hoy + pd.DateOffset(months=meses)
+    res = resumen[resumen['activo'] & resumen['ticker'].map(lambda t: cantidades.get(t, 0) > 0)]
+    if res.empty:
+        return pd.DataFrame(columns=cols)
+
+    # k = 1..n períodos después del último ex, para todos los tickers a la vez
+    n       = int(np.ceil(res['frecuencia'].max() * (meses / 12 + 1.5))) + 1
+    k       = np.tile(np.arange(1, n + 1), len(res))
+    rep     = np.repeat(np.arange(len(res)), n)
+    base    = res.iloc[rep].reset_index(drop=True)
+    periodo = 365.25 / base['frecuencia'].to_numpy()
+    base['fecha_ex'] = (base['ultimo_ex'] + pd.to_timedelta(np.round(k * periodo), unit='D')).dt.normalize()
+    base = base[(base['fecha_ex'] > hoy) & (base['fecha_ex'] <= fin)]
+
+    desfases = desfases or {}
+    base['fecha_pago'] = base['fecha_ex'] + pd.to_timedelta(
+        base['ticker'].map(lambda t: desfases.get(t, DESFASE_PAGO)), unit='D'
+    )
+    base['por_accion'] = base['ultimo_monto']
+    base['cantidad']   = base['ticker'].map(cantidades).astype(float)
+    base['monto']      = base['por_accion'] * base['cantidad']
+    base['moneda']     = base['ticker'].map(moneda_ticker)
+    return base[cols].sort_values('fecha_pago', ignore_index=True)
+
+def dividendos_cobrados(df_ops, eventos):
+    """
+    Dividendos efectivamente cobrados: tenencia al cierre del día anterior a
+    cada fecha ex × monto por acción. Devuelve ticker, fecha, por_accion,
+    cantidad, monto, moneda (solo eventos con tenencia).
+    """
+    cols = ['ticker', 'fecha', 'por_accion', 'cantidad', 'monto', 'moneda']
+    if df_ops.empty or eventos.empty:
+        return pd.DataFrame(columns=cols)
+    ev = eventos.assign(fecha=pd.to_datetime(eventos['fecha']))
+    ev = ev[ev['ticker'].isin(df_ops['ticker'].unique())]
+    if ev.empty:
+        return pd.DataFrame(columns=cols)
+    previo = ev['fecha'] - pd.Timedelta(days=1)
+    indice = pd.DatetimeIndex(np.sort(previo.unique()))
+    tenencias = matriz_tenencias(df_ops, indice)
+    filas = indice.get_indexer(previo)
+    cols_t = tenencias.columns.get_indexer(ev['ticker'])
+    cantidad = np.where(cols_t >= 0, tenencias.to_numpy()[filas, np.clip(cols_t, 0, None)], 0.0)
+    out = pd.DataFrame({
+        'ticker':     ev['ticker'].to_numpy(),
+        'fecha':      ev['fecha'].to_numpy(),
+        'por_accion': ev['monto'].to_numpy(dtype=float),
+        'cantidad':   cantidad,
+    })
+    out = out[out['cantidad'] > 0.000001].copy()
+    out['monto']  = out['por_accion'] * out['cantidad']
+    out['moneda'] = out['ticker'].map(moneda_ticker)
+    return out[cols].sort_values('fecha', ignore_index=True)
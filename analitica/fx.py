@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+# Fallback cuando todavía no hay serie de tipo de cambio guardada
+DOLAR_ESTIMADO = 1150.0
+
+def fx_en_fechas(serie, fechas):
+    """
+    Tipo de cambio vigente en cada fecha (último conocido, as-of), como array.
+    Fechas anteriores al primer dato toman el primer valor disponible.
+    """
+    fechas = pd.DatetimeIndex(pd.to_datetime(fechas))
+    if serie is None or serie.empty:
+        return np.full(len(fechas), DOLAR_ESTIMADO)
+    idx = np.searchsorted(
+        serie.index.values, fechas.values.astype(serie.index.values.dtype), side='right'
+    ) - 1
+    return serie.values[np.clip(idx, 0, len(serie) - 1)]
+
+def ars_a_usd(montos, monedas, fechas, serie):
+    """Convierte a USD en una sola división alineada por fecha (solo filas ARS)."""
+    montos = np.asarray(montos, dtype=float)
+    es_ars = np.asarray(monedas) == 'ARS'
+    return np.where(es_ars, montos / fx_en_fechas(serie, fechas), montos)
+
+def moneda_ticker(ticker):
+    """Moneda de cotización: ARS para los .BA, USD el resto."""
+    return 'ARS' if str(ticker).endswith('.BA') else 'USD'
+
+def usd_a_moneda(montos, fechas, serie, moneda='USD'):
+    """Montos en USD expresados en `moneda` al tipo de cambio de cada fecha (USD: sin cambios)."""
+    montos = np.asarray(montos, dtype=float)
+    if moneda != 'ARS': return montos
+    fx = fx_en_fechas(serie, fechas)
+    return montos * (fx[:, None] if montos.ndim == 2 else fx)
+
+def exposicion_moneda(valores):
+    """Valor (fechas × tickers, USD) agrupado por moneda de cotización: fechas × {USD, ARS}."""
+    return valores.T.groupby(valores.columns.map(moneda_ticker)).sum().T
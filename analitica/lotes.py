@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+# ─────────────────────────────────────────────
+#  LOTES — imputación de ventas a compras
+# ─────────────────────────────────────────────
+# Una sola pasada por las operaciones ordenadas por (fecha, id). Cada
+# (ticker, moneda) guarda sus lotes abiertos en arrays preasignados con
+# punteros de inicio/fin, así FIFO y LIFO consumen en O(1) amortizado y
+# todo queda lineal en la cantidad de operaciones.
+
+METODOS = {
+    'fifo':      'FIFO (primero en entrar)',
+    'lifo':      'LIFO (último en entrar)',
+    'promedio':  'Costo promedio',
+    'especifico': 'Lote específico',
+}
+
+EPS = 0.000001
+
+class _Lotes:
+    __slots__ = ('ids', 'fechas', 'cant', 'coste', 'ini', 'fin', 'pos_id',
+                 'tot_cant', 'tot_coste', 'tot_fecha')
+
+    def __init__(self, capacidad):
+        self.ids    = np.zeros(capacidad, dtype=np.int64)
+        self.fechas = np.zeros(capacidad, dtype=np.int64)    # ns desde epoch
+        self.cant   = np.zeros(capacidad)
+        self.coste  = np.zeros(capacidad)                     # coste unitario
+        self.ini    = 0                                        # primer lote posiblemente abierto
+        self.fin    = 0                                        # siguiente posición libre
+        self.pos_id = {}
+        # agregados para costo promedio (no hace falta recorrer lotes)
+        self.tot_cant = self.tot_coste = self.tot_fecha = 0.0
+
+    def agregar(self, op_id, fecha, cantidad, precio):
+        i = self.fin
+        self.ids[i], self.fechas[i], self.cant[i], self.coste[i] = op_id, fecha, cantidad, precio
+        self.pos_id[op_id] = i
+        self.fin += 1
+        self.tot_cant  += cantidad
+        self.tot_coste += cantidad * precio
+        self.tot_fecha += cantidad * fecha
+
+    def _consumir_en(self, i, restante):
+        usado = min(self.cant[i], restante)
+        self.cant[i] -= usado
+        return usado, usado * self.coste[i], usado * self.fechas[i]
+
+    def consumir(self, cantidad, metodo, lote_id=None):
+        """Saca `cantidad` de los lotes; devuelve (cantidad_cubierta, coste, fecha_compra_ns)."""
+        if metodo == 'promedio':
+            usado = min(self.tot_cant, cantidad)
+            if usado <= EPS: return 0.0, 0.0, None
+            ratio = usado / self.tot_cant
+            coste, fecha = self.tot_coste * ratio, self.tot_fecha / self.tot_cant
+            self.tot_cant -= usado; self.tot_coste -= coste; self.tot_fecha *= 1 - ratio
+            return usado, coste, fecha
+
+        restante, cubierto, coste, fecha_pond = cantidad, 0.0, 0.0, 0.0
+        if metodo == 'especifico':
+            if lote_id in self.pos_id:
+                usado, c, f = self._consumir_en(self.pos_id[lote_id], restante)
+                restante -= usado; cubierto += usado; coste += c; fecha_pond += f
+            metodo = 'fifo'  # sin lote elegido, o lo que lo exceda, sale por FIFO
+
+        if metodo == 'lifo':
+            while restante > EPS and self.fin > self.ini:
+                i = self.fin - 1
+                usado, c, f = self._consumir_en(i, restante)
+                restante -= usado; cubierto += usado; coste += c; fecha_pond += f
+                if self.cant[i] <= EPS:
+                    self.fin -= 1
+        else:
+            while restante > EPS and self.ini < self.fin:
+                i = self.ini
+                usado, c, f = self._consumir_en(i, restante)
+                restante -= usado; cubierto += usado; coste += c; fecha_pond += f
+                if self.cant[i] <= EPS:
+                    self.ini += 1
+        return cubierto, coste, (fecha_pond / cubierto if cubierto > EPS else None)
+
+    def abiertos(self, metodo):
+        """(ids, fechas_ns, cantidades, coste_unitario) de lo que queda en cartera."""
+        if metodo == 'promedio':
+            if self.tot_cant <= EPS: return [], [], [], []
+            # un único lote al coste promedio, fechado en la compra promedio ponderada
+            return ([-1], [self.tot_fecha / self.tot_cant], [self.tot_cant],
+                    [self.tot_coste / self.tot_cant])
+        sel  = slice(self.ini, self.fin)
+        mask = self.cant[sel] > EPS
+        return self.ids[sel][mask], self.fechas[sel][mask], self.cant[sel][mask], self.coste[sel][mask]
+
+
+def imputar_lotes(df_ops, metodo='fifo', por=()):
+    """
+    Recorre las operaciones una vez y empareja cada venta con sus compras.
+    Devuelve (lotes_abiertos, ventas):
+      lotes_abiertos — ticker, moneda, op_id, fecha, cantidad, coste_unitario
+      ventas         — una fila por venta: ticker, moneda, op_id, fecha, cantidad,
+                       ingreso, coste, ganancia, fecha_compra (promedio ponderado)
+    Las ventas sin tenencia suficiente solo imputan lo disponible.
+    `lote_id` (si existe la columna) indica la compra elegida en modo 'especifico'.
+    `por` — columnas extra de la clave (p. ej. portfolio_id), al frente de ambas salidas.
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método desconocido: {metodo}")
+    claves_cols = list(por) + ['ticker', 'moneda']
+    cols_lotes  = claves_cols + ['op_id', 'fecha', 'cantidad', 'coste_unitario']
+    cols_ventas = claves_cols + ['op_id', 'fecha', 'cantidad', 'ingreso', 'coste', 'ganancia', 'fecha_compra']
+    if df_ops.empty:
+        return pd.DataFrame(columns=cols_lotes), pd.DataFrame(columns=cols_ventas)
+
+    df = df_ops.copy()
+    df['moneda'] = df['moneda'].fillna('USD')
+    df['fecha']  = pd.to_datetime(df['fecha'])
+    if 'id' not in df.columns:
+        df['id'] = np.arange(len(df))
+    if 'lote_id' not in df.columns:
+        df['lote_id'] = np.nan
+    df = df.sort_values(['fecha', 'id'], kind='stable')
+
+    claves  = list(zip(*(df[c] for c in claves_cols)))
+    compras = (df['tipo'] == 'Compra').to_numpy()
+    capacidad = pd.Series(compras, index=df.index).groupby([df[c] for c in claves_cols]).sum().to_dict()
+    estado = {}
+
+    ids       = df['id'].to_numpy(dtype=np.int64)
+    fechas    = df['fecha'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    cants     = df['cantidad'].to_numpy(dtype=float)
+    precios   = df['precio'].to_numpy(dtype=float)
+    lotes_ref = df['lote_id'].to_numpy(dtype=float)
+    ventas = []
+
+    for k, clave in enumerate(claves):
+        lotes = estado.get(clave)
+        if lotes is None:
+            lotes = estado[clave] = _Lotes(max(int(capacidad.get(clave, 0)), 1))
+        if compras[k]:
+            lotes.agregar(ids[k], fechas[k], cants[k], precios[k])
+        else:
+            ref = None if np.isnan(lotes_ref[k]) else int(lotes_ref[k])
+            cubierto, coste, f_compra = lotes.consumir(cants[k], metodo, ref)
+            ingreso = cubierto * precios[k]
+            ventas.append((*clave, ids[k], fechas[k], cubierto, ingreso, coste, ingreso - coste, f_compra))
+
+    filas = []
+    for clave, lotes in estado.items():
+        for op_id, fecha, cant, coste in zip(*lotes.abiertos(metodo)):
+            filas.append((*clave, op_id, fecha, cant, coste))
+
+    lotes_df  = pd.DataFrame(filas, columns=cols_lotes)
+    ventas_df = pd.DataFrame(ventas, columns=cols_ventas)
+    lotes_df['fecha']         = pd.to_datetime(lotes_df['fecha'].astype('float').round(), unit='ns').dt.round('s')
+    ventas_df['fecha']        = pd.to_datetime(ventas_df['fecha'], unit='ns')
+    ventas_df['fecha_compra'] = pd.to_datetime(ventas_df['fecha_compra'].astype('float').round(), unit='ns').dt.round('s')
+    return lotes_df, ventas_df
+
+
+def resumen_lotes(lotes_abiertos, ventas, por=()):
+    """Por (`por`…, ticker, moneda): cantidad abierta, coste abierto y ganancia realizada."""
+    claves = list(por) + ['ticker', 'moneda']
+    abiertos = lotes_abiertos.assign(
+        coste_abierto=lotes_abiertos['cantidad'] * lotes_abiertos['coste_unitario']
+    ).groupby(claves)[['cantidad', 'coste_abierto']].sum()
+    realizado = ventas.groupby(claves)[['ganancia']].sum()
+    return abiertos.join(realizado, how='outer').fillna(0).reset_index()
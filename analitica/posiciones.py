@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+from analitica.lotes import imputar_lotes, resumen_lotes
+
+# ─────────────────────────────────────────────
+#  POSICIONES — cantidades, PPP y P&L por ticker
+# ─────────────────────────────────────────────
+
+COLUMNAS_POSICION = [
+    'ticker', 'moneda', 'cantidad_total', 'ppp_original', 'precio_actual',
+    'valor_mercado_usd', 'coste_total_usd', 'ganancia_no_realizada_usd', 'rentabilidad_%',
+]
+
+def agrupar_operaciones(df_ops):
+    """Totales de compras y ventas por (ticker, moneda) en un solo groupby."""
+    df = df_ops[['ticker', 'moneda', 'tipo', 'cantidad', 'precio']].copy()
+    df['moneda'] = df['moneda'].fillna('USD')
+    compra = df['tipo'] == 'Compra'
+    monto  = df['cantidad'] * df['precio']
+    df['cantidad_acumulada_compras'] = df['cantidad'].where(compra, 0)
+    df['coste_acumulado_compras']    = monto.where(compra, 0)
+    df['cantidad_vendida']           = df['cantidad'].where(~compra, 0)
+    df['total_ventas']               = monto.where(~compra, 0)
+    pos = df.groupby(['ticker', 'moneda'], as_index=False)[[
+        'cantidad_acumulada_compras', 'coste_acumulado_compras', 'cantidad_vendida', 'total_ventas'
+    ]].sum()
+    pos['cantidad_total'] = pos['cantidad_acumulada_compras'] - pos['cantidad_vendida']
+    return pos
+
+def calcular_posiciones(df_ops, precios, precio_dolar, metodo='fifo'):
+    """
+    Posiciones abiertas valuadas a `precios` ({ticker: precio}) y P&L realizado.
+    Devuelve (abiertas, realizadas):
+      abiertas   — una fila por posición abierta, columnas COLUMNAS_POSICION;
+                   ppp_original es el coste unitario de los lotes que siguen abiertos
+      realizadas — ticker, moneda, ganancia_realizada (moneda original) y en USD
+    `metodo` define cómo se imputan las ventas a compras (ver lotes.METODOS).
+    """
+    if df_ops.empty:
+        return pd.DataFrame(columns=COLUMNAS_POSICION), pd.DataFrame(
+            columns=['ticker', 'moneda', 'ganancia_realizada', 'ganancia_realizada_usd']
+        )
+    pos = resumen_lotes(*imputar_lotes(df_ops, metodo)).rename(columns={
+        'cantidad': 'cantidad_total', 'ganancia': 'ganancia_realizada'
+    })
+    return valuar_posiciones(pos, precios, precio_dolar)
+
+def valuar_posiciones(pos, precios, precio_dolar, por=()):
+    """
+    De (ticker, moneda, cantidad_total, coste_abierto, ganancia_realizada) a
+    (abiertas, realizadas) valuadas a `precios` y `precio_dolar`. Las columnas
+    `por` (si las hay) se conservan al frente.
+    """
+    por = list(por)
+    es_ars = (pos['moneda'] == 'ARS').to_numpy()
+    pos['ganancia_realizada_usd'] = np.where(es_ars, pos['ganancia_realizada'] / precio_dolar, pos['ganancia_realizada'])
+    realizadas = pos[por + ['ticker', 'moneda', 'ganancia_realizada', 'ganancia_realizada_usd']].copy()
+
+    abiertas = pos[pos['cantidad_total'] > 0.000001].copy()
+    es_ars   = (abiertas['moneda'] == 'ARS').to_numpy()
+    abiertas['ppp_original']  = abiertas['coste_abierto'] / abiertas['cantidad_total']
+    abiertas['precio_actual'] = abiertas['ticker'].map(precios).fillna(0).astype(float)
+    valor = abiertas['cantidad_total'] * abiertas['precio_actual']
+    coste = abiertas['coste_abierto']
+    abiertas['valor_mercado_usd'] = np.where(es_ars, valor / precio_dolar, valor)
+    abiertas['coste_total_usd']   = np.where(es_ars, coste / precio_dolar, coste)
+    abiertas['ganancia_no_realizada_usd'] = abiertas['valor_mercado_usd'] - abiertas['coste_total_usd']
+    coste_usd = abiertas['coste_total_usd']
+    abiertas['rentabilidad_%'] = np.where(
+        coste_usd > 0, abiertas['ganancia_no_realizada_usd'] / coste_usd.where(coste_usd > 0, 1) * 100, 0
+    )
+    return abiertas[por + COLUMNAS_POSICION].reset_index(drop=True), realizadas.reset_index(drop=True)
+
+def cantidades_abiertas(abiertas):
+    """Cantidad neta por ticker (sumando monedas), solo posiciones abiertas."""
+    return abiertas.groupby('ticker')['cantidad_total'].sum()
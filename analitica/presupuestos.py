@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+# ─────────────────────────────────────────────
+#  PRESUPUESTOS — ritmo de gasto del mes por categoría
+# ─────────────────────────────────────────────
+# Entra el gasto del mes ya agregado por (día, categoría) en la base; los
+# acumulados son un cumsum sobre esa grilla chica. La proyección a fin de
+# mes separa lo recurrente (se sabe cuánto falta) de lo variable (se
+# extrapola al ritmo de los días transcurridos).
+
+def acumulado_mes(diario, mes):
+    """Gasto acumulado (días del mes × categorías) desde las filas fecha, categoria, monto_usd."""
+    inicio = pd.Timestamp(mes).to_period('M').start_time
+    dias = pd.date_range(inicio, inicio + pd.offsets.MonthEnd(0), freq='D')
+    if diario.empty:
+        return pd.DataFrame(index=dias)
+    grilla = diario.pivot_table(index='fecha', columns='categoria', values='monto_usd', aggfunc='sum')
+    return grilla.reindex(dias, fill_value=0).fillna(0).cumsum()
+
+def ritmo_presupuestos(diario, presupuestos, hoy, pendiente=None):
+    """
+    Una fila por categoría con presupuesto: gastado, recurrente (de lo
+    gastado), proyectado a fin de mes, usado (gastado / presupuesto), ritmo
+    (gastado / lo que correspondía a esta altura del mes) y estado
+    ('excedido'; 'en riesgo' si al ritmo actual lo pasa; 'ok').
+    `diario`: fecha, categoria, monto_usd, recurrente_usd del mes de `hoy`.
+    `presupuestos`: {categoria: USD mensuales}. `pendiente`: recurrentes que
+    faltan en el mes, {categoria: USD}.
+    """
+    cols = ['categoria', 'presupuesto', 'gastado', 'recurrente', 'proyectado', 'usado', 'ritmo', 'estado']
+    presupuestos = pd.Series(presupuestos, dtype=float).dropna()
+    presupuestos = presupuestos[presupuestos > 0]
+    if presupuestos.empty:
+        return pd.DataFrame(columns=cols)
+
+    hoy = pd.Timestamp(hoy).normalize()
+    dias_mes = hoy.days_in_month
+    fraccion = hoy.day / dias_mes
+
+    del_mes = diario[diario['fecha'] <= hoy] if not diario.empty else diario
+    sumas = del_mes.groupby('categoria')[['monto_usd', 'recurrente_usd']].sum() if not del_mes.empty \
+        else pd.DataFrame(columns=['monto_usd', 'recurrente_usd'], dtype=float)
+    sumas = sumas.reindex(presupuestos.index, fill_value=0)
+    falta = pd.Series(pendiente if pendiente is not None else {}, dtype=float).reindex(presupuestos.index, fill_value=0)
+
+    gastado  = sumas['monto_usd'].to_numpy(dtype=float)
+    recur    = sumas['recurrente_usd'].to_numpy(dtype=float)
+    variable = gastado - recur
+    proyectado = gastado + falta.to_numpy() + variable / hoy.day * (dias_mes - hoy.day)
+    p = presupuestos.to_numpy()
+
+    estado = np.select(
+        [gastado > p, proyectado > p],
+        ['excedido', 'en riesgo'], default='ok'
+    )
+    return pd.DataFrame({
+        'categoria': presupuestos.index, 'presupuesto': p, 'gastado': gastado, 'recurrente': recur,
+        'proyectado': proyectado, 'usado': gastado / p, 'ritmo': gastado / (p * fraccion), 'estado': estado,
+    }).sort_values('usado', ascending=False, ignore_index=True)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+# ─────────────────────────────────────────────
+#  PROYECCIÓN — Monte Carlo del valor de la cartera
+# ─────────────────────────────────────────────
+# Con pesos fijos el retorno diario de la cartera es un escalar por día, así
+# que se simula esa serie (no una por activo): el bootstrap sortea ruedas
+# históricas completas (conserva las correlaciones) y el paramétrico usa la
+# normal con media w·μ y varianza w'Σw. Las trayectorias se generan en
+# bloques (trayectorias × ruedas) para acotar la memoria y de cada bloque se
+# guarda solo el valor a fin de mes. Con aportes no alcanza el cumprod:
+#   V_t = G_t · (V_0 + Σ_{s≤t} c_s / G_s),   G_t = Π (1 + r)
+# que también es una operación vectorizada (cumsum sobre la rueda).
+
+RUEDAS_MES   = 21
+PERCENTILES  = (5, 25, 50, 75, 95)
+METODOS_SIM  = {'bootstrap': 'Bootstrap histórico', 'parametrico': 'Normal (paramétrico)'}
+
+def retornos_cartera(precios_usd, pesos):
+    """Retorno diario histórico de la cartera con los pesos de hoy (rebalanceo diario)."""
+    cols = [tk for tk, _ in pesos]
+    w    = np.array([p for _, p in pesos], dtype=float)
+    ret  = precios_usd.reindex(columns=cols).ffill().pct_change().iloc[1:].fillna(0).to_numpy()
+    return ret @ (w / w.sum())
+
+def _bloques(total, tamano):
+    for ini in range(0, total, tamano):
+        yield ini, min(ini + tamano, total)
+
+def simular_trayectorias(retornos, valor_inicial, anios, n_tray=10_000, aporte_mensual=0.0,
+                         metodo='bootstrap', percentiles=PERCENTILES, semilla=None,
+                         max_celdas=4_000_000):
+    """
+    Percentiles del valor a fin de cada mes. `retornos` es la serie diaria
+    histórica de la cartera (ver retornos_cartera). `max_celdas` acota el
+    tamaño de cada bloque (trayectorias × ruedas) en memoria.
+    Devuelve DataFrame indexado por mes (0..12·anios): p5..p95 y 'aportado'.
+    """
+    r = np.asarray(retornos, dtype=float)
+    r = r[~np.isnan(r)]
+    if len(r) < 2:
+        raise ValueError("Se necesitan al menos dos ruedas de historia")
+    meses  = int(round(anios * 12))
+    ruedas = meses * RUEDAS_MES
+    rng    = np.random.default_rng(semilla)
+    media, desvio = r.mean(), r.std(ddof=1)
+
+    aportes = np.zeros(ruedas)
+    aportes[RUEDAS_MES - 1::RUEDAS_MES] = aporte_mensual       # al cierre de cada mes
+    cortes  = np.arange(RUEDAS_MES - 1, ruedas, RUEDAS_MES)
+
+    mensual = np.empty((n_tray, meses + 1))
+    mensual[:, 0] = valor_inicial
+    tamano = max(1, max_celdas // ruedas)
+    for ini, fin in _bloques(n_tray, tamano):
+        n = fin - ini
+        if metodo == 'parametrico':
+            sim = rng.normal(media, desvio, size=(n, ruedas))
+        else:
+            sim = r[rng.integers(0, len(r), size=(n, ruedas))]
+        np.maximum(sim, -0.999, out=sim)                        # el precio no cruza 0
+        crec = np.cumprod(1 + sim, axis=1)
+        if aporte_mensual:
+            valor = crec * (valor_inicial + np.cumsum(aportes / crec, axis=1))
+        else:
+            valor = crec * valor_inicial
+        mensual[ini:fin, 1:] = valor[:, cortes]
+
+    bandas = np.percentile(mensual, percentiles, axis=0)
+    df = pd.DataFrame(bandas.T, columns=[f'p{p}' for p in percentiles])
+    df['aportado'] = valor_inicial + aporte_mensual * np.arange(meses + 1)
+    return df.rename_axis('mes')
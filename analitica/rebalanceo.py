@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+# ─────────────────────────────────────────────
+#  REBALANCEO — de la cartera actual a los pesos objetivo
+# ─────────────────────────────────────────────
+# Todo en USD. Total = posiciones + efectivo; lo que los objetivos no asignan
+# (suma < 100%) queda como efectivo. Solo se opera lo que está fuera de la
+# banda de tolerancia, así el resultado es el conjunto mínimo de órdenes.
+# Sin ventas, el efectivo se reparte entre los que están por debajo en
+# proporción a lo que les falta. Con acciones enteras se redondea hacia abajo
+# y el sobrante se gasta de a una acción, siempre en la de mayor faltante,
+# mientras alcance para alguna a la que le falte al menos media acción (si no,
+# comprarla aleja más del objetivo).
+
+COLUMNAS_REBALANCEO = [
+    'ticker', 'valor_actual', 'peso_actual', 'peso_objetivo', 'precio',
+    'operacion', 'cantidad', 'monto', 'valor_final', 'peso_final',
+]
+
+def calcular_rebalanceo(valores, precios, objetivos, efectivo=0.0, fraccionario=True,
+                        permitir_ventas=True, banda=0.0):
+    """
+    valores   — {ticker: valor USD actual}
+    precios   — {ticker: precio USD} (hace falta para todo ticker a operar)
+    objetivos — {ticker: peso 0..1}; tickers en cartera sin objetivo van a 0
+    banda     — desvío de peso (0..1) que se tolera sin operar
+    Devuelve (DataFrame con COLUMNAS_REBALANCEO, efectivo restante).
+    """
+    tickers = sorted(set(valores) | set(objetivos))
+    if not tickers:
+        return pd.DataFrame(columns=COLUMNAS_REBALANCEO), efectivo
+    v = np.array([valores.get(t, 0.0) for t in tickers], dtype=float)
+    w = np.array([objetivos.get(t, 0.0) for t in tickers], dtype=float)
+    p = np.array([precios.get(t, np.nan) for t in tickers], dtype=float)
+    if w.sum() > 1 + 1e-9:
+        raise ValueError(f"Los pesos objetivo suman {w.sum():.1%}")
+
+    total = v.sum() + efectivo
+    if total <= 0:
+        return pd.DataFrame(columns=COLUMNAS_REBALANCEO), efectivo
+    peso_actual = v / total
+    delta = np.where(np.abs(peso_actual - w) > banda, w * total - v, 0.0)
+    delta[np.isnan(p) | (p <= 0)] = 0.0                         # sin precio no se opera
+
+    ventas  = np.where(delta < 0, delta, 0.0) if permitir_ventas else np.zeros_like(delta)
+    compras = np.where(delta > 0, delta, 0.0)
+    if not fraccionario:
+        pp = np.where(p > 0, p, 1.0)
+        ventas = -np.floor(-ventas / pp + 1e-9) * pp             # vender acciones enteras (hacia 0)
+    disponible = efectivo - ventas.sum()
+    if compras.sum() > disponible:
+        compras *= max(disponible, 0.0) / compras.sum()
+    if not fraccionario:
+        pp = np.where(p > 0, p, np.inf)
+        compras = np.floor(compras / pp + 1e-9) * pp
+        sobrante  = disponible - compras.sum()
+        faltante  = np.where(delta > 0, delta - compras, 0.0)
+        while True:
+            posibles = np.flatnonzero((faltante >= pp / 2) & (pp <= sobrante))
+            if posibles.size == 0: break
+            i = posibles[np.argmax(faltante[posibles])]
+            compras[i] += pp[i]; sobrante -= pp[i]; faltante[i] -= pp[i]
+
+    monto = compras + ventas
+    restante = efectivo - monto.sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cantidad = np.where(p > 0, np.abs(monto) / p, 0.0)
+    final = v + monto
+    df = pd.DataFrame({
+        'ticker':        tickers,
+        'valor_actual':  v,
+        'peso_actual':   peso_actual,
+        'peso_objetivo': w,
+        'precio':        p,
+        'operacion':     np.where(monto > 1e-9, 'Compra', np.where(monto < -1e-9, 'Venta', '—')),
+        'cantidad':      cantidad,
+        'monto':         monto,
+        'valor_final':   final,
+        'peso_final':    final / total,
+    })
+    return df, restante
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+# ─────────────────────────────────────────────
+#  RECURRENCIAS — fechas de movimientos periódicos
+# ─────────────────────────────────────────────
+# Cada regla tiene inicio, fin opcional y una frecuencia. Las mensuales
+# conservan el día del inicio (el 31 cae en el último día de los meses
+# cortos, sin arrastrar el corrimiento). Sirve igual para materializar lo
+# vencido y para proyectar lo que viene sin guardarlo.
+
+FRECUENCIAS_RECURRENTES = {
+    'semanal':    ('D', 7),
+    'quincenal':  ('D', 14),
+    'mensual':    ('M', 1),
+    'trimestral': ('M', 3),
+    'anual':      ('M', 12),
+}
+
+def fechas_recurrencia(inicio, frecuencia, desde, hasta, fin=None):
+    """Fechas de la regla en (desde, hasta] (y ≤ fin), como DatetimeIndex."""
+    inicio = pd.Timestamp(inicio).normalize()
+    hasta  = pd.Timestamp(hasta).normalize()
+    if fin is not None and pd.notna(fin):
+        hasta = min(hasta, pd.Timestamp(fin).normalize())
+    if hasta < inicio:
+        return pd.DatetimeIndex([])
+    unidad, paso = FRECUENCIAS_RECURRENTES[frecuencia]
+    if unidad == 'D':
+        fechas = pd.date_range(inicio, hasta, freq=f'{paso}D')
+    else:
+        meses  = pd.period_range(inicio.to_period('M'), hasta.to_period('M'), freq='M')[::paso]
+        dia    = np.minimum(inicio.day, meses.days_in_month) - 1
+        fechas = pd.DatetimeIndex(meses.start_time + pd.to_timedelta(dia, unit='D'))
+    desde = pd.Timestamp(desde).normalize() if desde is not None and pd.notna(desde) else inicio - pd.Timedelta(days=1)
+    return fechas[(fechas > desde) & (fechas <= hasta)]
+
+def ocurrencias(reglas, hasta, desde=None):
+    """
+    Movimientos que generan las `reglas` (id, tipo, categoria, monto, moneda,
+    descripcion, frecuencia, inicio, fin, materializado_hasta) hasta `hasta`.
+    Sin `desde`, cada regla arranca después de lo ya materializado; con
+    `desde`, en (desde, hasta] (para proyectar). Devuelve recurrente_id, fecha,
+    tipo, categoria, monto, moneda, descripcion.
+    """
+    cols = ['recurrente_id', 'fecha', 'tipo', 'categoria', 'monto', 'moneda', 'descripcion']
+    partes = []
+    for r in reglas.itertuples(index=False):
+        base = desde if desde is not None else r.materializado_hasta
+        f = fechas_recurrencia(r.inicio, r.frecuencia, base, hasta, r.fin)
+        if len(f):
+            partes.append(pd.DataFrame({
+                'recurrente_id': r.id, 'fecha': f, 'tipo': r.tipo, 'categoria': r.categoria,
+                'monto': r.monto, 'moneda': r.moneda, 'descripcion': r.descripcion,
+            }))
+    if not partes:
+        return pd.DataFrame(columns=cols)
+    return pd.concat(partes, ignore_index=True)[cols].sort_values('fecha', ignore_index=True)
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+from analitica.fx import ars_a_usd
+
+# ─────────────────────────────────────────────
+#  RENDIMIENTOS — TWR y TIR (XIRR)
+# ─────────────────────────────────────────────
+# El valor de la cartera sube con cada compra aunque no se gane nada, así que
+# no se puede normalizar la curva de valor sin más. Cada compra es un aporte
+# (flujo +) y cada venta un retiro (flujo −), en USD al tipo de cambio del día.
+#   · TWR: encadena los retornos diarios neutralizando los flujos — es lo que
+#     se compara contra un índice (mismo formato que calcular_benchmarks).
+#   · TIR: tasa anual que iguala aportes, retiros y valor final — lo que ganó
+#     efectivamente el inversor con su calendario de aportes.
+
+def flujos_operaciones(df_ops, serie_dolar):
+    """Flujo en USD de cada operación: compra = aporte (+), venta = retiro (−)."""
+    monedas = df_ops['moneda'].fillna('USD') if 'moneda' in df_ops else np.full(len(df_ops), 'USD')
+    montos  = ars_a_usd(df_ops['cantidad'] * df_ops['precio'], monedas, df_ops['fecha'], serie_dolar)
+    return pd.Series(
+        np.where(df_ops['tipo'] == 'Compra', montos, -montos), index=df_ops.index
+    )
+
+def flujos_diarios(df_ops, indice, serie_dolar):
+    """
+    Flujo neto por rueda de `indice`. Una operación en día no hábil cuenta en
+    la rueda siguiente (igual que matriz_tenencias); las posteriores al último
+    día del índice se descartan.
+    """
+    indice = pd.DatetimeIndex(indice)
+    flujo  = np.zeros(len(indice))
+    if df_ops.empty or len(indice) == 0:
+        return pd.Series(flujo, index=indice)
+    fechas = pd.to_datetime(df_ops['fecha']).values.astype(indice.values.dtype)
+    pos    = np.searchsorted(indice.values, fechas, side='left')
+    ok     = pos < len(indice)
+    np.add.at(flujo, pos[ok], flujos_operaciones(df_ops, serie_dolar).to_numpy()[ok])
+    return pd.Series(flujo, index=indice)
+
+def retornos_twr(valores, flujos):
+    """
+    Retorno diario neto de flujos, con los flujos al cierre del día:
+        r_t = (V_t − V_{t−1} − F_t) / V_{t−1}
+    Si la cartera venía vacía, la base es el aporte del día (así no se pierde
+    lo ganado entre el precio de compra y el cierre). Sin base, rinde 0.
+    """
+    v    = np.asarray(valores, dtype=float)
+    f    = np.asarray(flujos, dtype=float)
+    prev = np.zeros_like(v)
+    prev[1:] = v[:-1]
+    base = np.where(prev > 1e-9, prev, np.maximum(f, 0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = np.where(base > 1e-9, (v - prev - f) / base, 0.0)
+    if isinstance(valores, pd.DataFrame):
+        return pd.DataFrame(r, index=valores.index, columns=valores.columns)
+    return pd.Series(r, index=getattr(valores, 'index', None))
+
+def indice_twr(valores, flujos):
+    """
+    Índice base 1 del TWR, NaN antes de la primera inversión. Mismo formato
+    que una columna de calcular_benchmarks, así rendimiento_desde lo recorta
+    y renormaliza igual que a los índices. Con DataFrames, una columna por cartera.
+    """
+    r   = retornos_twr(valores, flujos)
+    idx = (1 + r).cumprod()
+    invertido = (np.asarray(valores, dtype=float) > 1e-9) | (np.asarray(flujos, dtype=float) > 0)
+    return idx.where(np.cumsum(invertido, axis=0) > 0)
+
+def xirr(montos, fechas, estimado=0.1, tol=1e-10, max_iter=50):
+    """
+    TIR anual de flujos irregulares (signo desde el inversor: aportes −,
+    retiros y valor final +). Newton sobre el VPN vectorizado; si se va de
+    rango o no converge, bisección en (−99.99%, 1e6%). NaN si no hay cambio
+    de signo.
+    """
+    c = np.asarray(montos, dtype=float)
+    d = pd.to_datetime(pd.Series(fechas)).to_numpy()
+    if len(c) < 2 or not ((c > 0).any() and (c < 0).any()):
+        return np.nan
+    t = (d - d.min()) / np.timedelta64(1, 'D') / 365.0
+
+    def vpn(r):
+        return np.sum(c * (1 + r) ** -t)
+
+    r = estimado
+    for _ in range(max_iter):
+        desc = (1 + r) ** -t
+        f    = np.sum(c * desc)
+        df   = np.sum(-t * c * desc / (1 + r))
+        if df == 0 or not np.isfinite(df): break
+        nuevo = r - f / df
+        if not np.isfinite(nuevo) or nuevo <= -1: break
+        if abs(nuevo - r) < tol:
+            return nuevo
+        r = nuevo
+
+    bajo, alto = -0.9999, 1e4
+    f_bajo, f_alto = vpn(bajo), vpn(alto)
+    if not (np.isfinite(f_bajo) and np.isfinite(f_alto)) or f_bajo * f_alto > 0:
+        return np.nan
+    for _ in range(200):
+        medio = (bajo + alto) / 2
+        f_medio = vpn(medio)
+        if abs(f_medio) < tol or (alto - bajo) < tol:
+            return medio
+        if f_bajo * f_medio < 0:
+            alto = medio
+        else:
+            bajo, f_bajo = medio, f_medio
+    return (bajo + alto) / 2
+
+def tir_cartera(df_ops, serie_dolar, valor_final, fecha_final, anual=True):
+    """
+    TIR de las operaciones con la cartera liquidada a `valor_final` en
+    `fecha_final`. Con anual=False se devuelve la tasa del período completo
+    (más legible que anualizar unas pocas semanas).
+    """
+    if df_ops.empty: return np.nan
+    montos = np.append(-flujos_operaciones(df_ops, serie_dolar).to_numpy(), valor_final)
+    fechas = pd.to_datetime(pd.Series(list(df_ops['fecha']) + [fecha_final]))
+    tasa   = xirr(montos, fechas)
+    if anual or np.isnan(tasa): return tasa
+    return (1 + tasa) ** ((fechas.max() - fechas.min()).days / 365.0) - 1
+
+def serie_rendimiento(valores, df_ops, serie_dolar):
+    """
+    A partir del valor diario (fechas × tickers, ver valorar): DataFrame por
+    rueda con valor total, flujo neto, retorno diario e índice TWR.
+    """
+    total  = valores.sum(axis=1)
+    flujos = flujos_diarios(df_ops, total.index, serie_dolar)
+    return pd.DataFrame({
+        'valor':   total,
+        'flujo':   flujos,
+        'retorno': retornos_twr(total, flujos),
+        'indice':  indice_twr(total, flujos),
+    })
@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+
+# ─────────────────────────────────────────────
+#  RIESGO — volatilidad, drawdown, ratios, beta
+# ─────────────────────────────────────────────
+# Todo sale de dos matrices que ya arma la valuación diaria: los retornos TWR
+# de la cartera (serie_rendimiento) y los precios en USD alineados por rueda.
+# Las cuentas son NumPy sobre arrays; pandas solo se usa para alinear fechas.
+
+RUEDAS_ANIO = 252
+
+def volatilidad_anual(retornos):
+    r = np.asarray(retornos, dtype=float)
+    r = r[~np.isnan(r)]
+    return float(np.std(r, ddof=1) * np.sqrt(RUEDAS_ANIO)) if len(r) > 1 else np.nan
+
+def curva_drawdown(indice):
+    """Caída desde el máximo previo (0 en máximos, negativa debajo del agua)."""
+    v = np.asarray(indice, dtype=float)
+    return pd.Series(v / np.fmax.accumulate(v) - 1, index=getattr(indice, 'index', None))
+
+def max_drawdown(indice):
+    """(caída máxima, fecha del pico, fecha del valle)."""
+    dd = curva_drawdown(indice).dropna()
+    if dd.empty: return np.nan, None, None
+    valle = dd.idxmin()
+    pico  = indice.loc[:valle].idxmax()
+    return float(dd.min()), pico, valle
+
+def sharpe(retornos, tasa_libre=0.0):
+    """Sharpe anualizado; `tasa_libre` es anual."""
+    r = np.asarray(retornos, dtype=float)
+    r = r[~np.isnan(r)] - tasa_libre / RUEDAS_ANIO
+    if len(r) < 2: return np.nan
+    desvio = np.std(r, ddof=1)
+    return float(np.mean(r) / desvio * np.sqrt(RUEDAS_ANIO)) if desvio > 0 else np.nan
+
+def sortino(retornos, tasa_libre=0.0):
+    """Como Sharpe pero penalizando solo el desvío a la baja."""
+    r = np.asarray(retornos, dtype=float)
+    r = r[~np.isnan(r)] - tasa_libre / RUEDAS_ANIO
+    if len(r) < 2: return np.nan
+    abajo = np.sqrt(np.mean(np.minimum(r, 0) ** 2))
+    return float(np.mean(r) / abajo * np.sqrt(RUEDAS_ANIO)) if abajo > 0 else np.nan
+
+def beta_correlacion(retornos, benchmarks):
+    """
+    Beta y correlación de la cartera contra cada benchmark (columnas de
+    calcular_benchmarks). Los índices se llevan a las ruedas de la cartera
+    con ffill antes de sacar retornos, así calendarios distintos no generan
+    retornos falsos; cada columna usa solo las fechas con dato en ambas.
+    """
+    cols = ['beta', 'correlacion', 'ruedas']
+    if benchmarks is None or benchmarks.empty or retornos.empty:
+        return pd.DataFrame(columns=cols)
+    alineados = benchmarks.reindex(retornos.index.union(benchmarks.index)).ffill().reindex(retornos.index)
+    rb = alineados.pct_change().to_numpy()
+    rp = retornos.to_numpy(dtype=float)[:, None]
+    ok = ~np.isnan(rb) & ~np.isnan(rp)
+    n  = ok.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        media_b = np.where(ok, rb, 0).sum(axis=0) / n
+        media_p = np.where(ok, rp, 0).sum(axis=0) / n
+        db = np.where(ok, rb - media_b, 0)
+        dp = np.where(ok, rp - media_p, 0)
+        cov   = (db * dp).sum(axis=0) / (n - 1)
+        var_b = (db ** 2).sum(axis=0) / (n - 1)
+        var_p = (dp ** 2).sum(axis=0) / (n - 1)
+        beta  = cov / var_b
+        corr  = cov / np.sqrt(var_b * var_p)
+    valido = n > 2
+    return pd.DataFrame({
+        'beta':        np.where(valido, beta, np.nan),
+        'correlacion': np.where(valido, corr, np.nan),
+        'ruedas':      n,
+    }, index=benchmarks.columns)
+
+def contribucion_riesgo(valores, precios_usd, ventana=RUEDAS_ANIO):
+    """
+    Aporte de cada posición a la volatilidad de la cartera con los pesos de
+    hoy y la covarianza de las últimas `ventana` ruedas:
+        contribución_i = w_i · (Σw)_i / σ_p      (suman σ_p)
+    """
+    cols = ['ticker', 'peso', 'volatilidad', 'contribucion', 'contribucion_%']
+    ultimo = valores.iloc[-1] if not valores.empty else pd.Series(dtype=float)
+    ultimo = ultimo[ultimo > 1e-9]
+    if ultimo.empty:
+        return pd.DataFrame(columns=cols)
+    tickers = list(ultimo.index)
+    w   = (ultimo / ultimo.sum()).to_numpy()
+    ret = precios_usd[tickers].ffill().pct_change().iloc[1:].tail(ventana).fillna(0).to_numpy()
+    if len(ret) < 2:
+        return pd.DataFrame(columns=cols)
+    sigma  = np.atleast_2d(np.cov(ret, rowvar=False)) * RUEDAS_ANIO
+    sw     = sigma @ w
+    vol_p  = np.sqrt(w @ sw)
+    contrib = w * sw / vol_p if vol_p > 0 else np.zeros_like(w)
+    return pd.DataFrame({
+        'ticker':         tickers,
+        'peso':           w,
+        'volatilidad':    np.sqrt(np.diag(sigma)),
+        'contribucion':   contrib,
+        'contribucion_%': contrib / vol_p * 100 if vol_p > 0 else contrib,
+    }).sort_values('contribucion', ascending=False, ignore_index=True)
+
+def metricas_riesgo(rendimiento, valores, precios_usd, benchmarks=None, tasa_libre=0.0):
+    """
+    Junta todo para una cartera. `rendimiento` es la salida de
+    serie_rendimiento; `valores` y `precios_usd` las matrices fechas × tickers.
+    Devuelve un dict con resumen, drawdown (serie), betas y contribuciones.
+    """
+    invertido = rendimiento['indice'].dropna()
+    retornos  = rendimiento['retorno'].loc[invertido.index].iloc[1:]
+    mdd, pico, valle = max_drawdown(invertido)
+    return {
+        'resumen': {
+            'volatilidad':  volatilidad_anual(retornos),
+            'max_drawdown': mdd,
+            'pico':         pico,
+            'valle':        valle,
+            'sharpe':       sharpe(retornos, tasa_libre),
+            'sortino':      sortino(retornos, tasa_libre),
+            'ruedas':       len(retornos),
+        },
+        'drawdown':       curva_drawdown(invertido),
+        'betas':          beta_correlacion(retornos, benchmarks),
+        'contribuciones': contribucion_riesgo(valores, precios_usd),
+    }
+
+
+# ─────────────────────────────────────────────
+#  CORRELACIÓN ENTRE TENENCIAS — varias ventanas
+# ─────────────────────────────────────────────
+# Todas las ventanas terminan hoy, así que la de 1A es la de 3M más las ruedas
+# anteriores: se recorre la matriz de retornos una sola vez desde el final y
+# se acumulan las sumas por bloques (productos de matrices N×N), cortando en
+# cada ventana. Cada ticker rinde entre sus propias ruedas (sin ffill, que
+# metería retornos 0 en los feriados de un mercado y sesgaría la correlación
+# hacia 0); con faltantes (tickers nuevos, calendarios distintos) las sumas
+# son por pares: cada par usa solo las ruedas con dato en ambos, y hacen falta
+# al menos MIN_RUEDAS_PAR en común.
+
+VENTANAS = {'3M': 63, '1A': 252, '3A': 756}
+MIN_RUEDAS_PAR = 20
+
+def _cov_corr(sxy, sx, sxx, n):
+    """Cov y corr por pares a partir de las sumas acumuladas (anualizada la cov)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov   = (sxy - sx * sx.T / n) / (n - 1)
+        var_i = (sxx - sx ** 2 / n) / (n - 1)          # var de i en las ruedas del par (i, j)
+        corr  = cov / np.sqrt(var_i * var_i.T)
+    invalido = n < MIN_RUEDAS_PAR
+    cov[invalido] = np.nan; corr[invalido] = np.nan
+    np.fill_diagonal(corr, np.where(np.diag(invalido), np.nan, 1.0))
+    return cov * RUEDAS_ANIO, np.clip(corr, -1, 1)
+
+def matrices_por_ventana(precios_usd, ventanas=VENTANAS):
+    """
+    {etiqueta: (cov_anual, corr)} para cada ventana de ruedas, como DataFrames
+    tickers × tickers. Los precios deben venir alineados por rueda (fechas × tickers).
+    """
+    tickers = list(precios_usd.columns)
+    propios = {t: precios_usd[t].dropna().pct_change() for t in tickers}   # rueda a rueda de cada uno
+    ret = pd.DataFrame(propios, index=precios_usd.index, columns=tickers).iloc[1:].to_numpy()[::-1]  # más reciente primero
+    m   = (~np.isnan(ret)).astype(float)
+    r0  = np.nan_to_num(ret)
+    k   = len(tickers)
+    sxy, sx, sxx, n = (np.zeros((k, k)) for _ in range(4))
+
+    resultado, hecho = {}, 0
+    for etiqueta, largo in sorted(ventanas.items(), key=lambda e: e[1]):
+        hasta = min(largo, len(r0))
+        if hasta > hecho:
+            b, mb = r0[hecho:hasta], m[hecho:hasta]
+            sxy += b.T @ b
+            sx  += b.T @ mb                               # Σ x_i donde j tiene dato
+            sxx += (b ** 2).T @ mb
+            n   += mb.T @ mb
+            hecho = hasta
+        cov, corr = _cov_corr(sxy, sx, sxx, n)
+        resultado[etiqueta] = (
+            pd.DataFrame(cov,  index=tickers, columns=tickers),
+            pd.DataFrame(corr, index=tickers, columns=tickers),
+        )
+    return resultado
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from analitica.fx import fx_en_fechas
+
+# ─────────────────────────────────────────────
+#  SERIES DIARIAS — tenencias, valuación, índices
+# ─────────────────────────────────────────────
+
+def matriz_tenencias(df_ops, indice):
+    """Cantidad de cada ticker al cierre de cada fecha de `indice` (fechas × tickers)."""
+    neta = df_ops['cantidad'].where(df_ops['tipo'] == 'Compra', -df_ops['cantidad'])
+    diaria = neta.groupby([pd.to_datetime(df_ops['fecha']), df_ops['ticker']]).sum().unstack(fill_value=0)
+    # as-of: una operación en día no hábil se refleja en la rueda siguiente
+    return diaria.sort_index().cumsum().reindex(indice, method='ffill').fillna(0)
+
+def precios_en_usd(precios, serie_dolar):
+    """Matriz de precios (fechas × tickers) con las columnas .BA pasadas a USD del día."""
+    precios = precios.copy()
+    ars = [t for t in precios.columns if t.endswith('.BA')]
+    if ars:
+        precios[ars] = precios[ars].div(fx_en_fechas(serie_dolar, precios.index), axis=0)
+    return precios
+
+def valorar(tenencias, precios, serie_dolar):
+    """
+    Valor en USD por rueda (fechas × tickers): tenencias × precios alineados,
+    con las columnas .BA divididas por el tipo de cambio de cada día.
+    """
+    precios = precios.reindex(index=tenencias.index, columns=tenencias.columns).ffill().fillna(0)
+    return tenencias * precios_en_usd(precios, serie_dolar)
+
+def indice_mezcla(precios, pesos):
+    """
+    Índice (base 1) de una cartera con pesos fijos rebalanceada a diario:
+    retornos diarios (fechas × tickers) @ pesos, acumulados.
+    """
+    cols = [tk for tk, _ in pesos]
+    w    = np.array([p for _, p in pesos])
+    ret  = precios[cols].ffill().pct_change().fillna(0).to_numpy()
+    idx  = np.cumprod(1 + ret @ w)
+    inicio = precios[cols].notna().all(axis=1).to_numpy().argmax()  # todas con dato
+    idx = idx / idx[inicio]
+    idx[:inicio] = np.nan
+    return pd.Series(idx, index=precios.index)
+
+def rendimiento_desde(precios, inicio):
+    """Recorta al período y renormaliza a % desde la primera cotización de cada columna."""
+    tramo = precios[precios.index >= pd.Timestamp(inicio)].ffill()
+    if tramo.empty: return tramo
+    base  = tramo.bfill().iloc[0]
+    return (tramo / base.where(base > 0) - 1) * 100
@@ -182,7 +182,7 @@ if st.session_state.user:
 else:
     # Hide sidebar on login screen
     st.markdown('<style>[data-testid="stSidebar"]{display:none!important}[data-testid="collapsedControl"]{display:none!important}</style>', unsafe_allow_html=True)
-    for p in ["Dashboard","Watchlist","Ingresos_y_Gastos","Análisis_Gráfico","Dividendos","Admin"]:
+    for p in ["Dashboard","Watchlist","Ingresos_y_Gastos","Análisis_Gráfico","Dividendos","Riesgo","Proyección","Rebalanceo","Portafolios","Búsqueda","Admin"]:
         ocultar_pagina(p)
 
 # ── LOGGED IN STATE ───────────────────────────────────────────────
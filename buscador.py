@@ -0,0 +1,76 @@
+import streamlit as st
+import pandas as pd
+from utils import _conectar
+from analitica import terminos_busqueda, patron_like
+
+# ─────────────────────────────────────────────
+#  BUSCADOR — tesis de la watchlist, movimientos y operaciones
+# ─────────────────────────────────────────────
+# Cada fuente tiene un texto buscable (una expresión SQL) con su índice GIN
+# trigram sobre esa misma expresión, así que los ILIKE '%término%' usan el
+# índice en vez de recorrer la tabla. Las tres fuentes van en una sola
+# consulta; cada término tiene que aparecer y el orden es por similitud.
+
+TEXTO_BUSQUEDA = {
+    'watchlist':           "(ticker || ' ' || COALESCE(notas, ''))",
+    'finanzas_personales': "(COALESCE(categoria, '') || ' ' || COALESCE(descripcion, ''))",
+    'operaciones':         "(ticker || ' ' || tipo || ' ' || COALESCE(moneda, ''))",
+}
+
+ESQUEMA_BUSQUEDA = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+    f"CREATE INDEX IF NOT EXISTS {tabla}_busqueda_trgm ON {tabla} USING gin ({expr} gin_trgm_ops)"
+    for tabla, expr in TEXTO_BUSQUEDA.items()
+]
+
+FUENTES = {'watchlist': 'Watchlist', 'finanzas_personales': 'Movimientos', 'operaciones': 'Operaciones'}
+
+# (columnas de salida: origen, id, fecha, titulo, texto, monto, moneda)
+SQL_FUENTE = {
+    'watchlist': """
+        SELECT 'watchlist' AS origen, id, NULL::date AS fecha, ticker AS titulo, notas AS texto,
+               precio_objetivo AS monto, NULL AS moneda, similarity({expr}, %s) AS score
+        FROM watchlist WHERE user_id = %s AND {filtro}""",
+    'finanzas_personales': """
+        SELECT 'finanzas_personales', id, fecha, tipo || ' · ' || categoria, descripcion,
+               monto, moneda, similarity({expr}, %s)
+        FROM finanzas_personales WHERE user_id = %s AND {filtro}""",
+    'operaciones': """
+        SELECT 'operaciones', id, fecha, ticker, tipo || ' ' || cantidad || ' @ ' || precio,
+               cantidad * precio, moneda, similarity({expr}, %s)
+        FROM operaciones WHERE user_id = %s AND {filtro}""",
+}
+
+@st.cache_resource
+def _asegurar_esquema():
+    conn = _conectar()
+    c = conn.cursor()
+    for ddl in ESQUEMA_BUSQUEDA:
+        c.execute(ddl)
+    conn.commit(); conn.close()
+    return True
+
+def buscar(user_id, consulta, fuentes=tuple(FUENTES), limite=50):
+    """
+    Coincidencias de todos los términos de `consulta` en las `fuentes`, hasta
+    `limite` por fuente y de mayor a menor similitud: origen, id, fecha,
+    titulo, texto, monto, moneda, score.
+    """
+    terminos = terminos_busqueda(consulta)
+    cols = ['origen', 'id', 'fecha', 'titulo', 'texto', 'monto', 'moneda', 'score']
+    if not terminos or not fuentes:
+        return pd.DataFrame(columns=cols)
+    _asegurar_esquema()
+
+    partes, params = [], []
+    for fuente in fuentes:
+        expr = TEXTO_BUSQUEDA[fuente]
+        filtro = ' AND '.join([f"{expr} ILIKE %s"] * len(terminos))
+        partes.append(f"({SQL_FUENTE[fuente].format(expr=expr, filtro=filtro)} ORDER BY 8 DESC LIMIT %s)")
+        params += [' '.join(terminos), user_id, *map(patron_like, terminos), limite]
+
+    conn = _conectar()
+    df = pd.read_sql_query(' UNION ALL '.join(partes), conn, params=params)
+    conn.close()
+    df.columns = cols
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return df
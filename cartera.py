@@ -0,0 +1,334 @@
+import streamlit as st
+import pandas as pd
+from psycopg2.extras import execute_values
+from utils import _conectar
+from datetime import date
+from mercado import (
+    precios_actuales, precios_cartera, valor_diario, serie_fx, calcular_benchmarks, inicio_benchmarks,
+    leer_dividendos, desfases_pago, leer_acciones_corporativas,
+)
+from analitica import (
+    calcular_posiciones, agrupar_operaciones, imputar_lotes, serie_rendimiento, precios_en_usd, metricas_riesgo,
+    ars_a_usd, resumen_dividendos, proyectar_calendario, dividendos_cobrados, ajustar_operaciones,
+    fx_en_fechas, indice_asof, precios_en_fecha, posiciones_asof,
+    moneda_ticker, valores_y_flujos, atribuir, agrupar_atribucion,
+    posiciones_por_portafolio, evolucion_por_portafolio, resumen_portafolios, tabla_mensual,
+)
+
+# ─────────────────────────────────────────────
+#  ESQUEMA — columnas agregadas a operaciones
+# ─────────────────────────────────────────────
+
+ESQUEMA_CARTERA = [
+    # compra a la que se imputa una venta (método "lote específico")
+    "ALTER TABLE operaciones ADD COLUMN IF NOT EXISTS lote_id INTEGER",
+    # pesos objetivo por ticker (portfolio_id NULL = vista consolidada)
+    """CREATE TABLE IF NOT EXISTS objetivos_asignacion (
+        id SERIAL PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        portfolio_id INTEGER,
+        ticker TEXT NOT NULL,
+        peso DOUBLE PRECISION NOT NULL
+    )""",
+]
+
+@st.cache_resource
+def _asegurar_esquema():
+    conn = _conectar()
+    c = conn.cursor()
+    for ddl in ESQUEMA_CARTERA:
+        c.execute(ddl)
+    conn.commit(); conn.close()
+    return True
+
+
+# ─────────────────────────────────────────────
+#  OPERACIONES — lectura compartida entre páginas
+# ─────────────────────────────────────────────
+# La caché se indexa por (usuario, portafolio, versión de datos). La versión es
+# una consulta mínima que cambia con cada alta, baja o reasignación de
+# portafolio, así que moverse entre páginas reutiliza el resultado y cualquier
+# cambio lo invalida sin tener que limpiar la caché a mano.
+
+def version_operaciones(user_id):
+    _asegurar_esquema()
+    conn = _conectar()
+    c = conn.cursor()
+    c.execute(
+        "SELECT COUNT(*), COALESCE(MAX(id), 0), COALESCE(SUM(COALESCE(portfolio_id, 0)), 0) "
+        "FROM operaciones WHERE user_id=%s",
+        (user_id,)
+    )
+    version = tuple(int(v) for v in c.fetchone())
+    conn.close()
+    return version
+
+@st.cache_data(ttl=3600)
+def _operaciones(user_id, portfolio_id, version):
+    conn = _conectar()
+    if portfolio_id is None:
+        df = pd.read_sql_query(
+            "SELECT * FROM operaciones WHERE user_id=%s ORDER BY fecha ASC",
+            conn, params=(user_id,)
+        )
+    else:
+        df = pd.read_sql_query(
+            "SELECT * FROM operaciones WHERE user_id=%s AND portfolio_id=%s ORDER BY fecha ASC",
+            conn, params=(user_id, portfolio_id)
+        )
+    conn.close()
+    if 'moneda' not in df.columns:
+        df['moneda'] = 'USD'
+    return df
+
+@st.cache_data(ttl=3600)
+def _operaciones_ajustadas(user_id, portfolio_id, version):
+    """Operaciones en unidades de hoy (splits y cambios de ticker, ver analitica.ajustes)."""
+    ops = _operaciones(user_id, portfolio_id, version)
+    if ops.empty: return ajustar_operaciones(ops, None)
+    acciones = leer_acciones_corporativas(ops['ticker'].unique().tolist(), pd.to_datetime(ops['fecha']).min())
+    return ajustar_operaciones(ops, acciones)
+
+def ver_operaciones(user_id, portfolio_id=None, ajustadas=True):
+    """
+    Operaciones del usuario. Por defecto ajustadas por splits para calcular
+    contra precios ajustados; ajustadas=False devuelve lo cargado tal cual.
+    """
+    version = version_operaciones(user_id)
+    if ajustadas:
+        return _operaciones_ajustadas(user_id, portfolio_id, version).copy()
+    return _operaciones(user_id, portfolio_id, version).copy()
+
+
+# ─────────────────────────────────────────────
+#  POSICIONES — cacheadas por versión de datos
+# ─────────────────────────────────────────────
+
+def metodo_costo():
+    """Método de imputación elegido en el Dashboard (compartido entre páginas)."""
+    return st.session_state.get('metodo_costo', 'fifo')
+
+@st.cache_data(ttl=600)
+def _posiciones(user_id, portfolio_id, version, precio_dolar, metodo):
+    ops = _operaciones_ajustadas(user_id, portfolio_id, version)
+    precios = {}
+    if not ops.empty:
+        pos = agrupar_operaciones(ops)
+        precios = precios_actuales(pos.loc[pos['cantidad_total'] > 0.000001, 'ticker'].unique().tolist())
+    return calcular_posiciones(ops, precios, precio_dolar, metodo)
+
+def ver_posiciones(user_id, portfolio_id, precio_dolar, metodo=None):
+    """(abiertas, realizadas) — ver analitica.calcular_posiciones."""
+    abiertas, realizadas = _posiciones(
+        user_id, portfolio_id, version_operaciones(user_id), precio_dolar, metodo or metodo_costo()
+    )
+    return abiertas.copy(), realizadas.copy()
+
+@st.cache_data(ttl=3600)
+def _lotes(user_id, portfolio_id, version, metodo):
+    return imputar_lotes(_operaciones_ajustadas(user_id, portfolio_id, version), metodo)
+
+def ver_lotes(user_id, portfolio_id, metodo=None):
+    """(lotes_abiertos, ventas) — ver analitica.imputar_lotes."""
+    lotes, ventas = _lotes(user_id, portfolio_id, version_operaciones(user_id), metodo or metodo_costo())
+    return lotes.copy(), ventas.copy()
+
+
+# ─────────────────────────────────────────────
+#  AS-OF — posiciones a una fecha pasada
+# ─────────────────────────────────────────────
+# El índice (acumulados por ticker, ver analitica.asof) se arma una vez por
+# versión de datos y método; cada fecha consultada es un searchsorted.
+
+@st.cache_data(ttl=3600)
+def _indice_asof(user_id, portfolio_id, version, metodo):
+    return indice_asof(_operaciones_ajustadas(user_id, portfolio_id, version), metodo)
+
+def ver_posiciones_asof(user_id, portfolio_id, fecha, metodo=None):
+    """
+    (abiertas, realizadas) al cierre de `fecha`, con el formato de
+    ver_posiciones: cierres de ese día y dólar de ese día.
+    """
+    version = version_operaciones(user_id)
+    metodo  = metodo or metodo_costo()
+    indice  = _indice_asof(user_id, portfolio_id, version, metodo)
+    ops     = _operaciones_ajustadas(user_id, portfolio_id, version)
+    precios = precios_en_fecha(precios_cartera(ops), fecha)
+    dolar   = float(fx_en_fechas(serie_fx(), [fecha])[0])
+    abiertas, realizadas = posiciones_asof(indice, fecha, precios, dolar)
+    return abiertas.copy(), realizadas.copy()
+
+
+# ─────────────────────────────────────────────
+#  RIESGO — cacheado por versión de datos
+# ─────────────────────────────────────────────
+
+@st.cache_data(ttl=600)
+def _riesgo(user_id, portfolio_id, version, definiciones, tasa_libre):
+    ops = _operaciones_ajustadas(user_id, portfolio_id, version)
+    serie_dolar = serie_fx()
+    valores = valor_diario(ops, serie_dolar)
+    if valores is None: return None
+    precios = precios_en_usd(precios_cartera(ops), serie_dolar)
+    bench   = calcular_benchmarks(inicio_benchmarks(pd.to_datetime(ops['fecha']).min()), definiciones)
+    return metricas_riesgo(serie_rendimiento(valores, ops, serie_dolar), valores, precios, bench, tasa_libre)
+
+def ver_riesgo(user_id, portfolio_id, definiciones=None, tasa_libre=0.0):
+    """Métricas de riesgo del portafolio (ver analitica.metricas_riesgo), o None sin datos."""
+    return _riesgo(user_id, portfolio_id, version_operaciones(user_id), definiciones, tasa_libre)
+
+
+# ─────────────────────────────────────────────
+#  CALENDARIO — retornos diarios y tabla mensual
+# ─────────────────────────────────────────────
+
+@st.cache_data(ttl=600)
+def _calendario(user_id, portfolio_id, version):
+    ops = _operaciones_ajustadas(user_id, portfolio_id, version)
+    serie_dolar = serie_fx()
+    valores = valor_diario(ops, serie_dolar)
+    if valores is None: return None
+    rend = serie_rendimiento(valores, ops, serie_dolar)
+    retornos = rend.loc[rend['indice'].notna(), 'retorno']      # desde la primera inversión
+    return {'diario': retornos, 'mensual': tabla_mensual(retornos)}
+
+def ver_calendario(user_id, portfolio_id):
+    """{'diario': retornos TWR por rueda, 'mensual': grilla año × mes}, o None sin datos."""
+    res = _calendario(user_id, portfolio_id, version_operaciones(user_id))
+    return None if res is None else {k: v.copy() for k, v in res.items()}
+
+# ─────────────────────────────────────────────
+#  ATRIBUCIÓN — matrices cacheadas, período en memoria
+# ─────────────────────────────────────────────
+# Valores y flujos por (portafolio, ticker) salen de los mismos cierres que
+# valor_diario; cambiar el período solo recorta filas, no descarga nada.
+
+@st.cache_data(ttl=600)
+def _valores_posicion(user_id, portfolio_id, version):
+    ops = _operaciones_ajustadas(user_id, portfolio_id, version)
+    precios = precios_cartera(ops)
+    if precios is None: return None
+    return valores_y_flujos(ops, precios, serie_fx())
+
+def ver_atribucion(user_id, portfolio_id, desde=None, hasta=None):
+    """
+    {'twr', 'posiciones', 'tickers', 'monedas', 'portafolios'} del período,
+    ver analitica.atribuir; None sin datos.
+    """
+    matrices = _valores_posicion(user_id, portfolio_id, version_operaciones(user_id))
+    if matrices is None: return None
+    detalle, twr = atribuir(*matrices, desde, hasta)
+    detalle['moneda'] = detalle['ticker'].map(moneda_ticker)
+    return {
+        'twr':         twr,
+        'posiciones':  detalle.sort_values('contribucion', ascending=False, ignore_index=True),
+        'tickers':     agrupar_atribucion(detalle, 'ticker'),
+        'monedas':     agrupar_atribucion(detalle, 'moneda'),
+        'portafolios': agrupar_atribucion(detalle, 'portfolio_id'),
+    }
+
+
+# ─────────────────────────────────────────────
+#  COMPARACIÓN — todos los portafolios en una pasada
+# ─────────────────────────────────────────────
+# Parte de las operaciones consolidadas (la misma caché que "Todos") y de las
+# matrices de la atribución; nada se recalcula por portafolio.
+
+@st.cache_data(ttl=600)
+def _comparacion(user_id, version, precio_dolar, metodo):
+    ops = _operaciones_ajustadas(user_id, None, version)
+    precios = {}
+    if not ops.empty:
+        pos = agrupar_operaciones(ops)
+        precios = precios_actuales(pos.loc[pos['cantidad_total'] > 0.000001, 'ticker'].unique().tolist())
+    abiertas, realizadas = posiciones_por_portafolio(ops, precios, precio_dolar, metodo)
+
+    matrices = _valores_posicion(user_id, None, version)
+    valor = indice = None
+    if matrices is not None:
+        valor, indice = evolucion_por_portafolio(*matrices)
+    return {
+        'resumen':  resumen_portafolios(abiertas, realizadas, ops, serie_fx(), indice),
+        'abiertas': abiertas,
+        'valor':    valor,
+        'indice':   indice,
+    }
+
+def ver_comparacion(user_id, precio_dolar, metodo=None):
+    """
+    {'resumen', 'abiertas', 'valor', 'indice'} de todos los portafolios del
+    usuario (portfolio_id 0 = sin asignar), ver analitica.comparacion.
+    """
+    res = _comparacion(user_id, version_operaciones(user_id), precio_dolar, metodo or metodo_costo())
+    return {k: (None if v is None else v.copy()) for k, v in res.items()}
+
+# ─────────────────────────────────────────────
+#  DIVIDENDOS — cobrados y calendario, desde el store
+# ─────────────────────────────────────────────
+# `dia` entra en la clave para que el calendario avance aunque no cambien
+# las operaciones.
+
+HISTORIA_DIVIDENDOS = 3     # años mínimos de eventos para estimar frecuencia
+
+@st.cache_data(ttl=3600)
+def _dividendos(user_id, portfolio_id, version, dia, precio_dolar, meses):
+    ops = _operaciones_ajustadas(user_id, portfolio_id, version)
+    hoy = pd.Timestamp(dia)
+    if ops.empty:
+        eventos = pd.DataFrame(columns=['ticker', 'fecha', 'monto'])
+    else:
+        desde   = min(pd.to_datetime(ops['fecha']).min(), hoy - pd.DateOffset(years=HISTORIA_DIVIDENDOS))
+        eventos = leer_dividendos(ops['ticker'].unique().tolist(), desde)
+
+    cobrados = dividendos_cobrados(ops, eventos)
+    cobrados['monto_usd'] = ars_a_usd(cobrados['monto'], cobrados['moneda'], cobrados['fecha'], serie_fx())
+
+    cantidades = {}
+    if not ops.empty:
+        pos = agrupar_operaciones(ops)
+        cantidades = pos[pos['cantidad_total'] > 0.000001].groupby('ticker')['cantidad_total'].sum().to_dict()
+    resumen    = resumen_dividendos(eventos, hoy)
+    calendario = proyectar_calendario(resumen, cantidades, meses, hoy, desfases_pago(list(cantidades)))
+    es_ars = (calendario['moneda'] == 'ARS').to_numpy()
+    calendario['monto_usd'] = calendario['monto'].where(~es_ars, calendario['monto'] / precio_dolar)
+    return {'cobrados': cobrados, 'resumen': resumen, 'calendario': calendario}
+
+def ver_dividendos(user_id, portfolio_id, precio_dolar, meses=12):
+    """
+    {'cobrados', 'resumen', 'calendario'} — ver analitica.dividendos. Los
+    proyectados de tickers .BA pasan a USD al dólar de hoy; los cobrados, al del día.
+    """
+    res = _dividendos(user_id, portfolio_id, version_operaciones(user_id), date.today().isoformat(),
+                      precio_dolar, meses)
+    return {k: v.copy() for k, v in res.items()}
+
+
+# ─────────────────────────────────────────────
+#  OBJETIVOS DE ASIGNACIÓN — para el rebalanceo
+# ─────────────────────────────────────────────
+
+def ver_objetivos(user_id, portfolio_id):
+    """{ticker: peso 0..1} guardado para el portafolio (None = consolidado)."""
+    _asegurar_esquema()
+    conn = _conectar()
+    df = pd.read_sql_query(
+        "SELECT ticker, peso FROM objetivos_asignacion "
+        "WHERE user_id=%s AND portfolio_id IS NOT DISTINCT FROM %s",
+        conn, params=(user_id, portfolio_id)
+    )
+    conn.close()
+    return dict(zip(df['ticker'], df['peso'].astype(float)))
+
+def guardar_objetivos(user_id, portfolio_id, objetivos):
+    """Reemplaza los objetivos del portafolio por `objetivos` ({ticker: peso})."""
+    _asegurar_esquema()
+    conn = _conectar()
+    c = conn.cursor()
+    c.execute(
+        "DELETE FROM objetivos_asignacion WHERE user_id=%s AND portfolio_id IS NOT DISTINCT FROM %s",
+        (user_id, portfolio_id)
+    )
+    filas = [(user_id, portfolio_id, tk, float(w)) for tk, w in objetivos.items() if w > 0]
+    if filas:
+        execute_values(c, "INSERT INTO objetivos_asignacion (user_id, portfolio_id, ticker, peso) VALUES %s", filas)
+    conn.commit(); conn.close()
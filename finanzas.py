@@ -0,0 +1,417 @@
+import streamlit as st
+import pandas as pd
+from datetime import date
+from psycopg2.extras import execute_values
+from utils import _conectar
+from mercado import serie_fx, actualizar_fx
+from analitica import (
+    DOLAR_ESTIMADO, ars_a_usd, ocurrencias, aprender_reglas, categorizar, marcar_duplicados, ritmo_presupuestos,
+)
+
+# ─────────────────────────────────────────────
+#  FINANZAS PERSONALES — lectura compartida entre páginas
+# ─────────────────────────────────────────────
+# Ingresos y Gastos escribe; la proyección (y cualquier otra página que
+# necesite el ahorro) lee desde acá con la misma conversión a USD.
+
+ESQUEMA_FINANZAS = [
+    # el detalle se pide por mes; los totales se agregan en la base
+    "CREATE INDEX IF NOT EXISTS finanzas_personales_user_fecha ON finanzas_personales (user_id, fecha)",
+    # reglas de movimientos periódicos (sueldo, alquiler, suscripciones)
+    """CREATE TABLE IF NOT EXISTS movimientos_recurrentes (
+        id SERIAL PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        tipo TEXT NOT NULL,
+        categoria TEXT NOT NULL,
+        monto DOUBLE PRECISION NOT NULL,
+        moneda TEXT NOT NULL DEFAULT 'ARS',
+        descripcion TEXT,
+        frecuencia TEXT NOT NULL,          -- ver analitica.FRECUENCIAS_RECURRENTES
+        inicio DATE NOT NULL,
+        fin DATE,
+        materializado_hasta DATE           -- última fecha ya insertada como movimiento
+    )""",
+    # ocurrencia materializada → regla que la generó
+    "ALTER TABLE finanzas_personales ADD COLUMN IF NOT EXISTS recurrente_id INTEGER",
+    # reglas de categorización para importar extractos
+    """CREATE TABLE IF NOT EXISTS reglas_categoria (
+        id SERIAL PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        patron TEXT NOT NULL,
+        es_regex BOOLEAN NOT NULL DEFAULT FALSE,
+        tipo TEXT,                         -- NULL: ingresos y gastos
+        categoria TEXT NOT NULL,
+        monto_min DOUBLE PRECISION,
+        monto_max DOUBLE PRECISION,
+        prioridad INTEGER NOT NULL DEFAULT 0
+    )""",
+    # presupuesto mensual en USD (solo categorías de gasto)
+    "ALTER TABLE categorias ADD COLUMN IF NOT EXISTS presupuesto DOUBLE PRECISION",
+]
+
+@st.cache_resource
+def _asegurar_esquema():
+    conn = _conectar()
+    c = conn.cursor()
+    for ddl in ESQUEMA_FINANZAS:
+        c.execute(ddl)
+    conn.commit(); conn.close()
+    return True
+
+def version_flujos(user_id):
+    """Cambia con cada alta o baja de movimientos (clave de las cachés de abajo)."""
+    _asegurar_esquema()
+    conn = _conectar()
+    c = conn.cursor()
+    c.execute(
+        "SELECT COUNT(*), COALESCE(MAX(id), 0), COALESCE(SUM(monto), 0) FROM finanzas_personales WHERE user_id=%s",
+        (user_id,)
+    )
+    version = tuple(float(v) for v in c.fetchone())
+    conn.close()
+    return version
+
+def ver_flujos(user_id):
+    conn = _conectar()
+    df = pd.read_sql_query(
+        "SELECT * FROM finanzas_personales WHERE user_id=%s ORDER BY fecha DESC",
+        conn, params=(user_id,)
+    )
+    conn.close()
+    return df
+
+def _a_usd(df):
+    if 'moneda' not in df.columns: df['moneda'] = 'ARS'
+    df['moneda'] = df['moneda'].fillna('ARS')
+    df['fecha']  = pd.to_datetime(df['fecha'])
+    df['monto_usd'] = ars_a_usd(df['monto'], df['moneda'], df['fecha'], serie_fx()) if not df.empty else []
+    return df
+
+def flujos_usd(user_id):
+    """Movimientos con fecha parseada y monto_usd al dólar de cada día."""
+    return _a_usd(ver_flujos(user_id))
+
+
+# ─────────────────────────────────────────────
+#  RESUMEN MENSUAL — agregado en la base
+# ─────────────────────────────────────────────
+# Una fila por (mes, tipo, categoría, moneda) con date_trunc; cada movimiento
+# en pesos se convierte al dólar de su día con un join as-of contra
+# tipo_cambio (antes del primer dato, el primero disponible), igual que
+# fx_en_fechas. La página solo baja el detalle del mes que se mira.
+
+_MONTO_USD = """CASE WHEN COALESCE(f.moneda, 'ARS') = 'ARS'
+                    THEN f.monto / COALESCE(fx.valor, primero.valor, %s)
+                    ELSE f.monto END"""
+
+_JOIN_FX = """
+    LEFT JOIN LATERAL (
+        SELECT valor FROM tipo_cambio t
+        WHERE t.tipo = 'cripto' AND t.fecha <= f.fecha
+        ORDER BY t.fecha DESC LIMIT 1
+    ) fx ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT valor FROM tipo_cambio t WHERE t.tipo = 'cripto' ORDER BY t.fecha ASC LIMIT 1
+    ) primero ON TRUE"""
+
+SQL_RESUMEN_MENSUAL = f"""
+    SELECT date_trunc('month', f.fecha)::date AS mes,
+           f.tipo, f.categoria, COALESCE(f.moneda, 'ARS') AS moneda,
+           SUM(f.monto) AS monto,
+           SUM({_MONTO_USD}) AS monto_usd,
+           COUNT(*) AS movimientos
+    FROM finanzas_personales f{_JOIN_FX}
+    WHERE f.user_id = %s
+    GROUP BY 1, 2, 3, 4
+    ORDER BY 1
+"""
+
+@st.cache_data(ttl=3600)
+def _resumen_mensual(user_id, version):
+    actualizar_fx()
+    conn = _conectar()
+    df = pd.read_sql_query(SQL_RESUMEN_MENSUAL, conn, params=(DOLAR_ESTIMADO, user_id))
+    conn.close()
+    df['mes'] = pd.to_datetime(df['mes'])
+    return df
+
+def resumen_mensual(user_id):
+    """mes, tipo, categoria, moneda, monto, monto_usd, movimientos."""
+    return _resumen_mensual(user_id, version_flujos(user_id)).copy()
+
+@st.cache_data(ttl=3600)
+def _movimientos_mes(user_id, version, mes):
+    inicio = pd.Timestamp(mes).to_period('M').start_time
+    fin    = inicio + pd.DateOffset(months=1)
+    conn = _conectar()
+    df = pd.read_sql_query(
+        "SELECT * FROM finanzas_personales WHERE user_id=%s AND fecha >= %s AND fecha < %s ORDER BY fecha DESC",
+        conn, params=(user_id, inicio.date(), fin.date())
+    )
+    conn.close()
+    return _a_usd(df)
+
+def movimientos_mes(user_id, mes):
+    """Detalle de un mes (como flujos_usd, solo esas filas)."""
+    return _movimientos_mes(user_id, version_flujos(user_id), pd.Timestamp(mes).strftime('%Y-%m')).copy()
+
+
+# ─────────────────────────────────────────────
+#  AHORRO
+# ─────────────────────────────────────────────
+
+def ahorro_por_mes(resumen):
+    """Ingresos − gastos de vida (los gastos 'Inversiones' no cuentan) por mes, en USD."""
+    if resumen.empty: return pd.Series(dtype=float)
+    signo = resumen['tipo'].map({'Ingreso': 1, 'Gasto': -1}).fillna(0)
+    vida  = ~((resumen['tipo'] == 'Gasto') & (resumen['categoria'] == 'Inversiones'))
+    neto  = (resumen['monto_usd'] * signo)[vida]
+    return neto.groupby(resumen.loc[vida, 'mes'].dt.to_period('M')).sum().sort_index()
+
+def ahorro_mensual_promedio(user_id, meses=12):
+    """Ahorro promedio de los últimos `meses` meses cerrados (los meses sin movimientos cuentan 0)."""
+    por_mes = ahorro_por_mes(resumen_mensual(user_id))
+    fin = pd.Timestamp.now().to_period('M') - 1
+    rango = pd.period_range(fin - meses + 1, fin, freq='M')
+    return float(por_mes.reindex(rango, fill_value=0).mean()) if not por_mes.empty else 0.0
+
+
+# ─────────────────────────────────────────────
+#  RECURRENTES — materialización por lotes
+# ─────────────────────────────────────────────
+# Lo vencido (hasta hoy) se inserta como movimientos reales en un único
+# INSERT multi-fila y cada regla recuerda hasta dónde llegó; lo que viene no
+# se guarda: proyectar_recurrentes lo calcula al vuelo para los gráficos.
+
+COLS_RECURRENTES = ['id', 'tipo', 'categoria', 'monto', 'moneda', 'descripcion',
+                    'frecuencia', 'inicio', 'fin', 'materializado_hasta']
+
+def ver_recurrentes(user_id):
+    _asegurar_esquema()
+    conn = _conectar()
+    df = pd.read_sql_query(
+        f"SELECT {', '.join(COLS_RECURRENTES)} FROM movimientos_recurrentes WHERE user_id=%s ORDER BY inicio",
+        conn, params=(user_id,)
+    )
+    conn.close()
+    return df
+
+def anadir_recurrente(user_id, tipo, categoria, monto, moneda, descripcion, frecuencia, inicio, fin=None):
+    _asegurar_esquema()
+    conn = _conectar()
+    conn.cursor().execute(
+        "INSERT INTO movimientos_recurrentes "
+        "(user_id, tipo, categoria, monto, moneda, descripcion, frecuencia, inicio, fin) "
+        "VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)",
+        (user_id, tipo, categoria, monto, moneda, descripcion, frecuencia, inicio, fin)
+    )
+    conn.commit(); conn.close()
+
+def eliminar_recurrente(regla_id, user_id):
+    """Borra la regla; los movimientos ya materializados quedan."""
+    conn = _conectar()
+    conn.cursor().execute(
+        "DELETE FROM movimientos_recurrentes WHERE id=%s AND user_id=%s", (regla_id, user_id)
+    )
+    conn.commit(); conn.close()
+
+def materializar_recurrentes(user_id, hasta=None):
+    """Inserta las ocurrencias vencidas hasta `hasta` (hoy). Devuelve cuántas se agregaron."""
+    _asegurar_esquema()
+    hasta = pd.Timestamp(hasta or date.today()).normalize()
+    conn = _conectar()
+    c = conn.cursor()
+    try:
+        # bloquea las reglas pendientes: dos sesiones no materializan lo mismo
+        c.execute(
+            f"SELECT {', '.join(COLS_RECURRENTES)} FROM movimientos_recurrentes "
+            "WHERE user_id=%s AND (materializado_hasta IS NULL OR materializado_hasta < %s) FOR UPDATE",
+            (user_id, hasta.date())
+        )
+        reglas = pd.DataFrame(c.fetchall(), columns=COLS_RECURRENTES)
+        if reglas.empty:
+            conn.rollback()
+            return 0
+        nuevas = ocurrencias(reglas, hasta)
+        if not nuevas.empty:
+            execute_values(
+                c,
+                "INSERT INTO finanzas_personales "
+                "(fecha, tipo, categoria, monto, descripcion, moneda, user_id, recurrente_id) VALUES %s",
+                [(f.date(), t, cat, float(m), d, mon, user_id, int(rid)) for rid, f, t, cat, m, mon, d in
+                 nuevas[['recurrente_id', 'fecha', 'tipo', 'categoria', 'monto', 'moneda', 'descripcion']]
+                 .itertuples(index=False)],
+                page_size=1000
+            )
+        execute_values(
+            c,
+            "UPDATE movimientos_recurrentes r SET materializado_hasta = v.hasta "
+            "FROM (VALUES %s) AS v(id, hasta) WHERE r.id = v.id",
+            [(int(i), hasta.date()) for i in reglas['id']], template="(%s, %s::date)"
+        )
+        conn.commit()
+        return len(nuevas)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def proyectar_recurrentes(user_id, hasta, desde=None):
+    """Ocurrencias futuras en (desde=hoy, hasta], sin guardarlas, con monto_usd al dólar de hoy."""
+    reglas = ver_recurrentes(user_id)
+    proy = ocurrencias(reglas, hasta, desde=pd.Timestamp(desde or date.today()))
+    proy['monto_usd'] = ars_a_usd(proy['monto'], proy['moneda'], [pd.Timestamp.now()] * len(proy), serie_fx()) \
+        if not proy.empty else []
+    return proy
+
+
+# ─────────────────────────────────────────────
+#  IMPORTAR EXTRACTOS — reglas + carga en bloque
+# ─────────────────────────────────────────────
+# Primero las reglas del usuario; donde ninguna aplica, la categoría
+# aprendida del historial (la más usada para esa descripción). La carga es
+# un único INSERT multi-fila.
+
+def ver_reglas(user_id):
+    _asegurar_esquema()
+    conn = _conectar()
+    df = pd.read_sql_query(
+        "SELECT id, patron, es_regex, tipo, categoria, monto_min, monto_max, prioridad "
+        "FROM reglas_categoria WHERE user_id=%s ORDER BY prioridad DESC, id",
+        conn, params=(user_id,)
+    )
+    conn.close()
+    return df
+
+def guardar_regla(user_id, patron, es_regex, tipo, categoria, monto_min=None, monto_max=None, prioridad=0):
+    _asegurar_esquema()
+    conn = _conectar()
+    conn.cursor().execute(
+        "INSERT INTO reglas_categoria (user_id, patron, es_regex, tipo, categoria, monto_min, monto_max, prioridad) "
+        "VALUES (%s,%s,%s,%s,%s,%s,%s,%s)",
+        (user_id, patron, es_regex, tipo, categoria, monto_min, monto_max, prioridad)
+    )
+    conn.commit(); conn.close()
+
+def eliminar_regla(regla_id, user_id):
+    conn = _conectar()
+    conn.cursor().execute("DELETE FROM reglas_categoria WHERE id=%s AND user_id=%s", (regla_id, user_id))
+    conn.commit(); conn.close()
+
+@st.cache_data(ttl=3600)
+def _historial_descripciones(user_id, version):
+    conn = _conectar()
+    df = pd.read_sql_query(
+        "SELECT descripcion, tipo, categoria, COUNT(*) AS veces FROM finanzas_personales "
+        "WHERE user_id=%s AND COALESCE(descripcion, '') <> '' GROUP BY 1, 2, 3",
+        conn, params=(user_id,)
+    )
+    conn.close()
+    return df
+
+def categorizar_extracto(user_id, extracto):
+    """Extracto de leer_extracto con 'categoria' sugerida y 'duplicado' (ya cargado)."""
+    aprendidas = aprender_reglas(_historial_descripciones(user_id, version_flujos(user_id)))
+    df = extracto.copy()
+    df['categoria'] = categorizar(df, ver_reglas(user_id), aprendidas)
+    if df.empty:
+        df['duplicado'] = False
+        return df
+    conn = _conectar()
+    existentes = pd.read_sql_query(
+        "SELECT fecha, tipo, monto, descripcion FROM finanzas_personales "
+        "WHERE user_id=%s AND fecha BETWEEN %s AND %s",
+        conn, params=(user_id, df['fecha'].min().date(), df['fecha'].max().date())
+    )
+    conn.close()
+    df['duplicado'] = marcar_duplicados(df, existentes)
+    return df
+
+def importar_movimientos(user_id, df, moneda):
+    """Inserta las líneas (fecha, tipo, categoria, monto, descripcion) en un solo INSERT. Devuelve cuántas."""
+    if df.empty:
+        return 0
+    conn = _conectar()
+    execute_values(
+        conn.cursor(),
+        "INSERT INTO finanzas_personales (fecha, tipo, categoria, monto, descripcion, moneda, user_id) VALUES %s",
+        [(pd.Timestamp(f).date(), t, c, float(m), d, moneda, user_id) for f, t, c, m, d in
+         df[['fecha', 'tipo', 'categoria', 'monto', 'descripcion']].itertuples(index=False)],
+        page_size=1000
+    )
+    conn.commit(); conn.close()
+    return len(df)
+
+
+# ─────────────────────────────────────────────
+#  PRESUPUESTOS — gasto del mes contra el presupuesto
+# ─────────────────────────────────────────────
+# La base devuelve el gasto del mes por (día, categoría) con un rango sobre
+# el índice (user_id, fecha), no todo el historial; se cachea por versión y
+# los acumulados salen de esa grilla.
+
+SQL_GASTO_DIARIO = f"""
+    SELECT f.fecha, f.categoria,
+           SUM({_MONTO_USD}) AS monto_usd,
+           COALESCE(SUM({_MONTO_USD}) FILTER (WHERE f.recurrente_id IS NOT NULL), 0) AS recurrente_usd
+    FROM finanzas_personales f{_JOIN_FX}
+    WHERE f.user_id = %s AND f.tipo = 'Gasto' AND f.fecha >= %s AND f.fecha < %s
+    GROUP BY 1, 2
+    ORDER BY 1
+"""
+
+def ver_presupuestos(user_id):
+    """{categoría de gasto: presupuesto mensual en USD}."""
+    _asegurar_esquema()
+    conn = _conectar()
+    df = pd.read_sql_query(
+        "SELECT nombre, presupuesto FROM categorias WHERE user_id=%s AND tipo='Gasto' AND presupuesto > 0",
+        conn, params=(user_id,)
+    )
+    conn.close()
+    return dict(zip(df['nombre'], df['presupuesto'].astype(float)))
+
+def guardar_presupuesto(user_id, categoria, monto):
+    """Fija (o con 0 / None, quita) el presupuesto; crea la fila si la categoría es de las por defecto."""
+    _asegurar_esquema()
+    monto = float(monto) if monto else None
+    conn = _conectar()
+    c = conn.cursor()
+    c.execute(
+        "UPDATE categorias SET presupuesto=%s WHERE user_id=%s AND tipo='Gasto' AND nombre=%s",
+        (monto, user_id, categoria)
+    )
+    if c.rowcount == 0 and monto is not None:
+        c.execute(
+            "INSERT INTO categorias (user_id, tipo, nombre, presupuesto) VALUES (%s,'Gasto',%s,%s)",
+            (user_id, categoria, monto)
+        )
+    conn.commit(); conn.close()
+
+@st.cache_data(ttl=3600)
+def _gasto_diario(user_id, version, mes):
+    inicio = pd.Timestamp(mes).to_period('M').start_time
+    fin    = inicio + pd.DateOffset(months=1)
+    actualizar_fx()
+    conn = _conectar()
+    df = pd.read_sql_query(
+        SQL_GASTO_DIARIO, conn,
+        params=(DOLAR_ESTIMADO, DOLAR_ESTIMADO, user_id, inicio.date(), fin.date())
+    )
+    conn.close()
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return df
+
+def gasto_diario(user_id, mes=None):
+    """fecha, categoria, monto_usd, recurrente_usd de los gastos del mes (hoy por defecto)."""
+    mes = pd.Timestamp(mes or date.today()).strftime('%Y-%m')
+    return _gasto_diario(user_id, version_flujos(user_id), mes).copy()
+
+def estado_presupuestos(user_id, hoy=None):
+    """(ritmo por categoría con presupuesto, gasto diario del mes) — ver analitica.ritmo_presupuestos."""
+    hoy = pd.Timestamp(hoy or date.today()).normalize()
+    diario = gasto_diario(user_id, hoy)
+    pend = proyectar_recurrentes(user_id, hoy + pd.offsets.MonthEnd(0), desde=hoy)
+    pend = pend[pend['tipo'] == 'Gasto'].groupby('categoria')['monto_usd'].sum() if not pend.empty else None
+    return ritmo_presupuestos(diario, ver_presupuestos(user_id), hoy, pend), diario
@@ -0,0 +1,905 @@
+import streamlit as st
+import pandas as pd
+import requests
+import threading
+import yfinance as yf
+from datetime import date, timedelta
+from psycopg2.extras import execute_values
+from utils import _conectar
+from analitica import (
+    DOLAR_ESTIMADO, matriz_tenencias, valorar, precios_en_usd, indice_mezcla, VENTANAS, matrices_por_ventana,
+    retornos_cartera, simular_trayectorias, completar_cedears, cedears_incompletos, cotizaciones_cedears,
+)
+
+# ─────────────────────────────────────────────
+#  ESQUEMA — tablas de datos de mercado
+# ─────────────────────────────────────────────
+
+ESQUEMA_MERCADO = [
+    """
+    CREATE TABLE IF NOT EXISTS tipo_cambio (
+        fecha  DATE NOT NULL,
+        tipo   TEXT NOT NULL,              -- 'cripto' | 'mep' | 'ccl'
+        valor  DOUBLE PRECISION NOT NULL,  -- ARS por USD (venta)
+        fuente TEXT,
+        PRIMARY KEY (fecha, tipo)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fundamentales (
+        ticker         TEXT PRIMARY KEY,
+        pe             DOUBLE PRECISION,
+        min52          DOUBLE PRECISION,
+        max52          DOUBLE PRECISION,
+        dividend_rate  DOUBLE PRECISION,
+        dividend_yield DOUBLE PRECISION,
+        ex_dividend    DATE,
+        pago_dividend  DATE,
+        actualizado    DATE NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS precios_historicos (
+        ticker TEXT NOT NULL,
+        fecha  DATE NOT NULL,
+        cierre DOUBLE PRECISION NOT NULL,   -- ajustado (auto_adjust)
+        PRIMARY KEY (ticker, fecha)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS precios_cobertura (
+        ticker TEXT PRIMARY KEY,
+        desde  DATE NOT NULL,               -- rango ya pedido a Yahoo
+        hasta  DATE NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dividendos_historicos (
+        ticker TEXT NOT NULL,
+        fecha  DATE NOT NULL,               -- fecha ex-dividend
+        monto  DOUBLE PRECISION NOT NULL,   -- por acción, moneda del ticker
+        PRIMARY KEY (ticker, fecha)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dividendos_cobertura (
+        ticker      TEXT PRIMARY KEY,
+        desde       DATE NOT NULL,
+        actualizado DATE NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS acciones_corporativas (
+        ticker       TEXT NOT NULL,
+        fecha        DATE NOT NULL,             -- fecha ex (split) o de vigencia (cambio)
+        tipo         TEXT NOT NULL,             -- 'split' | 'cambio_ticker'
+        factor       DOUBLE PRECISION,          -- acciones nuevas por cada vieja (0.1 = 1:10)
+        nuevo_ticker TEXT,
+        manual       BOOLEAN NOT NULL DEFAULT FALSE,
+        PRIMARY KEY (ticker, fecha, tipo)
+    )
+    """,
+    # la cobertura de dividendos pasa a cubrir todos los eventos de Yahoo;
+    # lo bajado antes de guardar splits se vuelve a pedir una vez
+    "ALTER TABLE dividendos_cobertura ADD COLUMN IF NOT EXISTS splits BOOLEAN NOT NULL DEFAULT FALSE",
+    """
+    CREATE TABLE IF NOT EXISTS cedears (
+        ticker     TEXT PRIMARY KEY,        -- listado local, p. ej. AAPL.BA
+        subyacente TEXT NOT NULL,           -- acción en EE.UU., p. ej. AAPL
+        ratio      DOUBLE PRECISION NOT NULL -- CEDEARs por acción subyacente
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS benchmarks_usuario (
+        id          SERIAL PRIMARY KEY,
+        user_id     INTEGER NOT NULL,
+        nombre      TEXT NOT NULL,
+        composicion TEXT NOT NULL           -- 'SPY:60, AGG:40' o un solo ticker
+    )
+    """,
+]
+
+@st.cache_resource
+def _asegurar_esquema():
+    """Crea las tablas de mercado si no existen. Corre una vez por proceso."""
+    conn = _conectar()
+    c = conn.cursor()
+    for ddl in ESQUEMA_MERCADO:
+        c.execute(ddl)
+    conn.commit(); conn.close()
+    return True
+
+
+# ─────────────────────────────────────────────
+#  TIPO DE CAMBIO — fuentes intercambiables
+# ─────────────────────────────────────────────
+
+# tipo interno → "casa" en las APIs de dólar argentinas
+TIPOS_FX = {'cripto': 'cripto', 'mep': 'bolsa', 'ccl': 'contadoconliqui'}
+
+def _fx_argentinadatos(tipo, desde):
+    """Cierres posteriores a `desde`: una sola llamada a la serie completa, filtrada acá."""
+    if desde is not None and desde >= date.today():
+        return pd.DataFrame(columns=['fecha', 'valor'])
+    r = requests.get(f"https://api.argentinadatos.com/v1/cotizaciones/dolares/{TIPOS_FX[tipo]}", timeout=10)
+    r.raise_for_status()
+    df = pd.DataFrame(r.json())
+    if df.empty: return pd.DataFrame(columns=['fecha', 'valor'])
+    df['fecha'] = pd.to_datetime(df['fecha']).dt.date
+    if desde is not None:
+        df = df[df['fecha'] > desde]
+    return df[['fecha', 'venta']].rename(columns={'venta': 'valor'}).dropna()
+
+def _fx_dolarapi(tipo, desde):
+    """Cotización del día; sirve para completar el último dato intradiario."""
+    r = requests.get(f"https://dolarapi.com/v1/dolares/{TIPOS_FX[tipo]}", timeout=5)
+    r.raise_for_status()
+    data = r.json()
+    fecha = pd.to_datetime(data.get('fechaActualizacion') or date.today()).date()
+    return pd.DataFrame([{'fecha': fecha, 'valor': float(data['venta'])}])
+
+# Se consultan en orden; cada una puede devolver filas nuevas o pisar el último día.
+FUENTES_FX = {
+    'ArgentinaDatos': _fx_argentinadatos,
+    'DolarApi':       _fx_dolarapi,
+}
+# Las intradiarias nunca pisan un cierre y su fila se reemplaza cuando llega el cierre.
+FUENTES_FX_INTRADIARIAS = {'DolarApi'}
+
+def registrar_fuente_fx(nombre, fn, intradiaria=False):
+    """Agrega una fuente `fn(tipo, desde) -> DataFrame[fecha, valor]`."""
+    FUENTES_FX[nombre] = fn
+    if intradiaria:
+        FUENTES_FX_INTRADIARIAS.add(nombre)
+
+def _ultima_fecha_fx(cursor, tipo):
+    """Último día con cierre guardado (los datos intradiarios no cuentan)."""
+    cursor.execute(
+        "SELECT MAX(fecha) FROM tipo_cambio WHERE tipo=%s AND COALESCE(fuente, '') <> ALL(%s)",
+        (tipo, sorted(FUENTES_FX_INTRADIARIAS))
+    )
+    return cursor.fetchone()[0]
+
+@st.cache_data(ttl=3600)
+def actualizar_fx():
+    """Ingesta incremental: solo pide lo posterior al último día guardado."""
+    _asegurar_esquema()
+    conn = _conectar()
+    c = conn.cursor()
+    try:
+        for tipo in TIPOS_FX:
+            desde = _ultima_fecha_fx(c, tipo)
+            for nombre, fuente in FUENTES_FX.items():
+                try:
+                    nuevas = fuente(tipo, desde)
+                except Exception:
+                    continue
+                if nuevas.empty: continue
+                c.executemany(
+                    "INSERT INTO tipo_cambio (fecha, tipo, valor, fuente) VALUES (%s,%s,%s,%s) "
+                    "ON CONFLICT (fecha, tipo) DO UPDATE SET valor=EXCLUDED.valor, fuente=EXCLUDED.fuente "
+                    "WHERE NOT %s OR tipo_cambio.fuente = ANY(%s)",
+                    [(f, tipo, float(v), nombre, nombre in FUENTES_FX_INTRADIARIAS, sorted(FUENTES_FX_INTRADIARIAS))
+                     for f, v in zip(nuevas['fecha'], nuevas['valor'])]
+                )
+                conn.commit()
+    except Exception:
+        conn.rollback()
+    finally:
+        conn.close()
+    return pd.Timestamp.now()
+
+@st.cache_data(ttl=3600)
+def serie_fx(tipo='cripto'):
+    """
+    Serie diaria ARS/USD indexada por fecha (días corridos hasta hoy, ffill).
+    Vacía si todavía no hay datos.
+    """
+    actualizar_fx()
+    conn = _conectar()
+    try:
+        df = pd.read_sql_query(
+            "SELECT fecha, valor FROM tipo_cambio WHERE tipo=%s ORDER BY fecha ASC",
+            conn, params=(tipo,)
+        )
+    except Exception:
+        df = pd.DataFrame(columns=['fecha', 'valor'])
+    conn.close()
+    if df.empty:
+        return pd.Series(dtype=float, name=tipo)
+    s = pd.Series(df['valor'].astype(float).values, index=pd.to_datetime(df['fecha']), name=tipo)
+    rango = pd.date_range(start=s.index.min(), end=max(s.index.max(), pd.Timestamp(date.today())))
+    return s.reindex(rango).ffill()
+
+@st.cache_data(ttl=3600)
+def dolar_actual(tipo='cripto'):
+    """(precio, fuente) del último dato guardado; estimado si no hay store."""
+    actualizar_fx()
+    conn = _conectar()
+    try:
+        c = conn.cursor()
+        c.execute(
+            "SELECT valor, fuente FROM tipo_cambio WHERE tipo=%s ORDER BY fecha DESC LIMIT 1", (tipo,)
+        )
+        row = c.fetchone()
+    except Exception:
+        row = None
+    conn.close()
+    if not row:
+        return DOLAR_ESTIMADO, "Estimado"
+    return float(row[0]), row[1] or "Store"
+
+
+# ─────────────────────────────────────────────
+#  FUNDAMENTALES — refresco diario en segundo plano
+# ─────────────────────────────────────────────
+# P/E, rango 52 semanas y datos de dividendos cambian a lo sumo una vez por día.
+# Las páginas leen solo de la tabla; el refresco corre en un hilo aparte.
+
+COLUMNAS_FUNDAMENTALES = [
+    'pe', 'min52', 'max52', 'dividend_rate', 'dividend_yield', 'ex_dividend', 'pago_dividend'
+]
+
+def _fecha_o_none(valor):
+    if valor is None: return None
+    if isinstance(valor, (list, tuple)):
+        valor = valor[0] if valor else None
+    try:
+        return pd.to_datetime(valor).date() if valor is not None else None
+    except Exception:
+        return None
+
+def _descargar_fundamentales(ticker):
+    obj  = yf.Ticker(ticker)
+    info = obj.info or {}
+    try:
+        cal = obj.calendar or {}
+    except Exception:
+        cal = {}
+    return (
+        ticker,
+        info.get('trailingPE'),
+        info.get('fiftyTwoWeekLow'),
+        info.get('fiftyTwoWeekHigh'),
+        info.get('dividendRate') or 0,
+        info.get('dividendYield') or 0,
+        _fecha_o_none(cal.get('Ex-Dividend Date')),
+        _fecha_o_none(cal.get('Dividend Date')),
+        date.today(),
+    )
+
+def _tickers_en_uso():
+    conn = _conectar()
+    df = pd.read_sql_query(
+        "SELECT DISTINCT ticker FROM operaciones UNION SELECT DISTINCT ticker FROM watchlist", conn
+    )
+    conn.close()
+    return df['ticker'].dropna().tolist()
+
+def refrescar_fundamentales(tickers=None):
+    """Actualiza en bloque los tickers vencidos (sin dato de hoy). Sin tickers: todos los en uso."""
+    _asegurar_esquema()
+    if tickers is None:
+        tickers = _tickers_en_uso()
+    if not tickers: return 0
+    conn = _conectar()
+    c = conn.cursor()
+    c.execute(
+        "SELECT ticker FROM fundamentales WHERE ticker = ANY(%s) AND actualizado >= %s",
+        (list(tickers), date.today())
+    )
+    frescos  = {r[0] for r in c.fetchall()}
+    vencidos = [t for t in tickers if t not in frescos]
+    filas = []
+    for t in vencidos:
+        try:
+            filas.append(_descargar_fundamentales(t))
+        except Exception:
+            pass
+    if filas:
+        cols = ", ".join(COLUMNAS_FUNDAMENTALES)
+        upd  = ", ".join(f"{col}=EXCLUDED.{col}" for col in COLUMNAS_FUNDAMENTALES + ['actualizado'])
+        c.executemany(
+            f"INSERT INTO fundamentales (ticker, {cols}, actualizado) VALUES ({', '.join(['%s'] * 9)}) "
+            f"ON CONFLICT (ticker) DO UPDATE SET {upd}",
+            filas
+        )
+        conn.commit()
+    conn.close()
+    return len(filas)
+
+_refresco_lock = threading.Lock()
+
+def _refrescar_en_segundo_plano(tickers=None):
+    def _tarea():
+        if not _refresco_lock.acquire(blocking=False): return
+        try:
+            refrescar_fundamentales(tickers)
+        except Exception:
+            pass
+        finally:
+            _refresco_lock.release()
+    threading.Thread(target=_tarea, daemon=True).start()
+
+@st.cache_resource
+def _refresco_diario(dia):
+    """Una sola pasada completa por día y por proceso."""
+    _refrescar_en_segundo_plano()
+    return dia
+
+@st.cache_data(ttl=600)
+def leer_fundamentales(tickers):
+    """DataFrame indexado por ticker con lo último guardado (puede faltar algún ticker)."""
+    _asegurar_esquema()
+    conn = _conectar()
+    df = pd.read_sql_query(
+        "SELECT * FROM fundamentales WHERE ticker = ANY(%s)", conn, params=(list(tickers),)
+    )
+    conn.close()
+    return df.set_index('ticker')
+
+def obtener_fundamentales(tickers):
+    """Lectura para las páginas: nunca llama a Yahoo; agenda el refresco de lo que falte."""
+    tickers = list(tickers)
+    _refresco_diario(date.today().isoformat())
+    df = leer_fundamentales(tickers)
+    faltantes = [t for t in tickers if t not in df.index]
+    if faltantes:
+        _refrescar_en_segundo_plano(faltantes)
+    return df
+
+
+# ─────────────────────────────────────────────
+#  PRECIOS HISTÓRICOS — store local compartido
+# ─────────────────────────────────────────────
+# Cada instrumento se descarga una sola vez; después solo se piden los días nuevos
+# (o el tramo anterior si alguien necesita más historia). Todo lo que falta se
+# agrupa por fecha de inicio y se pide en un único yf.download por grupo.
+
+def _descargar_cierres(tickers, start):
+    raw = yf.download(tickers, start=start, progress=False, auto_adjust=True)
+    if raw.empty: return pd.DataFrame()
+    if isinstance(raw.columns, pd.MultiIndex):
+        close = raw['Close']
+    else:
+        close = raw[['Close']].rename(columns={'Close': tickers[0]})
+    return close[~close.index.duplicated(keep='first')]
+
+def actualizar_precios(tickers, desde):
+    """Completa el store para `tickers` desde `desde` hasta hoy."""
+    _asegurar_esquema()
+    tickers = sorted(set(tickers))
+    if not tickers: return
+    desde = pd.Timestamp(desde).date()
+    hoy   = date.today()
+    conn = _conectar()
+    c = conn.cursor()
+    c.execute(
+        "SELECT ticker, desde, hasta FROM precios_cobertura WHERE ticker = ANY(%s)", (tickers,)
+    )
+    cobertura = {t: (d, h) for t, d, h in c.fetchall()}
+
+    # inicio de descarga por ticker → agrupado para pedir todo junto
+    grupos = {}
+    for t in tickers:
+        cov = cobertura.get(t)
+        if cov is None or cov[0] > desde:
+            inicio = desde
+        elif cov[1] < hoy:
+            inicio = cov[1] - timedelta(days=3)  # re-pide el último tramo por ajustes/cierres tardíos
+        else:
+            continue
+        grupos.setdefault(inicio, []).append(t)
+
+    try:
+        for inicio, grupo in grupos.items():
+            try:
+                close = _descargar_cierres(grupo, inicio)
+            except Exception:
+                continue
+            filas = []
+            for t in grupo:
+                if t not in close.columns: continue
+                s = close[t].dropna()
+                filas.extend((t, f.date(), float(v)) for f, v in zip(s.index, s.values))
+            if filas:
+                execute_values(
+                    c,
+                    "INSERT INTO precios_historicos (ticker, fecha, cierre) VALUES %s "
+                    "ON CONFLICT (ticker, fecha) DO UPDATE SET cierre=EXCLUDED.cierre",
+                    filas, page_size=1000
+                )
+            execute_values(
+                c,
+                "INSERT INTO precios_cobertura (ticker, desde, hasta) VALUES %s "
+                "ON CONFLICT (ticker) DO UPDATE SET "
+                "desde=LEAST(precios_cobertura.desde, EXCLUDED.desde), "
+                "hasta=GREATEST(precios_cobertura.hasta, EXCLUDED.hasta)",
+                [(t, inicio, hoy) for t in grupo]
+            )
+            conn.commit()
+    except Exception:
+        conn.rollback()
+    finally:
+        conn.close()
+
+@st.cache_data(ttl=600)
+def precios_actuales(tickers):
+    """Último cierre de cada ticker ({ticker: precio}), en una sola descarga."""
+    tickers = sorted(set(tickers))
+    if not tickers: return {}
+    try:
+        raw = yf.download(tickers, period="5d", progress=False, auto_adjust=True)
+    except Exception:
+        return {}
+    if raw.empty: return {}
+    close = raw['Close'] if isinstance(raw.columns, pd.MultiIndex) else raw[['Close']].rename(columns={'Close': tickers[0]})
+    ultimos = close.ffill().iloc[-1]
+    precios = {t: float(ultimos[t]) for t in tickers if t in ultimos.index and pd.notna(ultimos[t])}
+
+    # CEDEARs sin cotización local: desde el subyacente al CCL (solo se baja lo que falta)
+    mapa = {t: v for t, v in tabla_cedears().items() if t in tickers and t not in precios}
+    if mapa:
+        subyacentes = {s for s, _ in mapa.values()}
+        precios.update(cotizaciones_cedears(precios_actuales(tuple(sorted(subyacentes))), mapa, dolar_actual('ccl')[0]))
+    return precios
+
+@st.cache_data(ttl=3600)
+def leer_precios(tickers, desde):
+    """Matriz de cierres (fecha × ticker) desde el store, completándolo si hace falta."""
+    tickers = sorted(set(tickers))
+    if not tickers: return pd.DataFrame()
+    actualizar_precios(tickers, desde)
+    conn = _conectar()
+    df = pd.read_sql_query(
+        "SELECT ticker, fecha, cierre FROM precios_historicos "
+        "WHERE ticker = ANY(%s) AND fecha >= %s ORDER BY fecha ASC",
+        conn, params=(tickers, pd.Timestamp(desde).date())
+    )
+    conn.close()
+    if df.empty: return pd.DataFrame()
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return df.pivot(index='fecha', columns='ticker', values='cierre')
+
+
+# ─────────────────────────────────────────────
+#  CEDEARS — tabla de listados cruzados
+# ─────────────────────────────────────────────
+# Cambia muy de vez en cuando: se lee entera una vez por hora y se resuelve
+# en memoria (ver analitica.cedears).
+
+@st.cache_data(ttl=3600)
+def tabla_cedears():
+    """{ticker .BA: (subyacente, ratio)}."""
+    _asegurar_esquema()
+    conn = _conectar()
+    c = conn.cursor()
+    c.execute("SELECT ticker, subyacente, ratio FROM cedears")
+    tabla = {t: (s, float(r)) for t, s, r in c.fetchall()}
+    conn.close()
+    return tabla
+
+def ver_cedears():
+    _asegurar_esquema()
+    conn = _conectar()
+    df = pd.read_sql_query("SELECT ticker, subyacente, ratio FROM cedears ORDER BY ticker", conn)
+    conn.close()
+    return df
+
+def guardar_cedear(ticker, subyacente, ratio):
+    _asegurar_esquema()
+    conn = _conectar()
+    conn.cursor().execute(
+        "INSERT INTO cedears (ticker, subyacente, ratio) VALUES (%s,%s,%s) "
+        "ON CONFLICT (ticker) DO UPDATE SET subyacente=EXCLUDED.subyacente, ratio=EXCLUDED.ratio",
+        (ticker, subyacente, ratio)
+    )
+    conn.commit(); conn.close()
+    tabla_cedears.clear()
+
+def eliminar_cedear(ticker):
+    conn = _conectar()
+    conn.cursor().execute("DELETE FROM cedears WHERE ticker=%s", (ticker,))
+    conn.commit(); conn.close()
+    tabla_cedears.clear()
+
+
+# ─────────────────────────────────────────────
+#  EVENTOS — dividendos y splits en el store
+# ─────────────────────────────────────────────
+# Misma idea que los precios: cada ticker se baja una vez y después, una vez
+# por día, se vuelve a pedir el último tramo (los eventos se publican con
+# retraso). Dividendos y splits salen del mismo yf.download con actions=True,
+# agrupado por fecha de inicio, así que no hay una llamada por ticker.
+
+def _columna_eventos(raw, nombre, tickers):
+    if isinstance(raw.columns, pd.MultiIndex):
+        if nombre not in raw.columns.get_level_values(0): return pd.DataFrame()
+        df = raw[nombre]
+    else:
+        if nombre not in raw.columns: return pd.DataFrame()
+        df = raw[[nombre]].rename(columns={nombre: tickers[0]})
+    return df[~df.index.duplicated(keep='first')]
+
+def _descargar_eventos(tickers, start):
+    """(dividendos, splits) como matrices fecha × ticker; 0 donde no hubo evento."""
+    raw = yf.download(tickers, start=start, progress=False, auto_adjust=True, actions=True)
+    if raw.empty: return pd.DataFrame(), pd.DataFrame()
+    return _columna_eventos(raw, 'Dividends', tickers), _columna_eventos(raw, 'Stock Splits', tickers)
+
+def _filas_eventos(matriz, grupo):
+    filas = []
+    for t in grupo:
+        if t not in matriz.columns: continue
+        s = matriz[t]
+        s = s[s > 0]
+        filas.extend((t, f.date(), float(v)) for f, v in zip(s.index, s.values))
+    return filas
+
+def actualizar_eventos(tickers, desde):
+    """
+    Completa dividendos y splits de `tickers` desde `desde` (a lo sumo una vez por día).
+    Si aparece un evento nuevo se vuelven a bajar los cierres ajustados del ticker.
+    """
+    _asegurar_esquema()
+    tickers = sorted(set(tickers))
+    if not tickers: return
+    desde = pd.Timestamp(desde).date()
+    hoy   = date.today()
+    conn = _conectar()
+    c = conn.cursor()
+    c.execute(
+        "SELECT ticker, desde, actualizado, splits FROM dividendos_cobertura WHERE ticker = ANY(%s)", (tickers,)
+    )
+    cobertura = {t: (d, a, sp) for t, d, a, sp in c.fetchall()}
+
+    grupos = {}
+    for t in tickers:
+        cov = cobertura.get(t)
+        if cov is None or cov[0] > desde:
+            inicio = desde
+        elif not cov[2]:
+            inicio = cov[0]                      # falta la historia de splits
+        elif cov[1] < hoy:
+            inicio = cov[1] - timedelta(days=30)
+        else:
+            continue
+        grupos.setdefault(inicio, []).append(t)
+
+    nuevos = set()
+    rehacer = {}
+    try:
+        for inicio, grupo in grupos.items():
+            try:
+                divs, splits = _descargar_eventos(grupo, inicio)
+            except Exception:
+                continue
+            filas = _filas_eventos(divs, grupo)
+            if filas:
+                nuevos.update(t for t, in execute_values(
+                    c,
+                    "INSERT INTO dividendos_historicos (ticker, fecha, monto) VALUES %s "
+                    "ON CONFLICT (ticker, fecha) DO UPDATE SET monto=EXCLUDED.monto "
+                    "WHERE dividendos_historicos.monto IS DISTINCT FROM EXCLUDED.monto "
+                    "RETURNING ticker",
+                    filas, page_size=1000, fetch=True
+                ))
+            filas = _filas_eventos(splits, grupo)
+            if filas:
+                nuevos.update(t for t, in execute_values(
+                    c,
+                    "INSERT INTO acciones_corporativas (ticker, fecha, tipo, factor) VALUES %s "
+                    "ON CONFLICT (ticker, fecha, tipo) DO UPDATE SET factor=EXCLUDED.factor "
+                    "WHERE NOT acciones_corporativas.manual "
+                    "AND acciones_corporativas.factor IS DISTINCT FROM EXCLUDED.factor "
+                    "RETURNING ticker",
+                    [(t, f, 'split', v) for t, f, v in filas], fetch=True
+                ))
+            execute_values(
+                c,
+                "INSERT INTO dividendos_cobertura (ticker, desde, actualizado, splits) VALUES %s "
+                "ON CONFLICT (ticker) DO UPDATE SET "
+                "desde=LEAST(dividendos_cobertura.desde, EXCLUDED.desde), "
+                "actualizado=EXCLUDED.actualizado, splits=TRUE",
+                [(t, inicio, hoy, True) for t in grupo]
+            )
+            conn.commit()
+
+        # Un split o dividendo nuevo cambia todos los cierres ajustados anteriores:
+        # se descarta la serie guardada y se vuelve a pedir entera.
+        if nuevos:
+            c.execute(
+                "DELETE FROM precios_cobertura WHERE ticker = ANY(%s) RETURNING ticker, desde",
+                (sorted(nuevos),)
+            )
+            for t, d in c.fetchall():
+                rehacer.setdefault(d, []).append(t)
+            c.execute("DELETE FROM precios_historicos WHERE ticker = ANY(%s)", (sorted(nuevos),))
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        rehacer = {}
+    finally:
+        conn.close()
+
+    for d, grupo in rehacer.items():
+        actualizar_precios(grupo, d)
+    if rehacer:
+        leer_precios.clear()
+
+@st.cache_data(ttl=3600)
+def leer_dividendos(tickers, desde):
+    """Eventos (ticker, fecha ex, monto por acción) desde el store, completándolo si hace falta."""
+    tickers = sorted(set(tickers))
+    if not tickers: return pd.DataFrame(columns=['ticker', 'fecha', 'monto'])
+    actualizar_eventos(tickers, desde)
+    conn = _conectar()
+    df = pd.read_sql_query(
+        "SELECT ticker, fecha, monto FROM dividendos_historicos "
+        "WHERE ticker = ANY(%s) AND fecha >= %s ORDER BY ticker, fecha",
+        conn, params=(tickers, pd.Timestamp(desde).date())
+    )
+    conn.close()
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return df
+
+@st.cache_data(ttl=3600)
+def leer_acciones_corporativas(tickers, desde):
+    """
+    Splits y cambios de ticker que afectan a `tickers` (ver analitica.ajustar_operaciones).
+    Incluye los cambios manuales y los splits anotados con el ticker nuevo.
+    """
+    tickers = sorted(set(tickers))
+    cols = ['ticker', 'fecha', 'tipo', 'factor', 'nuevo_ticker']
+    if not tickers: return pd.DataFrame(columns=cols)
+    _asegurar_esquema()
+    conn = _conectar()
+    c = conn.cursor()
+    c.execute(
+        "SELECT ticker, nuevo_ticker FROM acciones_corporativas WHERE tipo='cambio_ticker' AND ticker = ANY(%s)",
+        (tickers,)
+    )
+    vigentes = tickers + [n for _, n in c.fetchall() if n]
+    conn.close()
+    actualizar_eventos(vigentes, desde)
+    conn = _conectar()
+    df = pd.read_sql_query(
+        "SELECT ticker, fecha, tipo, factor, nuevo_ticker FROM acciones_corporativas "
+        "WHERE ticker = ANY(%s) OR nuevo_ticker = ANY(%s) ORDER BY fecha",
+        conn, params=(vigentes, vigentes)
+    )
+    conn.close()
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return df[cols]
+
+def ver_acciones_corporativas():
+    _asegurar_esquema()
+    conn = _conectar()
+    df = pd.read_sql_query("SELECT * FROM acciones_corporativas ORDER BY fecha DESC", conn)
+    conn.close()
+    return df
+
+def anadir_accion_corporativa(ticker, fecha, tipo, factor=None, nuevo_ticker=None):
+    """Alta manual (cambios de ticker, o corregir un split). Lo manual no lo pisa Yahoo."""
+    _asegurar_esquema()
+    conn = _conectar()
+    conn.cursor().execute(
+        "INSERT INTO acciones_corporativas (ticker, fecha, tipo, factor, nuevo_ticker, manual) "
+        "VALUES (%s,%s,%s,%s,%s,TRUE) ON CONFLICT (ticker, fecha, tipo) DO UPDATE SET "
+        "factor=EXCLUDED.factor, nuevo_ticker=EXCLUDED.nuevo_ticker, manual=TRUE",
+        (ticker, fecha, tipo, factor, nuevo_ticker)
+    )
+    conn.commit(); conn.close()
+    leer_acciones_corporativas.clear()
+
+def eliminar_accion_corporativa(ticker, fecha, tipo):
+    conn = _conectar()
+    conn.cursor().execute(
+        "DELETE FROM acciones_corporativas WHERE ticker=%s AND fecha=%s AND tipo=%s", (ticker, fecha, tipo)
+    )
+    conn.commit(); conn.close()
+    leer_acciones_corporativas.clear()
+
+def desfases_pago(tickers):
+    """Días entre ex-dividend y pago según el último anuncio guardado en fundamentales."""
+    fund = leer_fundamentales(list(tickers))
+    if fund.empty: return {}
+    dias = (pd.to_datetime(fund['pago_dividend']) - pd.to_datetime(fund['ex_dividend'])).dt.days
+    return {t: int(d) for t, d in dias.items() if pd.notna(d) and 0 <= d <= 90}
+
+
+# ─────────────────────────────────────────────
+#  VALUACIÓN DIARIA — sobre ruedas hábiles
+# ─────────────────────────────────────────────
+# El store solo tiene días con cotización, así que el índice resultante es la
+# unión de las ruedas de los mercados presentes: solo NYSE para una cartera de
+# EE.UU., NYSE ∪ BYMA si hay .BA, todos los días si hay cripto. No se rellenan
+# fines de semana ni feriados.
+
+@st.cache_data(ttl=600)
+def precios_cartera(df_ops):
+    """Cierres de los tickers operados (ruedas × tickers) desde la primera operación, o None."""
+    if df_ops.empty: return None
+    fechas  = pd.to_datetime(df_ops['fecha'])
+    start   = fechas.min()
+    tickers = df_ops['ticker'].unique().tolist()
+    precios = leer_precios(tickers, start)
+    # solo los CEDEARs con huecos en la serie local traen su subyacente
+    mapa    = {t: v for t, v in tabla_cedears().items() if t in tickers}
+    mapa    = {t: mapa[t] for t in cedears_incompletos(precios, mapa)}
+    extra   = sorted({s for s, _ in mapa.values()} - set(tickers))
+    if extra:
+        precios = precios.join(leer_precios(extra, start), how='outer')
+    if precios.empty: return None
+    if mapa:
+        precios = completar_cedears(precios, mapa, serie_fx('ccl'))
+        precios = precios.drop(columns=[t for t in extra if t in precios.columns])
+    precios = precios[precios.index >= start].dropna(how='all')
+    return None if precios.empty else precios
+
+@st.cache_data(ttl=600)
+def valor_diario(df_ops, serie_dolar):
+    """Valor en USD de cada ticker por rueda (fechas × tickers), o None sin datos."""
+    precios = precios_cartera(df_ops)
+    if precios is None: return None
+    df = df_ops.copy()
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return valorar(matriz_tenencias(df, precios.index), precios, serie_dolar)
+
+
+# ─────────────────────────────────────────────
+#  CORRELACIONES — caché por conjunto de tickers
+# ─────────────────────────────────────────────
+# La clave es la tupla ordenada de tickers (no el usuario), así dos carteras
+# con las mismas tenencias comparten el resultado. Se calculan todas las
+# ventanas en una pasada; elegir otra en la página no recalcula nada.
+
+@st.cache_data(ttl=3600)
+def correlaciones_tenencias(tickers):
+    """{ventana: (cov_anual, corr)} de `tickers` en USD, ver analitica.matrices_por_ventana."""
+    tickers = tuple(sorted(set(tickers)))
+    if len(tickers) < 2: return {}
+    desde   = pd.Timestamp(date.today()) - pd.Timedelta(days=int(max(VENTANAS.values()) * 365 / 252) + 10)
+    precios = leer_precios(list(tickers), desde)
+    if precios.empty: return {}
+    precios = precios_en_usd(precios.reindex(columns=list(tickers)), serie_fx())
+    return matrices_por_ventana(precios)
+
+
+# ─────────────────────────────────────────────
+#  PROYECCIÓN — caché por conjunto de posiciones
+# ─────────────────────────────────────────────
+# `pesos` es una tupla ordenada de (ticker, peso redondeado): carteras con la
+# misma composición comparten historia y simulación. La semilla es fija para
+# que la caché y lo que se ve en pantalla coincidan entre recargas.
+
+ANIOS_HISTORIA = 5
+
+@st.cache_data(ttl=3600)
+def retornos_historicos(pesos):
+    """Retorno diario de la cartera con los pesos dados sobre los últimos ANIOS_HISTORIA años."""
+    desde   = pd.Timestamp(date.today()) - pd.DateOffset(years=ANIOS_HISTORIA)
+    precios = leer_precios([tk for tk, _ in pesos], desde)
+    if precios.empty: return None
+    return retornos_cartera(precios_en_usd(precios, serie_fx()), pesos)
+
+@st.cache_data(ttl=3600)
+def proyectar_cartera(pesos, valor_inicial, anios, n_tray, aporte_mensual, metodo):
+    """Bandas de percentiles por mes (ver analitica.simular_trayectorias), o None sin historia."""
+    retornos = retornos_historicos(pesos)
+    if retornos is None or len(retornos) < 2: return None
+    return simular_trayectorias(retornos, valor_inicial, anios, n_tray, aporte_mensual, metodo, semilla=0)
+
+
+# ─────────────────────────────────────────────
+#  BENCHMARKS
+# ─────────────────────────────────────────────
+# Cada serie subyacente se lee del store y se cachea por ticker, así que un
+# benchmark popular cuesta una descarga por día para todo el servidor. Las
+# mezclas (60/40, etc.) se calculan en memoria sobre esas series.
+
+BENCHMARKS = {
+    'S&P 500':  '^GSPC',
+    'Nasdaq':   'QQQ',
+    'Merval':   '^MERV',
+    'Oro':      'GC=F',
+}
+
+def inicio_benchmarks(desde):
+    """Inicio estable para la caché: cubre al menos un año y arranca en enero."""
+    desde = min(pd.Timestamp(desde), pd.Timestamp(date.today()) - pd.Timedelta(days=365))
+    return date(desde.year, 1, 1)
+
+def parsear_composicion(texto):
+    """
+    'SPY:60, AGG:40' → (('AGG', 0.4), ('SPY', 0.6)); 'VT' → (('VT', 1.0),).
+    Los pesos se normalizan a 1. Lanza ValueError si el texto no es válido.
+    """
+    pesos = {}
+    for parte in texto.replace(';', ',').split(','):
+        parte = parte.strip()
+        if not parte: continue
+        if ':' in parte:
+            tk, peso = parte.split(':', 1)
+            peso = float(peso.strip().rstrip('%'))
+        else:
+            tk, peso = parte, 1.0
+        tk = tk.strip().upper()
+        if not tk or peso <= 0:
+            raise ValueError(f"Componente inválido: {parte}")
+        pesos[tk] = pesos.get(tk, 0) + peso
+    if not pesos:
+        raise ValueError("Composición vacía")
+    total = sum(pesos.values())
+    return tuple(sorted((tk, p / total) for tk, p in pesos.items()))
+
+def definiciones_base():
+    return tuple((nombre, ((tk, 1.0),)) for nombre, tk in BENCHMARKS.items())
+
+@st.cache_data(ttl=3600)
+def serie_precio(ticker, desde):
+    """Cierres de un ticker desde el store (caché compartida entre usuarios)."""
+    precios = leer_precios([ticker], desde)
+    return precios[ticker] if ticker in precios.columns else pd.Series(dtype=float, name=ticker)
+
+@st.cache_data(ttl=3600)
+def calcular_benchmarks(desde, definiciones=None):
+    """
+    Serie de cada benchmark (columnas = nombre) desde `desde`.
+    `definiciones`: tupla de (nombre, ((ticker, peso), ...)); por defecto los fijos.
+    """
+    if definiciones is None:
+        definiciones = definiciones_base()
+    tickers = sorted({tk for _, pesos in definiciones for tk, _ in pesos})
+    if not tickers: return pd.DataFrame()
+    actualizar_precios(tickers, desde)          # una sola descarga para lo que falte
+    precios = pd.concat([serie_precio(tk, desde) for tk in tickers], axis=1)
+    if precios.empty: return pd.DataFrame()
+    precios.columns = tickers
+
+    result = {}
+    for nombre, pesos in definiciones:
+        if any(precios[tk].dropna().empty for tk, _ in pesos): continue
+        if len(pesos) == 1:
+            result[nombre] = precios[pesos[0][0]]
+        else:
+            result[nombre] = indice_mezcla(precios, pesos)
+    return pd.DataFrame(result)
+
+def ver_benchmarks_usuario(user_id):
+    _asegurar_esquema()
+    conn = _conectar()
+    df = pd.read_sql_query(
+        "SELECT * FROM benchmarks_usuario WHERE user_id=%s ORDER BY id ASC", conn, params=(user_id,)
+    )
+    conn.close()
+    return df
+
+def anadir_benchmark_usuario(user_id, nombre, composicion):
+    """Valida la composición antes de guardar; lanza ValueError si no es válida."""
+    parsear_composicion(composicion)
+    _asegurar_esquema()
+    conn = _conectar()
+    conn.cursor().execute(
+        "INSERT INTO benchmarks_usuario (user_id, nombre, composicion) VALUES (%s,%s,%s)",
+        (user_id, nombre, composicion)
+    )
+    conn.commit(); conn.close()
+
+def eliminar_benchmark_usuario(bench_id, user_id):
+    conn = _conectar()
+    conn.cursor().execute(
+        "DELETE FROM benchmarks_usuario WHERE id=%s AND user_id=%s", (bench_id, user_id)
+    )
+    conn.commit(); conn.close()
+
+def definiciones_usuario(user_id):
+    """Fijos + los del usuario, en el formato que espera calcular_benchmarks."""
+    defs = list(definiciones_base())
+    for _, b in ver_benchmarks_usuario(user_id).iterrows():
+        try:
+            defs.append((b['nombre'], parsear_composicion(b['composicion'])))
+        except ValueError:
+            pass
+    return tuple(defs)
+
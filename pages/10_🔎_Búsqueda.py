@@ -0,0 +1,72 @@
+import time
+import streamlit as st
+import pandas as pd
+from utils import apply_styles, section_header, badge
+from analitica import terminos_busqueda, fragmento, resaltar
+from buscador import buscar, FUENTES
+
+if 'user' not in st.session_state or st.session_state.user is None:
+    st.error("Debes iniciar sesión."); st.stop()
+USER_ID = st.session_state.user[0]
+
+st.set_page_config(layout="wide", page_title="Búsqueda · Portfolio")
+apply_styles()
+st.markdown("""<style>
+.material-symbols-rounded,[data-testid="stNumberInputStepDown"] span,
+[data-testid="stNumberInputStepUp"] span{font-size:0!important}
+</style>""", unsafe_allow_html=True)
+
+# ── HEADER ────────────────────────────────────────────────────────
+st.markdown("<h1>Búsqueda</h1>", unsafe_allow_html=True)
+st.markdown(
+    '<div style="color:#475569;font-size:0.85rem;font-family:JetBrains Mono,monospace;'
+    'margin-top:-8px;margin-bottom:24px">Tesis de la watchlist, descripciones de movimientos y operaciones</div>',
+    unsafe_allow_html=True
+)
+
+c1, c2 = st.columns([3, 2])
+consulta = c1.text_input("Buscar", placeholder='palabras o "frase exacta"', label_visibility="collapsed")
+fuentes = c2.multiselect("Fuentes", list(FUENTES), default=list(FUENTES), format_func=FUENTES.get,
+                         label_visibility="collapsed")
+
+terminos = terminos_busqueda(consulta)
+if not terminos:
+    st.info("Escribí al menos una palabra.")
+    st.stop()
+
+t0 = time.perf_counter()
+res = buscar(USER_ID, consulta, tuple(fuentes))
+ms = (time.perf_counter() - t0) * 1000
+st.markdown(
+    f'<div style="color:#475569;font-size:0.75rem;font-family:JetBrains Mono,monospace;margin-bottom:12px">'
+    f'{len(res)} resultados · {ms:,.0f} ms</div>',
+    unsafe_allow_html=True
+)
+
+if res.empty:
+    st.info("Sin coincidencias.")
+    st.stop()
+
+# ── RESULTADOS ────────────────────────────────────────────────────
+for fuente in fuentes:
+    grupo = res[res['origen'] == fuente]
+    if grupo.empty: continue
+    section_header(FUENTES[fuente], f"{len(grupo)} coincidencias")
+    for _, r in grupo.iterrows():
+        fecha = f"{r['fecha']:%Y-%m-%d} · " if pd.notna(r['fecha']) else ""
+        if pd.isna(r['monto']):
+            monto = ""
+        elif fuente == 'watchlist':
+            monto = badge(f"objetivo ${r['monto']:,.2f}", "gray")
+        else:
+            monto = badge(f"{r['moneda'] or ''} {r['monto']:,.2f}".strip(), "gray")
+        st.markdown(
+            f'<div style="padding:10px 14px;margin-bottom:6px;background:#0b1220;border:1px solid #1a2540;border-radius:8px">'
+            f'<div style="display:flex;justify-content:space-between;align-items:center">'
+            f'<span style="color:#cbd5e1;font-size:0.88rem">'
+            f'<span style="color:#475569;font-family:JetBrains Mono,monospace;font-size:0.78rem">{fecha}</span>'
+            f'{resaltar(r["titulo"], terminos)}</span>{monto}</div>'
+            f'<div style="color:#94a3b8;font-size:0.84rem;margin-top:4px">'
+            f'{resaltar(fragmento(r["texto"], terminos), terminos) or "—"}</div></div>',
+            unsafe_allow_html=True
+        )
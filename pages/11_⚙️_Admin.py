@@ -0,0 +1,90 @@
+import streamlit as st
+import psycopg2
+import pandas as pd
+from datetime import date
+from mercado import (
+    ver_acciones_corporativas, anadir_accion_corporativa, eliminar_accion_corporativa,
+    ver_cedears, guardar_cedear, eliminar_cedear,
+)
+
+if 'user' not in st.session_state or st.session_state.user is None: st.error("Login requerido"); st.stop()
+if not st.session_state.user[3]: st.error("Acceso denegado"); st.stop()
+
+def conectar_db():
+    return psycopg2.connect(
+        host=st.secrets["connections"]["supabase"]["host"],
+        database=st.secrets["connections"]["supabase"]["database"],
+        user=st.secrets["connections"]["supabase"]["username"],
+        password=st.secrets["connections"]["supabase"]["password"],
+        port=st.secrets["connections"]["supabase"]["port"]
+    )
+
+st.title("Panel Admin ⚙️")
+conn = conectar_db()
+st.header("Usuarios")
+st.dataframe(pd.read_sql("SELECT id, username, is_admin FROM usuarios ORDER BY id", conn), use_container_width=True)
+st.header("Estadísticas")
+ops = pd.read_sql("SELECT COUNT(*) FROM operaciones", conn).iloc[0,0]
+usrs = pd.read_sql("SELECT COUNT(*) FROM usuarios", conn).iloc[0,0]
+c1, c2 = st.columns(2)
+c1.metric("Usuarios", usrs)
+c2.metric("Operaciones Totales", ops)
+conn.close()
+st.header("Acciones corporativas")
+st.caption("Los splits se bajan de Yahoo; los cambios de ticker se cargan acá. "
+           "Se aplican al calcular, sin modificar las operaciones de los usuarios.")
+with st.form("form_accion", clear_on_submit=True):
+    a1, a2, a3, a4, a5 = st.columns([1, 1, 1, 1, 1])
+    ac_tipo   = a1.selectbox("Tipo", ["cambio_ticker", "split"])
+    ac_ticker = a2.text_input("Ticker")
+    ac_fecha  = a3.date_input("Fecha", value=date.today())
+    ac_factor = a4.number_input("Factor (split)", min_value=0.0, value=0.0, step=0.5, format="%.4f")
+    ac_nuevo  = a5.text_input("Nuevo ticker")
+    if st.form_submit_button("Guardar") and ac_ticker:
+        if ac_tipo == "cambio_ticker" and not ac_nuevo:
+            st.warning("Falta el nuevo ticker.")
+        elif ac_tipo == "split" and ac_factor <= 0:
+            st.warning("El factor debe ser mayor a 0 (4 = 4:1, 0.1 = 1:10).")
+        else:
+            anadir_accion_corporativa(
+                ac_ticker.strip().upper(), ac_fecha, ac_tipo,
+                ac_factor if ac_tipo == "split" else None,
+                ac_nuevo.strip().upper() if ac_tipo == "cambio_ticker" else None,
+            )
+            st.rerun()
+
+acciones = ver_acciones_corporativas()
+st.dataframe(acciones, use_container_width=True, hide_index=True)
+manuales = acciones[acciones['manual']] if not acciones.empty else acciones
+for _, a in manuales.iterrows():
+    b1, b2 = st.columns([5, 1])
+    detalle = a['factor'] if pd.notna(a['factor']) else a['nuevo_ticker'] if pd.notna(a['nuevo_ticker']) else ''
+    b1.write(f"{a['ticker']} · {a['tipo']} · {a['fecha']} · {detalle}")
+    if b2.button("✕", key=f"delac_{a['ticker']}_{a['fecha']}_{a['tipo']}"):
+        eliminar_accion_corporativa(a['ticker'], a['fecha'], a['tipo'])
+        st.rerun()
+
+st.header("CEDEARs")
+st.caption("Listados .BA con su acción subyacente. Si falta la cotización local (o está vencida), "
+           "el .BA se valúa como subyacente × tipo de cambio implícito ÷ ratio.")
+with st.form("form_cedear", clear_on_submit=True):
+    d1, d2, d3 = st.columns(3)
+    cd_ticker = d1.text_input("Ticker local", placeholder="AAPL.BA")
+    cd_sub    = d2.text_input("Subyacente", placeholder="AAPL")
+    cd_ratio  = d3.number_input("Ratio (CEDEARs por acción)", min_value=0.0, value=0.0, step=1.0, format="%.4f")
+    if st.form_submit_button("Guardar") and cd_ticker and cd_sub:
+        tk = cd_ticker.strip().upper()
+        if not tk.endswith('.BA'):
+            st.warning("El ticker local tiene que terminar en .BA.")
+        elif cd_ratio <= 0:
+            st.warning("El ratio debe ser mayor a 0.")
+        else:
+            guardar_cedear(tk, cd_sub.strip().upper(), cd_ratio)
+            st.rerun()
+
+for _, cd in ver_cedears().iterrows():
+    b1, b2 = st.columns([5, 1])
+    b1.write(f"{cd['ticker']} → {cd['subyacente']} · ratio {cd['ratio']:g}")
+    if b2.button("✕", key=f"delcd_{cd['ticker']}"):
+        eliminar_cedear(cd['ticker'])
+        st.rerun()
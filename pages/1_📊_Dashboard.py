@@ -2,11 +2,12 @@ import streamlit as st
 import psycopg2
 from datetime import date
 import pandas as pd
-import yfinance as yf
 import plotly.express as px
 import plotly.graph_objects as go
-import requests
 from utils import apply_styles, metric_card, section_header, apply_plotly_style, badge, PIE_COLORS, portfolio_selector_sidebar, ver_portafolios, crear_portafolio, eliminar_portafolio, renombrar_portafolio, get_efectivo, set_efectivo
+from mercado import serie_fx, dolar_actual, valor_diario
+from analitica import ars_a_usd, METODOS, serie_rendimiento, tir_cartera, fx_en_fechas, usd_a_moneda, indice_twr, exposicion_moneda
+from cartera import ver_operaciones, ver_posiciones, ver_posiciones_asof, ver_lotes, metodo_costo
 
 # ── Auth ──────────────────────────────────────────────────────────
 if 'user' not in st.session_state or st.session_state.user is None:
@@ -51,13 +52,13 @@ def conectar_db():
     )
 
 # ── DATA FUNCTIONS ────────────────────────────────────────────────
-def anadir_operacion(fecha, ticker, tipo, cantidad, precio, moneda, user_id, portfolio_id=None):
+def anadir_operacion(fecha, ticker, tipo, cantidad, precio, moneda, user_id, portfolio_id=None, lote_id=None):
     conn = conectar_db()
     c = conn.cursor()
     c.execute(
-        "INSERT INTO operaciones (fecha, ticker, tipo, cantidad, precio, moneda, user_id, portfolio_id) "
-        "VALUES (%s,%s,%s,%s,%s,%s,%s,%s)",
-        (fecha, ticker, tipo, cantidad, precio, moneda, user_id, portfolio_id)
+        "INSERT INTO operaciones (fecha, ticker, tipo, cantidad, precio, moneda, user_id, portfolio_id, lote_id) "
+        "VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)",
+        (fecha, ticker, tipo, cantidad, precio, moneda, user_id, portfolio_id, lote_id)
     )
     conn.commit(); conn.close()
 
@@ -67,192 +68,102 @@ def eliminar_operacion(op_id, user_id):
     c.execute("DELETE FROM operaciones WHERE id=%s AND user_id=%s", (op_id, user_id))
     conn.commit(); conn.close()
 
-def ver_operaciones(user_id, portfolio_id=None):
-    conn = conectar_db()
-    if portfolio_id is None:
-        df = pd.read_sql_query(
-            "SELECT * FROM operaciones WHERE user_id=%s ORDER BY fecha ASC",
-            conn, params=(user_id,)
-        )
-    else:
-        df = pd.read_sql_query(
-            "SELECT * FROM operaciones WHERE user_id=%s AND portfolio_id=%s ORDER BY fecha ASC",
-            conn, params=(user_id, portfolio_id)
-        )
-    conn.close()
-    return df
-
-def calcular_capital_neto(df_ops, precio_dolar):
-    """Capital neto = costo total compras - ingresos ventas, en USD."""
+def calcular_capital_neto(df_ops, serie_dolar, moneda='USD'):
+    """Capital neto = costo total compras - ingresos ventas, en `moneda` al tipo de cambio de cada día."""
     if df_ops.empty: return 0.0
     df = df_ops.copy()
     df['moneda'] = df['moneda'].fillna('USD')
     df['monto'] = df['cantidad'] * df['precio']
-    df['monto_usd'] = df.apply(
-        lambda r: r['monto'] / precio_dolar if r['moneda'] == 'ARS' else r['monto'], axis=1
-    )
+    df['monto_usd'] = ars_a_usd(df['monto'], df['moneda'], df['fecha'], serie_dolar)
+    if moneda == 'ARS':
+        # los montos en pesos quedan tal cual; los en dólares, al cambio del día
+        df['monto_usd'] = df['monto'].where(df['moneda'] == 'ARS',
+                                            usd_a_moneda(df['monto'], df['fecha'], serie_dolar, 'ARS'))
     compras = df[df['tipo']=='Compra']['monto_usd'].sum()
     ventas  = df[df['tipo']=='Venta']['monto_usd'].sum()
     return compras - ventas
 
-@st.cache_data(ttl=300)
-def obtener_dolar_argentina():
-    precio, fuente = 1150.0, "Estimado"
-    try:
-        r = requests.get("https://dolarapi.com/v1/dolares/cripto", timeout=5)
-        if r.status_code == 200:
-            data = r.json()
-            precio, fuente = float(data['venta']), "DolarApi"
-    except:
-        pass
-    st.session_state['precio_dolar_compartido'] = precio
-    return precio, fuente
-
-@st.cache_data(ttl=600)
-def obtener_datos_mercado(tickers):
-    if not tickers: return {}
-    precios = {}
-    for ticker in tickers:
-        try:
-            hist = yf.Ticker(ticker).history(period="5d")
-            precios[ticker] = hist['Close'].dropna().iloc[-1] if not hist.empty else 0.0
-        except:
-            precios[ticker] = 0.0
-    return precios
-
-# efectivo ahora se maneja con get_efectivo/set_efectivo desde utils
-
-def calcular_posiciones(df_ops, precio_dolar):
-    if df_ops.empty: return pd.DataFrame(), 0, pd.DataFrame()
-    df = df_ops.copy()
-    df['moneda'] = df['moneda'].fillna('USD')
-    df['cantidad_neta'] = df.apply(lambda r: r['cantidad'] if r['tipo']=='Compra' else -r['cantidad'], axis=1)
-    df['coste_op']   = df['cantidad'] * df['precio']
-    df['ingreso_op'] = df['cantidad'] * df['precio']
-
-    pos = df.groupby(['ticker','moneda']).agg(
-        cantidad_total          =('cantidad_neta', 'sum'),
-        coste_acumulado_compras =('coste_op',   lambda x: x[df.loc[x.index,'tipo']=='Compra'].sum()),
-        cantidad_acumulada_compras=('cantidad', lambda x: x[df.loc[x.index,'tipo']=='Compra'].sum()),
-        total_ventas            =('ingreso_op', lambda x: x[df.loc[x.index,'tipo']=='Venta'].sum()),
-        cantidad_vendida        =('cantidad',   lambda x: x[df.loc[x.index,'tipo']=='Venta'].sum())
-    ).reset_index()
-
-    pos['ppp_original'] = pos.apply(
-        lambda r: r['coste_acumulado_compras'] / r['cantidad_acumulada_compras']
-        if r['cantidad_acumulada_compras'] > 0 else 0, axis=1
-    )
-    pos['ganancia_realizada'] = pos['total_ventas'] - (pos['ppp_original'] * pos['cantidad_vendida'])
-    ganancia_realizada_usd = pos['ganancia_realizada'].sum()
-    beneficios_df = pos[['ticker','ganancia_realizada']].copy()
-
-    abiertas = pos[pos['cantidad_total'] > 0.000001].copy()
-    if not abiertas.empty:
-        precios = obtener_datos_mercado(abiertas['ticker'].unique().tolist())
-        abiertas['precio_actual'] = abiertas['ticker'].map(precios).fillna(0)
-
-        def val_usd(row):
-            v = row['cantidad_total'] * row['precio_actual']
-            return v / precio_dolar if row['moneda'] == 'ARS' and row['precio_actual'] != 0 else v
-
-        def coste_usd(row):
-            c = row['cantidad_total'] * row['ppp_original']
-            return c / precio_dolar if row['moneda'] == 'ARS' else c
-
-        abiertas['valor_mercado_usd']       = abiertas.apply(val_usd, axis=1)
-        abiertas['coste_total_usd']         = abiertas.apply(coste_usd, axis=1)
-        abiertas['ganancia_no_realizada_usd'] = abiertas['valor_mercado_usd'] - abiertas['coste_total_usd']
-        abiertas['rentabilidad_%']          = abiertas.apply(
-            lambda r: (r['ganancia_no_realizada_usd'] / r['coste_total_usd'] * 100)
-            if r['coste_total_usd'] > 0 else 0, axis=1
-        )
-    return abiertas, ganancia_realizada_usd, beneficios_df
-
-@st.cache_data(ttl=600)
-def calcular_evolucion_patrimonio(df_ops, precio_dolar):
-    if df_ops.empty: return None
-    df_ops = df_ops.copy()
-    df_ops['fecha'] = pd.to_datetime(df_ops['fecha'])
-
-    # Separar tickers USD y ARS para descargar por separado
-    tickers_usd = [t for t in df_ops['ticker'].unique() if not t.endswith('.BA')]
-    tickers_ars = [t for t in df_ops['ticker'].unique() if t.endswith('.BA')]
-    start_date  = df_ops['fecha'].min()
-    rango       = pd.date_range(start=start_date, end=date.today())
-    patrimonio  = pd.DataFrame(index=rango)
-
-    def descargar_precios(tickers):
-        if not tickers: return pd.DataFrame()
-        try:
-            raw = yf.download(tickers, start=start_date, progress=False, auto_adjust=True)
-            # yf devuelve MultiIndex cuando son varios tickers
-            if isinstance(raw.columns, pd.MultiIndex):
-                close = raw['Close']
-            else:
-                close = raw[['Close']].rename(columns={'Close': tickers[0]}) if len(tickers) == 1 else raw
-            # Eliminar duplicados de índice
-            close = close[~close.index.duplicated(keep='first')]
-            return close
-        except:
-            return pd.DataFrame()
-
-    precios_usd = descargar_precios(tickers_usd)
-    precios_ars = descargar_precios(tickers_ars)
-
-    for ticker in df_ops['ticker'].unique():
-        ops_t = df_ops[df_ops['ticker'] == ticker].copy()
-        ops_t['cantidad_neta'] = ops_t['cantidad'].where(ops_t['tipo'] == 'Compra', -ops_t['cantidad'])
-        ops_d    = ops_t.groupby('fecha')['cantidad_neta'].sum()
-        tenencias = ops_d.cumsum().reindex(rango, method='ffill').fillna(0)
-
-        # Obtener serie de precios del DataFrame correcto
-        es_ars = ticker.endswith('.BA')
-        df_precios = precios_ars if es_ars else precios_usd
-
-        if not df_precios.empty and ticker in df_precios.columns:
-            precio_s = df_precios[ticker].reindex(rango)
-            # Clave del fix: ffill mantiene último precio conocido en fines de semana/feriados
-            # Solo llenamos hacia adelante (nunca hacia atrás, para no inventar precios antes de que existiera)
-            precio_s = precio_s.ffill()
-            # Para días anteriores a la primera cotización, dejamos 0 (tenencias también son 0 ahí)
-            precio_s = precio_s.fillna(0)
-        else:
-            precio_s = pd.Series(0, index=rango)
-
-        valor = tenencias * precio_s
-        if es_ars:
-            valor = valor / precio_dolar  # conversión ARS → USD al tipo actual (aproximado)
-
-        patrimonio[ticker] = valor
-
-    # Suma solo donde tenemos datos reales (ignora NaN, no los convierte a 0)
-    patrimonio['Total USD'] = patrimonio.sum(axis=1)
-
-    # Filtrar días donde el total es 0 al inicio (antes de cualquier compra)
-    primera_compra = df_ops['fecha'].min()
-    resultado = patrimonio[['Total USD']].reset_index().rename(columns={'index': 'Fecha'})
-    resultado = resultado[resultado['Fecha'] >= primera_compra]
-
-    return resultado
+def calcular_evolucion_patrimonio(valores):
+    """Patrimonio total en USD por rueda hábil (sin fines de semana ni feriados)."""
+    if valores is None: return None
+    return valores.sum(axis=1).rename('Total USD').rename_axis('Fecha').reset_index()
 
 
 # ── LOAD DATA ─────────────────────────────────────────────────────
-precio_dolar_hoy, fuente_dolar = obtener_dolar_argentina()
+precio_dolar_hoy, fuente_dolar = dolar_actual()
+serie_dolar = serie_fx()
 
 # Portfolio selector runs first (sets session_state)
 portfolio_id_sel, portfolio_label_sel = portfolio_selector_sidebar(USER_ID)
 
-operaciones_df     = ver_operaciones(USER_ID, portfolio_id_sel)
-posiciones_df, ganancia_realizada_total, _ = calcular_posiciones(operaciones_df, precio_dolar_hoy)
+# Método de imputación de ventas — queda en session_state para las demás páginas
+metodos = list(METODOS)
+st.session_state['metodo_costo'] = st.sidebar.selectbox(
+    "Método de costo", metodos, index=metodos.index(metodo_costo()),
+    format_func=METODOS.get, key="metodo_costo_sel"
+)
+
+# Fecha de la vista: hoy, o la cartera tal como estaba al cierre de un día pasado
+fecha_ver = st.sidebar.date_input("Ver al", value=date.today(), max_value=date.today(), key="fecha_ver")
+historico = fecha_ver < date.today()
+
+# Moneda de la vista: todo se calcula en USD y se convierte al mostrar
+# (puntos al cambio de la fecha de la vista, historia al cambio de cada día)
+moneda_vista = st.sidebar.radio("Moneda", ["USD", "ARS"], horizontal=True, key="moneda_vista")
+dolar_vista  = float(fx_en_fechas(serie_dolar, [fecha_ver])[0]) if historico else precio_dolar_hoy
+
+def a_vista(v_usd):
+    """Monto (o array) en USD pasado a la moneda de la vista, al cambio de la fecha de la vista."""
+    return v_usd * dolar_vista if moneda_vista == 'ARS' else v_usd
+
+def fmt_moneda(v_usd, signo=False):
+    """Monto en USD formateado en la moneda de la vista."""
+    v = a_vista(v_usd)
+    s = ("+" if v >= 0 else "-") if signo else ("-" if v < 0 else "")
+    return f"{s}AR$ {abs(v):,.0f}" if moneda_vista == 'ARS' else f"{s}US$ {abs(v):,.2f}"
+
+def fmt_otra(v_usd):
+    """El mismo monto en la otra moneda (para mostrar ambas vistas juntas)."""
+    return f"≈ US$ {v_usd:,.2f}" if moneda_vista == 'ARS' else f"≈ AR$ {v_usd * dolar_vista:,.0f}"
+
+operaciones_todas  = ver_operaciones(USER_ID, portfolio_id_sel)
+operaciones_df     = operaciones_todas
+if historico:
+    operaciones_df = operaciones_todas[pd.to_datetime(operaciones_df['fecha']) <= pd.Timestamp(fecha_ver)]
+    posiciones_df, realizadas_df = ver_posiciones_asof(USER_ID, portfolio_id_sel, fecha_ver)
+else:
+    posiciones_df, realizadas_df = ver_posiciones(USER_ID, portfolio_id_sel, precio_dolar_hoy)
+ganancia_realizada_total = realizadas_df['ganancia_realizada_usd'].sum()
 saldo_efectivo_usd, saldo_efectivo_ars = get_efectivo(USER_ID, portfolio_id_sel)
 
 valor_acciones_usd = posiciones_df['valor_mercado_usd'].sum() if 'valor_mercado_usd' in posiciones_df.columns else 0
-valor_ars_en_usd   = saldo_efectivo_ars / precio_dolar_hoy
+valor_ars_en_usd   = saldo_efectivo_ars / dolar_vista
 patrimonio_total   = valor_acciones_usd + saldo_efectivo_usd + valor_ars_en_usd
 ganancia_no_real   = posiciones_df['ganancia_no_realizada_usd'].sum() if 'ganancia_no_realizada_usd' in posiciones_df.columns else 0
 beneficio_total    = ganancia_no_real + ganancia_realizada_total
-capital_neto       = calcular_capital_neto(operaciones_df, precio_dolar_hoy)
-rentabilidad       = (beneficio_total / capital_neto * 100) if capital_neto > 0 else 0
+capital_neto       = calcular_capital_neto(operaciones_df, serie_dolar)
+capital_neto_vista = calcular_capital_neto(operaciones_df, serie_dolar, moneda_vista)
+
+# Rentabilidad ponderada por tiempo (no cuenta los aportes como ganancia) y TIR.
+# La valuación diaria se cachea una sola vez con todas las operaciones; una
+# fecha pasada solo recorta el resultado (las tenencias a esa fecha no cambian).
+valores_diarios = valor_diario(operaciones_todas, serie_dolar)
+if valores_diarios is not None and historico:
+    valores_diarios = valores_diarios.loc[:pd.Timestamp(fecha_ver)]
+    if valores_diarios.empty: valores_diarios = None
+if valores_diarios is not None:
+    rendimiento_df = serie_rendimiento(valores_diarios, operaciones_df, serie_dolar)
+    if moneda_vista == 'ARS':
+        # TWR en pesos: valor y flujos al cambio de cada día
+        fx_dias = fx_en_fechas(serie_dolar, rendimiento_df.index)
+        rendimiento_df['indice'] = indice_twr(rendimiento_df['valor'] * fx_dias, rendimiento_df['flujo'] * fx_dias)
+    rentabilidad   = (rendimiento_df['indice'].iloc[-1] - 1) * 100
+else:
+    rentabilidad   = (beneficio_total / capital_neto * 100) if capital_neto > 0 else 0
+tir_anual = not operaciones_df.empty and (
+    pd.Timestamp(fecha_ver) - pd.to_datetime(operaciones_df['fecha']).min()
+).days >= 365
+tir = tir_cartera(operaciones_df, serie_dolar, valor_acciones_usd, fecha_ver, anual=tir_anual)
 
 # ── SIDEBAR ───────────────────────────────────────────────────────
 with st.sidebar:
@@ -334,7 +245,7 @@ with col_title:
         <div style="padding-bottom:4px">
             <h1 style="margin:0">Portfolio Dashboard</h1>
             <div style="color:#475569;font-size:0.85rem;font-family:'JetBrains Mono',monospace;margin-top:4px">
-                {st.session_state.user[1]} · actualizado {date.today().strftime('%d %b %Y')}
+                {st.session_state.user[1]} · {"al cierre del" if historico else "actualizado"} {fecha_ver.strftime('%d %b %Y')}
             </div>
         </div>
     """, unsafe_allow_html=True)
@@ -353,25 +264,28 @@ st.divider()
 if not operaciones_df.empty or saldo_efectivo_usd != 0 or saldo_efectivo_ars != 0:
     c1, c2, c3, c4 = st.columns(4)
     with c1:
-        metric_card("Patrimonio Total", f"US$ {patrimonio_total:,.2f}", color="default")
+        metric_card("Patrimonio Total", fmt_moneda(patrimonio_total), subtitle=fmt_otra(patrimonio_total),
+                    color="default")
     with c2:
         b_color = "green" if beneficio_total >= 0 else "red"
-        b_sign  = "+" if beneficio_total >= 0 else ""
-        metric_card("Beneficio Total", f"{b_sign}US$ {abs(beneficio_total):,.2f}", color=b_color)
+        metric_card("Beneficio Total", fmt_moneda(beneficio_total, signo=True), color=b_color)
     with c3:
-        metric_card("Capital Neto Aportado", f"US$ {capital_neto:,.2f}", color="blue")
+        metric_card("Capital Neto Aportado",
+                    f"AR$ {capital_neto_vista:,.0f}" if moneda_vista == 'ARS' else f"US$ {capital_neto:,.2f}",
+                    subtitle="al cambio de cada aporte" if moneda_vista == 'ARS' else None, color="blue")
     with c4:
         r_color = "green" if rentabilidad >= 0 else "red"
         r_sign  = "+" if rentabilidad >= 0 else ""
-        metric_card("Rentabilidad", f"{r_sign}{rentabilidad:.2f}%",
-                    subtitle=f"Realizado: US$ {ganancia_realizada_total:,.2f}", color=r_color)
+        tir_txt = "TIR —" if pd.isna(tir) else f"TIR {'anual' if tir_anual else 'período'} {tir*100:+.2f}%"
+        metric_card("Rentabilidad (TWR)", f"{r_sign}{rentabilidad:.2f}%",
+                    subtitle=f"{tir_txt} · Realizado: {fmt_moneda(ganancia_realizada_total)}", color=r_color)
 
     st.markdown("<div style='height:12px'></div>", unsafe_allow_html=True)
 
     # ── METRICS ROW 2 ──────────────────────────────────────────────
     c1, c2, c3, c4 = st.columns(4)
     with c1:
-        metric_card("Valor en Acciones", f"US$ {valor_acciones_usd:,.2f}", color="default")
+        metric_card("Valor en Acciones", fmt_moneda(valor_acciones_usd), color="default")
     with c2:
         metric_card("Efectivo USD", f"US$ {saldo_efectivo_usd:,.2f}", color="blue")
     with c3:
@@ -379,8 +293,7 @@ if not operaciones_df.empty or saldo_efectivo_usd != 0 or saldo_efectivo_ars !=
                     subtitle=f"≈ US$ {valor_ars_en_usd:,.2f}", color="amber")
     with c4:
         nr_color = "green" if ganancia_no_real >= 0 else "red"
-        nr_sign  = "+" if ganancia_no_real >= 0 else ""
-        metric_card("No Realizado", f"{nr_sign}US$ {abs(ganancia_no_real):,.2f}", color=nr_color)
+        metric_card("No Realizado", fmt_moneda(ganancia_no_real, signo=True), color=nr_color)
 
 else:
     st.info("Añadí operaciones o aportes para ver tu dashboard.")
@@ -419,8 +332,8 @@ c1, c2 = st.columns(2)
 with c1:
     if not posiciones_df.empty and 'valor_mercado_usd' in posiciones_df.columns:
         fig_pie = px.pie(
-            posiciones_df,
-            values='valor_mercado_usd',
+            posiciones_df.assign(valor_vista=a_vista(posiciones_df['valor_mercado_usd'])),
+            values='valor_vista',
             names='ticker',
             hole=0.55,
             color_discrete_sequence=PIE_COLORS,
@@ -428,7 +341,7 @@ with c1:
         fig_pie.update_traces(
             textfont=dict(family="JetBrains Mono", size=11, color="#cbd5e1"),
             marker=dict(line=dict(color="#070c18", width=2)),
-            hovertemplate="<b>%{label}</b><br>US$ %{value:,.2f}<br>%{percent}<extra></extra>",
+            hovertemplate=f"<b>%{{label}}</b><br>{'AR$' if moneda_vista == 'ARS' else 'US$'} %{{value:,.2f}}<br>%{{percent}}<extra></extra>",
         )
         fig_pie.update_layout(
             **{k: v for k, v in dict(
@@ -439,7 +352,7 @@ with c1:
                 margin=dict(l=16, r=16, t=40, b=16),
                 title=dict(text="Diversificación por activo", font=dict(color="#64748b", size=12, family="DM Sans")),
                 annotations=[dict(
-                    text=f"<b>US$ {valor_acciones_usd:,.0f}</b>",
+                    text=f"<b>{fmt_moneda(valor_acciones_usd)}</b>",
                     x=0.5, y=0.5, font_size=14,
                     font_color="#f1f5f9", font_family="JetBrains Mono",
                     showarrow=False
@@ -456,7 +369,9 @@ with c1:
         """, unsafe_allow_html=True)
 
 with c2:
-    evolucion_df = calcular_evolucion_patrimonio(operaciones_df, precio_dolar_hoy)
+    evolucion_df = calcular_evolucion_patrimonio(valores_diarios)
+    if evolucion_df is not None and moneda_vista == 'ARS':
+        evolucion_df['Total USD'] = usd_a_moneda(evolucion_df['Total USD'], evolucion_df['Fecha'], serie_dolar, 'ARS')
     if evolucion_df is not None and not evolucion_df.empty:
         fig_ev = go.Figure()
         fig_ev.add_trace(go.Scatter(
@@ -465,11 +380,11 @@ with c2:
             fill='tozeroy',
             fillcolor='rgba(16,185,129,0.07)',
             line=dict(color='#10b981', width=2),
-            hovertemplate="<b>%{x|%d %b %Y}</b><br>US$ %{y:,.2f}<extra></extra>",
+            hovertemplate=f"<b>%{{x|%d %b %Y}}</b><br>{'AR$' if moneda_vista == 'ARS' else 'US$'} %{{y:,.2f}}<extra></extra>",
             name='Patrimonio'
         ))
         fig_ev.update_layout(
-            title=dict(text="Evolución histórica (USD)", font=dict(color="#64748b", size=12, family="DM Sans")),
+            title=dict(text=f"Evolución histórica ({moneda_vista})", font=dict(color="#64748b", size=12, family="DM Sans")),
             paper_bgcolor="rgba(0,0,0,0)",
             plot_bgcolor="#0a0f1e",
             font=dict(color="#64748b", family="JetBrains Mono"),
@@ -488,6 +403,56 @@ with c2:
             </div>
         """, unsafe_allow_html=True)
 
+# ── EXPOSICIÓN POR MONEDA ─────────────────────────────────────────
+# Acciones por moneda de cotización (.BA en pesos) más el efectivo. La
+# historia agrupa las columnas de la misma matriz de valores (sin efectivo,
+# que no tiene historia).
+if not posiciones_df.empty or saldo_efectivo_usd != 0 or saldo_efectivo_ars != 0:
+    st.markdown("<div style='height:12px'></div>", unsafe_allow_html=True)
+    x1, x2 = st.columns(2)
+    es_ars = posiciones_df['ticker'].str.endswith('.BA') if not posiciones_df.empty else pd.Series(dtype=bool)
+    exposicion = pd.Series({
+        'Acciones USD': posiciones_df.loc[~es_ars, 'valor_mercado_usd'].sum() if not posiciones_df.empty else 0.0,
+        'Acciones ARS': posiciones_df.loc[es_ars, 'valor_mercado_usd'].sum() if not posiciones_df.empty else 0.0,
+        'Efectivo USD': saldo_efectivo_usd,
+        'Efectivo ARS': valor_ars_en_usd,
+    })
+    exposicion = exposicion[exposicion > 0]
+    with x1:
+        fig_exp = go.Figure(go.Pie(
+            labels=exposicion.index, values=a_vista(exposicion.values),
+            hole=0.55, marker=dict(colors=['#3b82f6', '#f59e0b', '#60a5fa', '#fbbf24'],
+                                   line=dict(color="#070c18", width=2)),
+            hovertemplate="<b>%{label}</b><br>%{value:,.2f}<br>%{percent}<extra></extra>",
+        ))
+        fig_exp = apply_plotly_style(fig_exp)
+        total_ars = exposicion.filter(like='ARS').sum() / exposicion.sum() if exposicion.sum() > 0 else 0
+        fig_exp.update_layout(
+            title=dict(text="Exposición por moneda", font=dict(color="#64748b", size=12, family="DM Sans")),
+            annotations=[dict(text=f"<b>{total_ars:.0%} ARS</b>", x=0.5, y=0.5, font_size=14,
+                              font_color="#f1f5f9", font_family="JetBrains Mono", showarrow=False)],
+        )
+        st.plotly_chart(fig_exp, use_container_width=True)
+    with x2:
+        if valores_diarios is not None:
+            por_moneda = exposicion_moneda(valores_diarios)
+            pct = por_moneda.div(por_moneda.sum(axis=1).where(lambda t: t > 0), axis=0).dropna(how='all') * 100
+            fig_pm = go.Figure()
+            for mon, color in [('USD', '#3b82f6'), ('ARS', '#f59e0b')]:
+                if mon not in pct: continue
+                fig_pm.add_trace(go.Scatter(
+                    x=pct.index, y=pct[mon], name=f"Acciones {mon}", stackgroup='m',
+                    line=dict(width=1, color=color),
+                    hovertemplate=f"{mon} %{{y:.1f}}%<extra></extra>",
+                ))
+            fig_pm = apply_plotly_style(fig_pm)
+            fig_pm.update_layout(
+                title=dict(text="Acciones por moneda de cotización (histórico)",
+                           font=dict(color="#64748b", size=12, family="DM Sans")),
+                yaxis_ticksuffix="%", yaxis_range=[0, 100], hovermode="x unified",
+            )
+            st.plotly_chart(fig_pm, use_container_width=True)
+
 st.divider()
 
 # ── ADD OPERATION FORM ────────────────────────────────────────────
@@ -503,9 +468,12 @@ with st.form("operacion_form", clear_on_submit=True):
     with c4: moneda_op   = st.selectbox("Moneda", ["USD", "ARS"])
     with c5: cantidad_op = st.number_input("Cantidad", min_value=0.0, step=0.0001, format="%.4f")
 
-    pf_col, precio_col = st.columns([1, 2])
+    pf_col, precio_col, lote_col = st.columns([1, 1.4, 0.6])
     with precio_col:
         precio_op = st.number_input("Precio Unitario", min_value=0.0, step=0.0001, format="%.4f")
+    with lote_col:
+        lote_op = st.text_input("Lote (#compra)", placeholder="opcional",
+                                help="Solo ventas: ID de la compra a la que se imputa (método lote específico)")
     with pf_col:
         portfolios_form = ver_portafolios(USER_ID)
         if not portfolios_form.empty:
@@ -525,14 +493,18 @@ with st.form("operacion_form", clear_on_submit=True):
         else:
             tk = ticker_op.upper()
             if tk in CRIPTOS: tk = f"{tk}-USD"
-            anadir_operacion(fecha_op, tk, tipo_op, cantidad_op, precio_op, moneda_op, USER_ID, pf_sel_id)
+            lote_id = int(lote_op.strip().lstrip('#')) if tipo_op == "Venta" and lote_op.strip().lstrip('#').isdigit() else None
+            anadir_operacion(fecha_op, tk, tipo_op, cantidad_op, precio_op, moneda_op, USER_ID, pf_sel_id, lote_id)
             st.success(f"✓ Operación registrada — {tipo_op} {cantidad_op:.4f} {tk} → {pf_sel_label}")
             st.rerun()
 
 st.divider()
 
 # ── OPEN POSITIONS TABLE ──────────────────────────────────────────
-section_header("Posiciones Actuales", f"{len(posiciones_df)} activos en cartera")
+section_header(
+    f"Posiciones al {fecha_ver.strftime('%d/%m/%Y')}" if historico else "Posiciones Actuales",
+    f"{len(posiciones_df)} activos en cartera"
+)
 
 if not posiciones_df.empty:
     df_show = posiciones_df[[
@@ -562,6 +534,21 @@ if not posiciones_df.empty:
         }, na_rep="-")
     )
     st.dataframe(styled, use_container_width=True, hide_index=True)
+
+    if historico:
+        st.caption("Efectivo: saldo actual (el efectivo no tiene historia).")
+    with st.expander(f"lotes abiertos{' hoy' if historico else ''} · {METODOS[metodo_costo()]}"):
+        lotes_df, _ = ver_lotes(USER_ID, portfolio_id_sel)
+        st.dataframe(
+            lotes_df.rename(columns={
+                'ticker':'Ticker','moneda':'Moneda','op_id':'Compra #','fecha':'Fecha',
+                'cantidad':'Cantidad','coste_unitario':'Coste unitario'
+            }).style.format({
+                'Fecha': lambda f: f.strftime('%Y-%m-%d') if pd.notna(f) else '-',
+                'Cantidad': '{:,.4f}', 'Coste unitario': '${:,.4f}',
+            }),
+            use_container_width=True, hide_index=True
+        )
 else:
     st.info("Sin posiciones abiertas.")
 
@@ -571,9 +558,8 @@ st.divider()
 section_header("Historial de Operaciones")
 
 if not operaciones_df.empty:
-    if 'moneda' not in operaciones_df.columns:
-        operaciones_df['moneda'] = 'USD'
-    df_hist = operaciones_df.sort_values('fecha', ascending=False).copy()
+    # tal cual se cargaron (sin ajuste por splits)
+    df_hist = ver_operaciones(USER_ID, portfolio_id_sel, ajustadas=False).sort_values('fecha', ascending=False)
     df_hist['fecha'] = pd.to_datetime(df_hist['fecha']).dt.strftime('%Y-%m-%d')
 
     for _, row in df_hist.iterrows():
@@ -585,6 +571,8 @@ if not operaciones_df.empty:
             '<div style="display:flex;gap:16px;align-items:center;flex-wrap:wrap">'
             '<span style="color:#f1f5f9;font-family:JetBrains Mono,monospace;font-size:0.95rem;font-weight:500">'
             + str(row['ticker']) + '</span>'
+            '<span style="color:#334155;font-family:JetBrains Mono,monospace;font-size:0.75rem">#'
+            + str(row['id']) + '</span>'
             '<span style="color:' + tipo_color + ';font-family:JetBrains Mono,monospace;font-size:0.82rem">'
             + str(row['tipo']) + '</span>'
             '<span style="color:#475569;font-family:JetBrains Mono,monospace;font-size:0.78rem">'
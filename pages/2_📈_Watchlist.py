@@ -3,6 +3,7 @@ import psycopg2
 import pandas as pd
 import yfinance as yf
 from utils import apply_styles, section_header
+from mercado import obtener_fundamentales
 
 if 'user' not in st.session_state or st.session_state.user is None:
     st.error("Debes iniciar sesión.")
@@ -89,26 +90,36 @@ def ver_carpetas(user_id):
     return sorted([c for c in df['carpeta'].dropna().unique() if c])
 
 @st.cache_data(ttl=600)
+def obtener_cotizaciones(tickers):
+    """Último cierre y cierre de hace 7 ruedas, en una sola descarga."""
+    if not tickers: return {}
+    try:
+        raw = yf.download(tickers, period="1mo", progress=False, auto_adjust=True)
+        close = raw['Close'] if isinstance(raw.columns, pd.MultiIndex) else raw[['Close']].rename(columns={'Close': tickers[0]})
+    except:
+        return {}
+    cot = {}
+    for t in tickers:
+        if t not in close.columns: continue
+        hist = close[t].dropna()
+        if hist.empty: continue
+        rend = (hist.iloc[-1] - hist.iloc[-8]) / hist.iloc[-8] * 100 if len(hist) > 7 else None
+        cot[t] = {'precio': float(hist.iloc[-1]), 'rend': rend}
+    return cot
+
 def obtener_info_watchlist(tickers):
+    """Cotización (10 min) + fundamentales guardados (refresco diario)."""
+    cot  = obtener_cotizaciones(tickers)
+    fund = obtener_fundamentales(tickers)
     info = {}
     for t in tickers:
-        try:
-            obj  = yf.Ticker(t)
-            dat  = obj.info
-            hist = obj.history(period="1mo")
-            rend = (
-                (hist['Close'].iloc[-1] - hist['Close'].iloc[-8]) / hist['Close'].iloc[-8] * 100
-                if len(hist) > 7 else None
-            )
-            info[t] = {
-                'precio': dat.get('currentPrice', 0),
-                'pe':     dat.get('trailingPE'),
-                'rend':   rend,
-                'min52':  dat.get('fiftyTwoWeekLow'),
-                'max52':  dat.get('fiftyTwoWeekHigh'),
-            }
-        except:
-            info[t] = {'precio': 0}
+        d = dict(cot.get(t, {'precio': 0, 'rend': None}))
+        if t in fund.index:
+            f = fund.loc[t]
+            d['pe']    = f['pe']    if pd.notna(f['pe'])    else None
+            d['min52'] = f['min52'] if pd.notna(f['min52']) else None
+            d['max52'] = f['max52'] if pd.notna(f['max52']) else None
+        info[t] = d
     return info
 
 CRIPTOS = {"BTC","ETH","SOL","USDT","BNB","XRP","ADA","DOGE","SHIB","DOT","DAI","MATIC","AVAX","TRX","LTC","LINK","ATOM","UNI"}
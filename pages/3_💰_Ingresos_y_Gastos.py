@@ -2,10 +2,14 @@ import streamlit as st
 import psycopg2
 import pandas as pd
 from datetime import date
-import plotly.express as px
 import plotly.graph_objects as go
-import requests
-from utils import apply_styles, metric_card, section_header, apply_plotly_style
+from utils import apply_styles, metric_card, section_header, apply_plotly_style, PIE_COLORS
+from mercado import dolar_actual
+from analitica import FRECUENCIAS_RECURRENTES, leer_extracto, acumulado_mes
+from finanzas import (resumen_mensual, movimientos_mes, ver_recurrentes, anadir_recurrente,
+                      eliminar_recurrente, materializar_recurrentes, proyectar_recurrentes,
+                      ver_reglas, guardar_regla, eliminar_regla, categorizar_extracto, importar_movimientos,
+                      ver_presupuestos, guardar_presupuesto, estado_presupuestos)
 
 if 'user' not in st.session_state or st.session_state.user is None:
     st.error("Debes iniciar sesión.")
@@ -37,15 +41,6 @@ def anadir_flujo(fecha, tipo, categoria, monto, descripcion, moneda, user_id):
     )
     conn.commit(); conn.close()
 
-def ver_flujos(user_id):
-    conn = conectar_db()
-    df = pd.read_sql_query(
-        "SELECT * FROM finanzas_personales WHERE user_id=%s ORDER BY fecha DESC",
-        conn, params=(user_id,)
-    )
-    conn.close()
-    return df
-
 def eliminar_flujo(flujo_id, user_id):
     conn = conectar_db()
     conn.cursor().execute(
@@ -62,7 +57,7 @@ def ver_categorias(user_id, tipo):
     defaults_ing = ["Sueldo","Inversiones","Dividendo Recibido","Otros"]
     defaults_gas = ["Alquiler","Tarjeta de Crédito","Inversiones","Comida","Ocio","Otros"]
     base = defaults_ing if tipo == 'Ingreso' else defaults_gas
-    return base + df['nombre'].tolist(), df
+    return base + [n for n in df['nombre'] if n not in base], df
 
 def anadir_categoria(user_id, tipo, nombre):
     conn = conectar_db()
@@ -84,18 +79,8 @@ def eliminar_categoria(id_cat, user_id):
     )
     conn.commit(); conn.close()
 
-@st.cache_data(ttl=300)
-def obtener_dolar():
-    if 'precio_dolar_compartido' in st.session_state:
-        return st.session_state['precio_dolar_compartido']
-    try:
-        r = requests.get("https://dolarapi.com/v1/dolares/cripto", timeout=5)
-        if r.status_code == 200: return float(r.json()['venta'])
-    except: pass
-    return 1150.0
-
 # ── HEADER ────────────────────────────────────────────────────────
-dolar = obtener_dolar()
+dolar, _ = dolar_actual()
 st.markdown("<h1>Ingresos y Gastos</h1>", unsafe_allow_html=True)
 st.markdown(
     f'<div style="color:#475569;font-size:0.85rem;font-family:JetBrains Mono,monospace;'
@@ -127,6 +112,114 @@ with st.expander("gestionar categorias"):
             c1.markdown(f'<span style="color:#94a3b8;font-size:0.85rem">{r["nombre"]}</span>', unsafe_allow_html=True)
             if c2.button("✕", key=f"cg{r['id']}"): eliminar_categoria(r['id'], USER_ID); st.rerun()
 
+# ── RECURRENTES (EXPANDER) ────────────────────────────────────────
+# Lo vencido se inserta de una vez por día (o al cambiar las reglas); lo futuro solo se proyecta
+clave_materializado = f"recurrentes_materializados_{USER_ID}"
+if st.session_state.get(clave_materializado) != date.today():
+    materializar_recurrentes(USER_ID)
+    st.session_state[clave_materializado] = date.today()
+
+with st.expander("movimientos recurrentes"):
+    with st.form("fr", clear_on_submit=True):
+        c1, c2, c3, c4 = st.columns([1, 1, 1.5, 1.5])
+        rt = c1.selectbox("Tipo", ["Ingreso", "Gasto"], key="tr")
+        rm = c2.selectbox("Moneda", ["ARS", "USD"], key="mr")
+        rl, _ = ver_categorias(USER_ID, rt)
+        rc = c3.selectbox("Categoría", rl, key="cr")
+        rv = c4.number_input("Monto", min_value=0.0, step=0.01, format="%.2f", key="vr")
+        c5, c6, c7, c8 = st.columns([1, 1, 1, 2])
+        rf = c5.selectbox("Frecuencia", list(FRECUENCIAS_RECURRENTES), index=2)
+        ri = c6.date_input("Desde", value=date.today(), key="ir")
+        rh = c7.date_input("Hasta (opcional)", value=None, key="hr")
+        rd = c8.text_input("Descripción (opcional)", key="dr")
+        if st.form_submit_button("Guardar regla", use_container_width=True) and rv > 0:
+            anadir_recurrente(USER_ID, rt, rc, rv, rm, rd, rf, ri, rh)
+            st.session_state.pop(clave_materializado, None)
+            st.rerun()
+
+    df_rec = ver_recurrentes(USER_ID)
+    for _, r in df_rec.iterrows():
+        c1, c2 = st.columns([3, 1])
+        hasta_txt = f" → {pd.Timestamp(r['fin']):%Y-%m-%d}" if pd.notna(r['fin']) else ""
+        c1.markdown(
+            f'<span style="color:#94a3b8;font-size:0.85rem">{r["tipo"]} · {r["categoria"]} · '
+            f'{r["moneda"]} {r["monto"]:,.2f} · {r["frecuencia"]} desde {pd.Timestamp(r["inicio"]):%Y-%m-%d}{hasta_txt}</span>',
+            unsafe_allow_html=True
+        )
+        if c2.button("✕", key=f"rr{r['id']}"):
+            eliminar_recurrente(r['id'], USER_ID)
+            st.session_state.pop(clave_materializado, None)
+            st.rerun()
+
+# ── IMPORTAR EXTRACTO (EXPANDER) ──────────────────────────────────
+with st.expander("importar extracto"):
+    c1, c2, c3 = st.columns([2, 1, 1])
+    archivo = c1.file_uploader("CSV del banco o la tarjeta", type=["csv", "txt"])
+    im = c2.selectbox("Moneda", ["ARS", "USD"], key="mi")
+    gp = c3.checkbox("Gastos en positivo", help="Resúmenes de tarjeta que traen los consumos sin signo")
+
+    if archivo is not None:
+        archivo.seek(0)
+        try:
+            ext = categorizar_extracto(USER_ID, leer_extracto(archivo, gastos_positivos=gp))
+        except ValueError as e:
+            st.error(str(e)); ext = None
+        if ext is not None and ext.empty:
+            st.info("El archivo no tiene movimientos.")
+        elif ext is not None:
+            cats = sorted(set(ver_categorias(USER_ID, "Ingreso")[0]) | set(ver_categorias(USER_ID, "Gasto")[0]))
+            ext.insert(0, 'importar', ~ext['duplicado'])
+            st.caption(f"{len(ext)} líneas · {ext['duplicado'].sum()} ya cargadas · "
+                       f"{ext['categoria'].notna().sum()} categorizadas por reglas")
+            ext['categoria'] = ext['categoria'].fillna('Otros')
+            editado = st.data_editor(
+                ext, hide_index=True, use_container_width=True, key="editor_extracto",
+                column_config={
+                    'importar':    st.column_config.CheckboxColumn("Importar"),
+                    'fecha':       st.column_config.DateColumn("Fecha", format="YYYY-MM-DD"),
+                    'tipo':        st.column_config.SelectboxColumn("Tipo", options=["Ingreso", "Gasto"]),
+                    'categoria':   st.column_config.SelectboxColumn("Categoría", options=cats),
+                    'monto':       st.column_config.NumberColumn("Monto", format="%.2f"),
+                    'descripcion': "Descripción",
+                    'duplicado':   st.column_config.CheckboxColumn("Ya cargado", disabled=True),
+                },
+            )
+            sel = editado[editado['importar']]
+            if st.button(f"Importar {len(sel)} movimientos", use_container_width=True, disabled=sel.empty):
+                n = importar_movimientos(USER_ID, sel, im)
+                st.success(f"✓ {n} movimientos importados.")
+                st.rerun()
+
+    st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
+    st.caption("Reglas de categorización (además de las aprendidas de descripciones ya cargadas)")
+    with st.form("fg", clear_on_submit=True):
+        c1, c2, c3, c4 = st.columns([2, 0.8, 1, 1.5])
+        gpat = c1.text_input("Contiene / regex")
+        gre  = c2.checkbox("Regex")
+        gti  = c3.selectbox("Tipo", ["Todos", "Ingreso", "Gasto"], key="tg")
+        gcat = c4.selectbox("Categoría", sorted(set(ver_categorias(USER_ID, "Ingreso")[0]) |
+                                                 set(ver_categorias(USER_ID, "Gasto")[0])), key="gc")
+        c5, c6, c7 = st.columns(3)
+        gmin = c5.number_input("Monto desde", min_value=0.0, value=None, step=0.01, format="%.2f")
+        gmax = c6.number_input("Monto hasta", min_value=0.0, value=None, step=0.01, format="%.2f")
+        gpri = c7.number_input("Prioridad", value=0, step=1)
+        if st.form_submit_button("Guardar regla", use_container_width=True) and (gpat or gmin is not None or gmax is not None):
+            guardar_regla(USER_ID, gpat, gre and bool(gpat), None if gti == "Todos" else gti, gcat, gmin, gmax, int(gpri))
+            st.rerun()
+
+    for _, r in ver_reglas(USER_ID).iterrows():
+        c1, c2 = st.columns([3, 1])
+        mn = "0" if pd.isna(r['monto_min']) else f"{r['monto_min']:,.0f}"
+        mx = "∞" if pd.isna(r['monto_max']) else f"{r['monto_max']:,.0f}"
+        rango = "" if pd.isna(r['monto_min']) and pd.isna(r['monto_max']) else f" · {mn}–{mx}"
+        c1.markdown(
+            f'<span style="color:#94a3b8;font-size:0.85rem;font-family:JetBrains Mono,monospace">'
+            f'{"/" + r["patron"] + "/" if r["es_regex"] else (r["patron"] or "cualquier descripción")}</span>'
+            f'<span style="color:#475569;font-size:0.8rem"> → {r["categoria"]} · {r["tipo"] or "Todos"}{rango} · p{r["prioridad"]}</span>',
+            unsafe_allow_html=True
+        )
+        if c2.button("✕", key=f"rg{r['id']}"): eliminar_regla(r['id'], USER_ID); st.rerun()
+
 st.divider()
 
 # ── NEW MOVEMENT FORM ─────────────────────────────────────────────
@@ -148,31 +241,38 @@ with st.form("ff", clear_on_submit=True):
 st.divider()
 
 # ── RESUMEN ───────────────────────────────────────────────────────
-df = ver_flujos(USER_ID)
+# Totales desde el agregado mensual (SQL); el detalle se baja solo para el mes elegido
+res = resumen_mensual(USER_ID)
+# overlay virtual: recurrentes del resto del mes y los 3 siguientes, sin guardarlos
+hoy  = pd.Timestamp.now()
+proy = proyectar_recurrentes(USER_ID, (hoy.to_period('M') + 3).end_time.normalize())
 
-if not df.empty:
-    if 'moneda' not in df.columns: df['moneda'] = 'ARS'
-    df['monto_usd'] = df.apply(
-        lambda x: x['monto'] if x['moneda'] == 'USD' else x['monto'] / dolar, axis=1
-    )
-    df['fecha'] = pd.to_datetime(df['fecha'])
-    hoy = pd.Timestamp.now()
-    df_mes = df[(df['fecha'].dt.month == hoy.month) & (df['fecha'].dt.year == hoy.year)]
+if not res.empty:
+    inv     = (res['tipo'] == 'Gasto') & (res['categoria'] == 'Inversiones')
+    res_mes = res[res['mes'] == hoy.to_period('M').start_time]
+    inv_m   = inv.loc[res_mes.index]
 
-    ing_mes = df_mes[df_mes['tipo'] == 'Ingreso']['monto_usd'].sum()
-    gas_mes = df_mes[df_mes['tipo'] == 'Gasto']['monto_usd'].sum()
-    inv_mes = df_mes[(df_mes['tipo'] == 'Gasto') & (df_mes['categoria'] == 'Inversiones')]['monto_usd'].sum()
+    ing_mes = res_mes.loc[res_mes['tipo'] == 'Ingreso', 'monto_usd'].sum()
+    gas_mes = res_mes.loc[res_mes['tipo'] == 'Gasto', 'monto_usd'].sum()
+    inv_mes = res_mes.loc[inv_m, 'monto_usd'].sum()
     vid_mes = gas_mes - inv_mes
 
-    ing_hist = df[df['tipo'] == 'Ingreso']['monto_usd'].sum()
-    gas_hist = df[df['tipo'] == 'Gasto']['monto_usd'].sum()
-    inv_hist = df[(df['tipo'] == 'Gasto') & (df['categoria'] == 'Inversiones')]['monto_usd'].sum()
+    ing_hist = res.loc[res['tipo'] == 'Ingreso', 'monto_usd'].sum()
+    gas_hist = res.loc[res['tipo'] == 'Gasto', 'monto_usd'].sum()
+    inv_hist = res.loc[inv, 'monto_usd'].sum()
     ahorro   = ing_hist - (gas_hist - inv_hist)
 
+    proy_mes = proy[proy['fecha'].dt.to_period('M') == hoy.to_period('M')] if not proy.empty else proy
+    def _pendiente(mask):
+        total = proy_mes.loc[mask(proy_mes), 'monto_usd'].sum() if not proy_mes.empty else 0.0
+        return f"+ US$ {total:,.2f} recurrente a fin de mes" if total > 0 else None
+
     section_header("Resumen del mes", hoy.strftime('%B %Y'))
     c1, c2, c3, c4 = st.columns(4)
-    with c1: metric_card("Ingresos del mes",  f"US$ {ing_mes:,.2f}", color="green")
-    with c2: metric_card("Gastos de vida",     f"US$ {vid_mes:,.2f}", color="red")
+    with c1: metric_card("Ingresos del mes",  f"US$ {ing_mes:,.2f}", color="green",
+                         subtitle=_pendiente(lambda d: d['tipo'] == 'Ingreso'))
+    with c2: metric_card("Gastos de vida",     f"US$ {vid_mes:,.2f}", color="red",
+                         subtitle=_pendiente(lambda d: (d['tipo'] == 'Gasto') & (d['categoria'] != 'Inversiones')))
     with c3: metric_card("Invertido el mes",   f"US$ {inv_mes:,.2f}", color="blue")
     with c4: metric_card("Ahorro histórico",   f"US$ {ahorro:,.2f}",
                          subtitle="Ingresos − gastos de vida acumulados",
@@ -181,26 +281,115 @@ if not df.empty:
     st.markdown("<div style='height:20px'></div>", unsafe_allow_html=True)
 
     # Gráfico mensual (sin inversiones para ver flujo real de vida)
-    dfg = df[df['categoria'] != 'Inversiones'].copy()
+    # Proyectado apilado (más claro) sobre lo real de cada mes
+    dfg = res[res['categoria'] != 'Inversiones']
     if not dfg.empty:
-        men = dfg.groupby([dfg['fecha'].dt.to_period('M'), 'tipo'])['monto_usd'].sum().reset_index()
-        men['fecha'] = men['fecha'].dt.to_timestamp()
-        men['tipo_label'] = men['tipo'].map({'Ingreso': 'Ingresos', 'Gasto': 'Gastos'})
-
-        fig = px.bar(
-            men, x='fecha', y='monto_usd', color='tipo_label', barmode='group',
-            color_discrete_map={'Ingresos': '#10b981', 'Gastos': '#ef4444'},
-            labels={'monto_usd': 'USD', 'fecha': '', 'tipo_label': ''},
-        )
-        fig.update_traces(marker_line_width=0)
+        men = dfg.groupby(['mes', 'tipo'])['monto_usd'].sum().unstack(fill_value=0)
+        pg  = proy[proy['categoria'] != 'Inversiones'] if not proy.empty else proy
+        pro = (pg.groupby([pg['fecha'].dt.to_period('M').dt.start_time, 'tipo'])['monto_usd'].sum()
+               .unstack(fill_value=0) if not pg.empty else pd.DataFrame())
+        meses = men.index.union(pro.index)
+        men = men.reindex(index=meses, columns=['Ingreso', 'Gasto'], fill_value=0)
+        pro = pro.reindex(index=meses, columns=['Ingreso', 'Gasto'], fill_value=0)
+
+        fig = go.Figure()
+        for tipo, label, color, claro in [('Ingreso', 'Ingresos', '#10b981', 'rgba(16,185,129,0.35)'),
+                                          ('Gasto', 'Gastos', '#ef4444', 'rgba(239,68,68,0.35)')]:
+            fig.add_trace(go.Bar(
+                x=meses, y=men[tipo], name=label, offsetgroup=tipo,
+                marker=dict(color=color, line=dict(width=0)),
+                hovertemplate=f"{label}<br>%{{x|%b %Y}}<br>US$ %{{y:,.2f}}<extra></extra>",
+            ))
+            if pro[tipo].any():
+                fig.add_trace(go.Bar(
+                    x=meses, y=pro[tipo], base=men[tipo], name=f"{label} proyectados", offsetgroup=tipo,
+                    marker=dict(color=claro, line=dict(width=0)),
+                    hovertemplate=f"{label} proyectados<br>%{{x|%b %Y}}<br>US$ %{{y:,.2f}}<extra></extra>",
+                ))
         fig = apply_plotly_style(fig, "Ingresos vs Gastos mensuales (sin inversiones)")
+        fig.update_layout(barmode='group', yaxis_title="USD")
         st.plotly_chart(fig, use_container_width=True)
 
 st.divider()
 
+# ── PRESUPUESTOS ──────────────────────────────────────────────────
+# Gasto del mes por (día, categoría) agregado en la base; proyección a fin de mes
+ESTADO_COLOR = {'ok': '#10b981', 'en riesgo': '#f59e0b', 'excedido': '#ef4444'}
+pres, diario_mes = estado_presupuestos(USER_ID)
+section_header("Presupuestos", f"{hoy.strftime('%B %Y')} · día {hoy.day} de {hoy.days_in_month} · USD")
+
+with st.expander("definir presupuestos"):
+    actuales = ver_presupuestos(USER_ID)
+    with st.form("fp", clear_on_submit=True):
+        c1, c2 = st.columns([2, 1])
+        pc = c1.selectbox("Categoría", ver_categorias(USER_ID, "Gasto")[0])
+        pm = c2.number_input("Presupuesto mensual (USD, 0 = sin presupuesto)", min_value=0.0, step=10.0, format="%.2f")
+        if st.form_submit_button("Guardar", use_container_width=True):
+            guardar_presupuesto(USER_ID, pc, pm)
+            st.rerun()
+    for cat, monto in actuales.items():
+        c1, c2 = st.columns([3, 1])
+        c1.markdown(f'<span style="color:#94a3b8;font-size:0.85rem">{cat} · US$ {monto:,.2f}</span>', unsafe_allow_html=True)
+        if c2.button("✕", key=f"pp{cat}"): guardar_presupuesto(USER_ID, cat, None); st.rerun()
+
+if pres.empty:
+    st.info("Sin presupuestos definidos.")
+else:
+    alertas = pres[pres['estado'] != 'ok']
+    if not alertas.empty:
+        st.warning("Al ritmo actual se pasan del presupuesto: " + ", ".join(
+            f"{r['categoria']} (US$ {r['proyectado']:,.0f} / {r['presupuesto']:,.0f})" for _, r in alertas.iterrows()
+        ))
+    fraccion_mes = hoy.day / hoy.days_in_month * 100
+    for _, r in pres.iterrows():
+        color = ESTADO_COLOR[r['estado']]
+        usado = min(100, r['usado'] * 100)
+        proy_pct = min(100, r['proyectado'] / r['presupuesto'] * 100)
+        st.markdown(
+            f'<div style="display:flex;justify-content:space-between;margin-top:10px">'
+            f'<span style="color:#cbd5e1;font-size:0.85rem">{r["categoria"]}</span>'
+            f'<span style="color:{color};font-family:JetBrains Mono,monospace;font-size:0.8rem">'
+            f'US$ {r["gastado"]:,.0f} / {r["presupuesto"]:,.0f} · proyectado {r["proyectado"]:,.0f}</span></div>'
+            f'<div style="position:relative;background:#1a2540;border-radius:3px;height:6px;margin:5px 0 2px">'
+            f'<div style="position:absolute;background:{color}55;width:{proy_pct:.1f}%;height:6px;border-radius:3px"></div>'
+            f'<div style="position:absolute;background:{color};width:{usado:.1f}%;height:6px;border-radius:3px"></div>'
+            f'<div style="position:absolute;left:{fraccion_mes:.1f}%;top:-3px;width:1px;height:12px;background:#64748b"></div></div>',
+            unsafe_allow_html=True
+        )
+
+    # Acumulado del mes contra el ritmo lineal de cada presupuesto
+    acum = acumulado_mes(diario_mes, hoy)
+    acum = acum[acum.index <= hoy.normalize()]
+    cats_p = [c for c in pres['categoria'] if c in acum.columns]
+    if cats_p:
+        st.markdown("<div style='height:12px'></div>", unsafe_allow_html=True)
+        fig_p = go.Figure()
+        for i, cat in enumerate(cats_p):
+            color = PIE_COLORS[i % len(PIE_COLORS)]
+            tope = pres.loc[pres['categoria'] == cat, 'presupuesto'].iloc[0]
+            fig_p.add_trace(go.Scatter(
+                x=acum.index, y=acum[cat], name=cat, line=dict(width=2, color=color),
+                hovertemplate=f"{cat}<br>%{{x|%d %b}}<br>US$ %{{y:,.2f}}<extra></extra>",
+            ))
+            fig_p.add_trace(go.Scatter(
+                x=[hoy.to_period('M').start_time, hoy.to_period('M').end_time.normalize()], y=[0, tope],
+                line=dict(width=1, dash='dot', color=color), showlegend=False, hoverinfo='skip',
+            ))
+        fig_p = apply_plotly_style(fig_p, "Gasto acumulado vs ritmo del presupuesto")
+        fig_p.update_layout(height=320, yaxis_tickprefix="$", hovermode="x unified")
+        st.plotly_chart(fig_p, use_container_width=True)
+
+st.divider()
+
 # ── HISTORIAL ─────────────────────────────────────────────────────
 section_header("Historial de movimientos")
 
+meses_hist = sorted(set(res['mes']) | {pd.Timestamp.now().to_period('M').start_time}, reverse=True) if not res.empty else []
+df = pd.DataFrame()
+if meses_hist:
+    mes_sel = st.selectbox("Mes", meses_hist, format_func=lambda m: m.strftime('%B %Y'), key="mes_historial")
+    df = movimientos_mes(USER_ID, mes_sel)
+
 if not df.empty:
     cols_h = st.columns([1, 0.8, 1.5, 0.7, 1.2, 2, 0.4])
     for col, lbl in zip(cols_h, ["Fecha","Tipo","Categoría","Moneda","Monto","Descripción",""]):
@@ -222,5 +411,7 @@ if not df.empty:
         cols[5].markdown(f'<span style="color:#475569;font-size:0.8rem">{r.get("descripcion","") or "—"}</span>', unsafe_allow_html=True)
         if cols[6].button("✕", key=f"del{r['id']}"): eliminar_flujo(r['id'], USER_ID); st.rerun()
         st.markdown("<div style='height:2px;background:#0a0f1e;margin:2px 0'></div>", unsafe_allow_html=True)
+elif meses_hist:
+    st.info("Sin movimientos en el mes.")
 else:
     st.info("Sin movimientos registrados.")
\ No newline at end of file
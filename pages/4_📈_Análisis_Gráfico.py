@@ -1,11 +1,16 @@
 import streamlit as st
-import psycopg2
 import pandas as pd
-import yfinance as yf
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import date
-from utils import apply_styles, metric_card, section_header, apply_plotly_style, portfolio_selector_sidebar
+from utils import apply_styles, metric_card, section_header, apply_plotly_style, portfolio_selector_sidebar, PIE_COLORS, ver_portafolios
+from mercado import (
+    serie_fx, dolar_actual, valor_diario, calcular_benchmarks, inicio_benchmarks,
+    ver_benchmarks_usuario, anadir_benchmark_usuario, eliminar_benchmark_usuario, definiciones_usuario,
+)
+from analitica import rendimiento_desde
+from cartera import ver_operaciones, ver_posiciones, ver_atribucion, ver_calendario
+from analitica import serie_rendimiento, grilla_calendario, MESES, DIAS_SEMANA
 
 if 'user' not in st.session_state or st.session_state.user is None:
     st.error("Debes iniciar sesión."); st.stop()
@@ -18,139 +23,11 @@ st.markdown("""<style>
 [data-testid="stNumberInputStepUp"] span{font-size:0!important}
 </style>""", unsafe_allow_html=True)
 
-# ── DB ────────────────────────────────────────────────────────────
-def conectar_db():
-    return psycopg2.connect(
-        host=st.secrets["connections"]["supabase"]["host"],
-        database=st.secrets["connections"]["supabase"]["database"],
-        user=st.secrets["connections"]["supabase"]["username"],
-        password=st.secrets["connections"]["supabase"]["password"],
-        port=st.secrets["connections"]["supabase"]["port"]
-    )
-
-def ver_operaciones(user_id, portfolio_id=None):
-    conn = conectar_db()
-    if portfolio_id is None:
-        df = pd.read_sql_query(
-            "SELECT * FROM operaciones WHERE user_id=%s ORDER BY fecha ASC",
-            conn, params=(user_id,)
-        )
-    else:
-        df = pd.read_sql_query(
-            "SELECT * FROM operaciones WHERE user_id=%s AND portfolio_id=%s ORDER BY fecha ASC",
-            conn, params=(user_id, portfolio_id)
-        )
-    conn.close()
-    return df
-
-@st.cache_data(ttl=600)
-def obtener_precios(tickers):
-    if not tickers: return {}
-    try:
-        return yf.Tickers(" ".join(tickers)).history(period='1d')['Close'].iloc[-1].to_dict()
-    except: return {}
-
-def calcular(df_ops):
-    if df_ops.empty: return pd.DataFrame(), pd.DataFrame()
-    df = df_ops.copy()
-    if 'moneda' not in df.columns: df['moneda'] = 'USD'
-    df['cantidad_neta'] = df.apply(lambda x: x['cantidad'] if x['tipo']=='Compra' else -x['cantidad'], axis=1)
-    df['coste']   = df['cantidad'] * df['precio']
-    df['ingreso'] = df['cantidad'] * df['precio']
-
-    pos = df.groupby(['ticker','moneda']).agg(
-        cant         =('cantidad_neta', 'sum'),
-        coste_compras=('coste',   lambda x: x[df.loc[x.index,'tipo']=='Compra'].sum()),
-        cant_compras =('cantidad', lambda x: x[df.loc[x.index,'tipo']=='Compra'].sum()),
-        total_ventas =('ingreso', lambda x: x[df.loc[x.index,'tipo']=='Venta'].sum()),
-        cant_ventas  =('cantidad', lambda x: x[df.loc[x.index,'tipo']=='Venta'].sum()),
-    ).reset_index()
-
-    pos['ppp']       = pos.apply(lambda x: x['coste_compras']/x['cant_compras'] if x['cant_compras']>0 else 0, axis=1)
-    pos['realizado'] = pos['total_ventas'] - (pos['ppp'] * pos['cant_ventas'])
-
-    abiertas = pos[pos['cant'] > 0.000001].copy()
-    if not abiertas.empty:
-        precios = obtener_precios(abiertas['ticker'].unique().tolist())
-        abiertas['precio']        = abiertas['ticker'].map(precios).fillna(0)
-        abiertas['valor_usd']     = abiertas.apply(
-            lambda x: (x['cant']*x['precio'])/1150 if x['moneda']=='ARS' else x['cant']*x['precio'], axis=1
-        )
-        abiertas['coste_usd']     = abiertas.apply(
-            lambda x: (x['cant']*x['ppp'])/1150 if x['moneda']=='ARS' else x['cant']*x['ppp'], axis=1
-        )
-        abiertas['ganancia_no_real'] = abiertas['valor_usd'] - abiertas['coste_usd']
-    return abiertas, pos[['ticker','realizado']]
-
-@st.cache_data(ttl=3600)
-def calcular_evolucion_portfolio(df_ops, precio_dolar):
-    """Calcula el valor total del portfolio día a día en USD."""
-    if df_ops.empty: return None
-    df_ops = df_ops.copy()
-    df_ops['fecha'] = pd.to_datetime(df_ops['fecha'])
-    tickers_usd = [t for t in df_ops['ticker'].unique() if not t.endswith('.BA')]
-    tickers_ars = [t for t in df_ops['ticker'].unique() if t.endswith('.BA')]
-    start_date  = df_ops['fecha'].min()
-    rango       = pd.date_range(start=start_date, end=date.today())
-    patrimonio  = pd.DataFrame(index=rango)
-
-    def descargar(tickers):
-        if not tickers: return pd.DataFrame()
-        try:
-            raw = yf.download(tickers, start=start_date, progress=False, auto_adjust=True)
-            if isinstance(raw.columns, pd.MultiIndex):
-                close = raw['Close']
-            else:
-                close = raw[['Close']].rename(columns={'Close': tickers[0]})
-            return close[~close.index.duplicated(keep='first')]
-        except: return pd.DataFrame()
-
-    px_usd = descargar(tickers_usd)
-    px_ars = descargar(tickers_ars)
-
-    for ticker in df_ops['ticker'].unique():
-        ops_t = df_ops[df_ops['ticker']==ticker].copy()
-        ops_t['cantidad_neta'] = ops_t['cantidad'].where(ops_t['tipo']=='Compra', -ops_t['cantidad'])
-        tenencias = ops_t.groupby('fecha')['cantidad_neta'].sum().cumsum().reindex(rango, method='ffill').fillna(0)
-        es_ars = ticker.endswith('.BA')
-        df_px  = px_ars if es_ars else px_usd
-        if not df_px.empty and ticker in df_px.columns:
-            precio_s = df_px[ticker].reindex(rango).ffill().fillna(0)
-        else:
-            precio_s = pd.Series(0, index=rango)
-        valor = tenencias * precio_s
-        if es_ars: valor = valor / precio_dolar
-        patrimonio[ticker] = valor
-
-    patrimonio['Total'] = patrimonio.sum(axis=1)
-    result = patrimonio[['Total']].reset_index().rename(columns={'index':'Fecha'})
-    return result[result['Fecha'] >= df_ops['fecha'].min()]
-
-@st.cache_data(ttl=3600)
-def calcular_benchmarks(start_date):
-    """Descarga benchmarks y los normaliza a base 100."""
-    benchmarks = {
-        'S&P 500':  '^GSPC',
-        'Nasdaq':   'QQQ',
-        'Merval':   '^MERV',
-        'Oro':      'GC=F',
-    }
-    result = {}
-    for nombre, ticker in benchmarks.items():
-        try:
-            df = yf.download(ticker, start=start_date, progress=False, auto_adjust=True)
-            if df.empty: continue
-            close = df['Close'].dropna()
-            close.index = pd.to_datetime(close.index)
-            if hasattr(close.columns, '__iter__') and not isinstance(close, pd.Series):
-                close = close.iloc[:, 0]
-            # Normalizar a 100 en la fecha inicial
-            base = close.iloc[0]
-            if base and base > 0:
-                # Guardamos el precio real — normalizamos a % en el gráfico según el período
-                result[nombre] = close.rename(nombre)
-        except: pass
-    return result
+def calcular_evolucion_portfolio(df_ops, serie_dolar):
+    """Valor total (USD) e índice TWR del portfolio por rueda hábil."""
+    valores = valor_diario(df_ops, serie_dolar)
+    if valores is None: return None
+    return serie_rendimiento(valores, df_ops, serie_dolar)
 
 # ── PORTFOLIO SELECTOR ────────────────────────────────────────────
 portfolio_id_sel, portfolio_label_sel = portfolio_selector_sidebar(USER_ID)
@@ -163,14 +40,15 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+precio_dolar, _ = dolar_actual()
 ops = ver_operaciones(USER_ID, portfolio_id_sel)
-abiertas, realizadas = calcular(ops)
+abiertas, realizadas = ver_posiciones(USER_ID, portfolio_id_sel, precio_dolar)
 
 if not ops.empty:
     # ── SUMMARY METRICS ───────────────────────────────────────────
-    total_no_real = abiertas['ganancia_no_real'].sum() if not abiertas.empty and 'ganancia_no_real' in abiertas.columns else 0
-    total_real    = realizadas['realizado'].sum() if not realizadas.empty else 0
-    total_valor   = abiertas['valor_usd'].sum() if not abiertas.empty and 'valor_usd' in abiertas.columns else 0
+    total_no_real = abiertas['ganancia_no_realizada_usd'].sum() if not abiertas.empty and 'ganancia_no_realizada_usd' in abiertas.columns else 0
+    total_real    = realizadas['ganancia_realizada_usd'].sum() if not realizadas.empty else 0
+    total_valor   = abiertas['valor_mercado_usd'].sum() if not abiertas.empty and 'valor_mercado_usd' in abiertas.columns else 0
 
     c1, c2, c3 = st.columns(3)
     with c1: metric_card("Valor de mercado",   f"US$ {total_valor:,.2f}", color="default")
@@ -190,13 +68,13 @@ if not ops.empty:
 
     with c1:
         section_header("Ganancia no realizada", "Posiciones abiertas")
-        if not abiertas.empty and 'ganancia_no_real' in abiertas.columns:
-            ab_sorted = abiertas.sort_values('ganancia_no_real', ascending=True)
+        if not abiertas.empty and 'ganancia_no_realizada_usd' in abiertas.columns:
+            ab_sorted = abiertas.sort_values('ganancia_no_realizada_usd', ascending=True)
             fig = go.Figure(go.Bar(
-                x=ab_sorted['ganancia_no_real'], y=ab_sorted['ticker'],
+                x=ab_sorted['ganancia_no_realizada_usd'], y=ab_sorted['ticker'],
                 orientation='h',
                 marker=dict(
-                    color=ab_sorted['ganancia_no_real'].apply(lambda v: '#10b981' if v >= 0 else '#ef4444'),
+                    color=ab_sorted['ganancia_no_realizada_usd'].apply(lambda v: '#10b981' if v >= 0 else '#ef4444'),
                     line=dict(width=0),
                 ),
                 hovertemplate="<b>%{y}</b><br>US$ %{x:,.2f}<extra></extra>",
@@ -210,14 +88,14 @@ if not ops.empty:
 
     with c2:
         section_header("Ganancia realizada", "Operaciones cerradas")
-        real = realizadas[realizadas['realizado'] != 0]
+        real = realizadas[realizadas['ganancia_realizada_usd'] != 0]
         if not real.empty:
-            real_sorted = real.sort_values('realizado', ascending=True)
+            real_sorted = real.sort_values('ganancia_realizada_usd', ascending=True)
             fig2 = go.Figure(go.Bar(
-                x=real_sorted['realizado'], y=real_sorted['ticker'],
+                x=real_sorted['ganancia_realizada_usd'], y=real_sorted['ticker'],
                 orientation='h',
                 marker=dict(
-                    color=real_sorted['realizado'].apply(lambda v: '#10b981' if v >= 0 else '#ef4444'),
+                    color=real_sorted['ganancia_realizada_usd'].apply(lambda v: '#10b981' if v >= 0 else '#ef4444'),
                     line=dict(width=0),
                 ),
                 hovertemplate="<b>%{y}</b><br>US$ %{x:,.2f}<extra></extra>",
@@ -233,12 +111,12 @@ if not ops.empty:
 
     # ── CHART: Coste vs Valor ─────────────────────────────────────
     section_header("Coste vs Valor de mercado", "Por activo en cartera")
-    if not abiertas.empty and 'valor_usd' in abiertas.columns:
-        melt = abiertas[['ticker','coste_usd','valor_usd']].melt(
-            id_vars='ticker', value_vars=['coste_usd','valor_usd'],
+    if not abiertas.empty and 'valor_mercado_usd' in abiertas.columns:
+        melt = abiertas[['ticker','coste_total_usd','valor_mercado_usd']].melt(
+            id_vars='ticker', value_vars=['coste_total_usd','valor_mercado_usd'],
             var_name='Métrica', value_name='Valor'
         )
-        melt['Métrica'] = melt['Métrica'].map({'coste_usd':'Coste', 'valor_usd':'Valor actual'})
+        melt['Métrica'] = melt['Métrica'].map({'coste_total_usd':'Coste', 'valor_mercado_usd':'Valor actual'})
         fig3 = px.bar(melt, x='ticker', y='Valor', color='Métrica', barmode='group',
                       color_discrete_map={'Coste':'#334155','Valor actual':'#3b82f6'},
                       labels={'ticker':'','Valor':'USD'})
@@ -255,14 +133,6 @@ if not ops.empty:
     ops['fecha'] = pd.to_datetime(ops['fecha'])
     start_date   = ops['fecha'].min()
 
-    # Precio dólar aproximado para conversión ARS
-    try:
-        import requests
-        r = requests.get("https://dolarapi.com/v1/dolares/cripto", timeout=5)
-        precio_dolar = float(r.json()['venta']) if r.status_code == 200 else 1150.0
-    except:
-        precio_dolar = 1150.0
-
     # ── Período y opciones ────────────────────────────────────────
     ctrl_col1, ctrl_col2 = st.columns([3, 2])
 
@@ -280,34 +150,55 @@ if not ops.empty:
             # NO clampeamos al start_date — los benchmarks muestran el período completo
             # el portfolio solo aparece desde cuando tenemos datos
 
+    definiciones = definiciones_usuario(USER_ID)
+    nombres_bench = [n for n, _ in definiciones]
     with ctrl_col2:
-        st.markdown("<div style='height:4px'></div>", unsafe_allow_html=True)
-        bc1, bc2, bc3, bc4 = st.columns(4)
-        mostrar_sp   = bc1.checkbox("S&P 500", value=True)
-        mostrar_ndq  = bc2.checkbox("Nasdaq",  value=True)
-        mostrar_merv = bc3.checkbox("Merval",  value=False)
-        mostrar_oro  = bc4.checkbox("Oro",     value=True)
+        bench_sel = st.multiselect(
+            "Benchmarks", nombres_bench,
+            default=[n for n in ['S&P 500', 'Nasdaq', 'Oro'] if n in nombres_bench],
+            label_visibility="collapsed"
+        )
+
+    with st.expander("mis benchmarks"):
+        with st.form("form_benchmark", clear_on_submit=True):
+            fb1, fb2 = st.columns([1, 2])
+            nb_nombre = fb1.text_input("Nombre", placeholder="60/40")
+            nb_comp   = fb2.text_input("Composición", placeholder="SPY:60, AGG:40  ·  o un ticker: VT")
+            if st.form_submit_button("Agregar") and nb_nombre and nb_comp:
+                try:
+                    anadir_benchmark_usuario(USER_ID, nb_nombre, nb_comp)
+                    st.rerun()
+                except ValueError as e:
+                    st.warning(f"Composición inválida: {e}")
+        for _, b in ver_benchmarks_usuario(USER_ID).iterrows():
+            cb1, cb2 = st.columns([5, 1])
+            cb1.markdown(
+                f'<span style="color:#cbd5e1;font-size:0.85rem">{b["nombre"]}</span> '
+                f'<span style="color:#475569;font-size:0.78rem;font-family:JetBrains Mono,monospace">{b["composicion"]}</span>',
+                unsafe_allow_html=True
+            )
+            if cb2.button("✕", key=f"delb_{b['id']}"):
+                eliminar_benchmark_usuario(b['id'], USER_ID)
+                st.rerun()
 
     with st.spinner("Calculando..."):
-        evolucion  = calcular_evolucion_portfolio(ops, precio_dolar)
-        # Benchmarks desde bench_start real (puede ser antes del inicio del portfolio)
-        benchmarks = calcular_benchmarks(bench_start)
+        evolucion  = calcular_evolucion_portfolio(ops, serie_fx())
+        # Historia completa una sola vez; el período se recorta en memoria
+        benchmarks = calcular_benchmarks(inicio_benchmarks(start_date), definiciones)
+        bench_pct  = rendimiento_desde(benchmarks, bench_start) if not benchmarks.empty else benchmarks
 
     if evolucion is not None and not evolucion.empty:
         fig_bench = go.Figure()
 
-        # Portfolio — siempre desde start_date (no podemos inventar datos anteriores)
-        port_vals = evolucion.set_index('Fecha')['Total']
-        # Filtramos al período pero con el inicio real del portfolio como límite inferior
+        # Portfolio — índice TWR (los aportes no cuentan como rendimiento),
+        # recortado y renormalizado igual que los benchmarks
         port_start = max(pd.Timestamp(bench_start), pd.Timestamp(start_date))
-        port_vals  = port_vals[port_vals.index >= port_start].dropna()
+        port_idx   = rendimiento_desde(evolucion[['indice']], port_start)
 
         port_pct  = None
-        base_port = None
-        if len(port_vals) > 0:
-            base_port = port_vals.iloc[0]
-            if base_port and base_port > 0:
-                port_pct = (port_vals / base_port - 1) * 100
+        if not port_idx.empty:
+            port_pct = port_idx['indice'].dropna()
+            if len(port_pct) > 0:
                 # Nota si el portfolio arranca después del período seleccionado
                 port_label = 'Mi Portfolio'
                 if pd.Timestamp(start_date) > pd.Timestamp(bench_start):
@@ -323,27 +214,15 @@ if not ops.empty:
                 ))
 
         # Benchmarks — también normalizados a 0% desde bench_start
-        bench_config = {
-            'S&P 500': ('#3b82f6', mostrar_sp),
-            'Nasdaq':  ('#8b5cf6', mostrar_ndq),
-            'Merval':  ('#f59e0b', mostrar_merv),
-            'Oro':     ('#fbbf24', mostrar_oro),
+        colores_fijos = {'S&P 500': '#3b82f6', 'Nasdaq': '#8b5cf6', 'Merval': '#f59e0b', 'Oro': '#fbbf24'}
+        bench_colores = {
+            n: colores_fijos.get(n, PIE_COLORS[(i + 1) % len(PIE_COLORS)]) for i, n in enumerate(bench_sel)
         }
 
-        for nombre, (color, mostrar) in bench_config.items():
-            if not mostrar or nombre not in benchmarks: continue
-            serie = benchmarks[nombre]
-            serie = serie[serie.index >= pd.Timestamp(bench_start)]
-            serie = serie.reindex(
-                pd.date_range(start=bench_start, end=date.today()), method='ffill'
-            ).dropna()
-            if len(serie) == 0: continue
-            # Renormalizar al período seleccionado (base 0%)
-            base_b = serie.iloc[0]
-            if base_b and base_b > 0:
-                serie_pct = (serie / base_b - 1) * 100
-            else:
-                continue
+        for nombre, color in bench_colores.items():
+            if nombre not in bench_pct: continue
+            serie_pct = bench_pct[nombre].dropna()
+            if len(serie_pct) == 0: continue
             fig_bench.add_trace(go.Scatter(
                 x=serie_pct.index,
                 y=serie_pct.values,
@@ -375,15 +254,15 @@ if not ops.empty:
 
         # ── Resumen tarjetas ──────────────────────────────────────
         st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
-        resumen_cols = st.columns(5)
-        labels_res  = ['Mi Portfolio', 'S&P 500', 'Nasdaq', 'Merval', 'Oro']
-        colores_res = ['#10b981',      '#3b82f6', '#8b5cf6', '#f59e0b', '#fbbf24']
+        labels_res  = ['Mi Portfolio'] + list(bench_colores)
+        colores_res = ['#10b981']      + list(bench_colores.values())
+        resumen_cols = st.columns(len(labels_res))
 
         for col, label, color in zip(resumen_cols, labels_res, colores_res):
             if label == 'Mi Portfolio':
                 rend = port_pct.dropna().iloc[-1] if port_pct is not None and len(port_pct) > 0 else 0
             else:
-                if label not in benchmarks:
+                if label not in bench_pct:
                     col.markdown(
                         f'<div style="text-align:center;padding:12px;background:#0b1220;'
                         f'border:1px solid #1a2540;border-radius:10px">'
@@ -392,13 +271,8 @@ if not ops.empty:
                         unsafe_allow_html=True
                     )
                     continue
-                s = benchmarks[label]
-                s = s[s.index >= pd.Timestamp(bench_start)].dropna()
-                if len(s) == 0:
-                    rend = 0
-                else:
-                    b = s.iloc[0]
-                    rend = (s.iloc[-1] / b - 1) * 100 if b and b > 0 else 0
+                s = bench_pct[label].dropna()
+                rend = s.iloc[-1] if len(s) > 0 else 0
 
             sign    = "+" if rend >= 0 else ""
             r_color = "#10b981" if rend >= 0 else "#ef4444"
@@ -416,6 +290,111 @@ if not ops.empty:
     else:
         st.info("Se necesitan más datos históricos para calcular la comparación.")
 
+    st.divider()
+
+    # ── CALENDARIO DE RETORNOS ────────────────────────────────────
+    section_header("Calendario de retornos", "Retorno diario (TWR) y tabla mensual")
+    cal = ver_calendario(USER_ID, portfolio_id_sel)
+    if cal is None or cal['diario'].empty:
+        st.info("Se necesitan más datos históricos.")
+    else:
+        anios = sorted(cal['diario'].index.year.unique(), reverse=True)
+        anio_sel = st.selectbox("Año", anios, index=0, key="anio_calendario", label_visibility="collapsed")
+        valores_cal, fechas_cal = grilla_calendario(cal['diario'], anio_sel)
+        lim = max(float(abs(cal['diario'].quantile([0.02, 0.98])).max()), 1e-4) * 100
+        fig_cal = go.Figure(go.Heatmap(
+            z=valores_cal * 100, text=fechas_cal, y=DIAS_SEMANA, xgap=3, ygap=3,
+            colorscale=[[0, '#ef4444'], [0.5, '#1a2540'], [1, '#10b981']], zmin=-lim, zmax=lim, zmid=0,
+            hovertemplate="%{text}<br>%{z:+.2f}%<extra></extra>", showscale=False,
+        ))
+        fig_cal = apply_plotly_style(fig_cal)
+        inicio_meses = pd.date_range(f'{anio_sel}-01-01', periods=12, freq='MS')
+        lunes_0 = inicio_meses[0] - pd.Timedelta(days=inicio_meses[0].weekday())   # columna 0 de la grilla
+        fig_cal.update_layout(
+            height=220,
+            xaxis=dict(tickvals=[(d - lunes_0).days // 7 for d in inicio_meses],
+                       ticktext=MESES, showgrid=False, zeroline=False),
+            yaxis=dict(autorange='reversed', showgrid=False),
+        )
+        st.plotly_chart(fig_cal, use_container_width=True)
+
+        def _color_ret(v):
+            if pd.isna(v): return ''
+            return 'color:#10b981' if v > 0 else 'color:#ef4444' if v < 0 else ''
+        st.dataframe(
+            cal['mensual'].style.format('{:+.2%}', na_rep='').map(_color_ret),
+            use_container_width=True
+        )
+
+    st.divider()
+
+    # ── ATRIBUCIÓN ────────────────────────────────────────────────
+    section_header("Atribución del rendimiento", f"Qué explicó el TWR del período · {periodo_sel}")
+    atrib = ver_atribucion(USER_ID, portfolio_id_sel, max(pd.Timestamp(bench_start), start_date))
+    if atrib is None or atrib['posiciones'].empty:
+        st.info("Sin valuación para el período.")
+    else:
+        res_total = atrib['posiciones']['resultado_usd'].sum()
+        a1, a2, a3 = st.columns(3)
+        with a1: metric_card("TWR del período", f"{atrib['twr']*100:+.2f}%",
+                             color="green" if atrib['twr'] >= 0 else "red")
+        with a2: metric_card("Resultado", f"{'+' if res_total >= 0 else '-'}US$ {abs(res_total):,.2f}",
+                             subtitle="variación de valor neta de aportes", color="green" if res_total >= 0 else "red")
+        with a3:
+            mejor = atrib['tickers'].iloc[0]
+            metric_card("Mayor aporte", mejor['ticker'], subtitle=f"{mejor['contribucion']*100:+.2f} pp", color="blue")
+
+        # por portafolio solo en la vista consolidada
+        consolidado = portfolio_id_sel is None and atrib['portafolios']['portfolio_id'].nunique() > 1
+        if consolidado:
+            pfs = ver_portafolios(USER_ID)
+            nombres = dict(zip(pfs['id'], pfs['nombre']))
+            for clave in ('portafolios', 'posiciones'):
+                atrib[clave]['portfolio_id'] = atrib[clave]['portfolio_id'].map(lambda p: nombres.get(p, 'Sin asignar'))
+
+        st.markdown("<div style='height:12px'></div>", unsafe_allow_html=True)
+        at1, at2 = st.columns([3, 2])
+        with at1:
+            por_tk = atrib['tickers'].sort_values('contribucion')
+            fig_at = go.Figure(go.Bar(
+                x=por_tk['contribucion'] * 100, y=por_tk['ticker'], orientation='h',
+                marker=dict(color=['#10b981' if v >= 0 else '#ef4444' for v in por_tk['contribucion']],
+                            line=dict(width=0)),
+                customdata=por_tk['resultado_usd'],
+                hovertemplate="<b>%{y}</b><br>%{x:+.2f} pp<br>US$ %{customdata:,.2f}<extra></extra>",
+            ))
+            fig_at = apply_plotly_style(fig_at)
+            fig_at.update_layout(height=max(300, len(por_tk) * 34), xaxis_ticksuffix=" pp",
+                                 yaxis=dict(gridcolor="rgba(0,0,0,0)"))
+            st.plotly_chart(fig_at, use_container_width=True)
+        with at2:
+            grupos = [('monedas', 'moneda', 'Moneda')]
+            if consolidado:
+                grupos.append(('portafolios', 'portfolio_id', 'Portafolio'))
+            for clave, col, nombre in grupos:
+                st.dataframe(
+                    atrib[clave][[col, 'peso_medio', 'resultado_usd', 'contribucion']].rename(columns={
+                        col: nombre, 'peso_medio': 'Peso medio', 'resultado_usd': 'Resultado USD',
+                        'contribucion': 'Aporte',
+                    }).style.format({'Peso medio': '{:.1%}', 'Resultado USD': 'US$ {:,.2f}', 'Aporte': '{:+.2%}'}),
+                    use_container_width=True, hide_index=True
+                )
+
+        with st.expander("detalle por posición"):
+            cols_det = (['portfolio_id'] if consolidado else []) + [
+                'ticker', 'valor_inicial', 'flujos', 'valor_final', 'resultado_usd', 'retorno', 'contribucion']
+            st.dataframe(
+                atrib['posiciones'][cols_det].rename(columns={
+                    'portfolio_id': 'Portafolio', 'ticker': 'Ticker', 'valor_inicial': 'Valor inicial',
+                    'flujos': 'Aportes netos', 'valor_final': 'Valor final', 'resultado_usd': 'Resultado USD',
+                    'retorno': 'Retorno', 'contribucion': 'Aporte',
+                }).style.format({
+                    'Valor inicial': 'US$ {:,.2f}', 'Aportes netos': 'US$ {:,.2f}', 'Valor final': 'US$ {:,.2f}',
+                    'Resultado USD': 'US$ {:,.2f}', 'Retorno': '{:+.2%}', 'Aporte': '{:+.2%}',
+                }),
+                use_container_width=True, hide_index=True
+            )
+
 else:
     st.markdown("""
         <div style="height:300px;display:flex;align-items:center;justify-content:center;
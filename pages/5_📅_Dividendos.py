@@ -1,8 +1,10 @@
 import streamlit as st
-import psycopg2
 import pandas as pd
-import yfinance as yf
-from utils import apply_styles, metric_card, section_header, portfolio_selector_sidebar
+import plotly.graph_objects as go
+from utils import apply_styles, metric_card, section_header, apply_plotly_style, portfolio_selector_sidebar
+from mercado import dolar_actual
+from analitica import FRECUENCIAS
+from cartera import ver_posiciones, ver_dividendos
 
 if 'user' not in st.session_state or st.session_state.user is None:
     st.error("Debes iniciar sesión."); st.stop()
@@ -15,126 +17,132 @@ st.markdown("""<style>
 [data-testid="stNumberInputStepUp"] span{font-size:0!important}
 </style>""", unsafe_allow_html=True)
 
-def conectar_db():
-    return psycopg2.connect(
-        host=st.secrets["connections"]["supabase"]["host"],
-        database=st.secrets["connections"]["supabase"]["database"],
-        user=st.secrets["connections"]["supabase"]["username"],
-        password=st.secrets["connections"]["supabase"]["password"],
-        port=st.secrets["connections"]["supabase"]["port"]
-    )
-
-def ver_operaciones(user_id, portfolio_id=None):
-    conn = conectar_db()
-    if portfolio_id is None:
-        df = pd.read_sql_query(
-            "SELECT * FROM operaciones WHERE user_id=%s ORDER BY fecha ASC",
-            conn, params=(user_id,)
-        )
-    else:
-        df = pd.read_sql_query(
-            "SELECT * FROM operaciones WHERE user_id=%s AND portfolio_id=%s ORDER BY fecha ASC",
-            conn, params=(user_id, portfolio_id)
-        )
-    conn.close()
-    return df
-
-@st.cache_data(ttl=3600)
-def info_divs(tickers):
-    d = {}
-    for t in tickers:
-        try:
-            obj  = yf.Ticker(t)
-            info = obj.info
-            rate = info.get('dividendRate') or 0
-            cal  = obj.calendar
-            ex   = pd.to_datetime(cal.get('Ex-Dividend Date')).strftime('%Y-%m-%d') if cal and cal.get('Ex-Dividend Date') else "N/A"
-            pay  = pd.to_datetime(cal.get('Dividend Date')).strftime('%Y-%m-%d')    if cal and cal.get('Dividend Date')    else "N/A"
-            yield_pct = (info.get('dividendYield') or 0) * 100
-            d[t] = {'rate': rate, 'ex': ex, 'pay': pay, 'yield': yield_pct}
-        except:
-            d[t] = {'rate': 0, 'ex': 'Err', 'pay': 'Err', 'yield': 0}
-    return d
-
 # ── PORTFOLIO SELECTOR ───────────────────────────────────────────
 portfolio_id_sel, portfolio_label_sel = portfolio_selector_sidebar(USER_ID)
 
 # ── HEADER ────────────────────────────────────────────────────────
-st.markdown("<h1>Proyección de Dividendos</h1>", unsafe_allow_html=True)
+st.markdown("<h1>Dividendos</h1>", unsafe_allow_html=True)
 st.markdown(
     '<div style="color:#475569;font-size:0.85rem;font-family:JetBrains Mono,monospace;'
-    'margin-top:-8px;margin-bottom:24px">Estimación anual basada en posiciones actuales</div>',
+    'margin-top:-8px;margin-bottom:24px">Calendario de los próximos 12 meses y dividendos cobrados</div>',
     unsafe_allow_html=True
 )
 
-ops = ver_operaciones(USER_ID, portfolio_id_sel)
-
-if not ops.empty:
-    ops['cant_neta'] = ops.apply(lambda x: x['cantidad'] if x['tipo']=='Compra' else -x['cantidad'], axis=1)
-    pos = ops.groupby('ticker')['cant_neta'].sum().reset_index()
-    pos = pos[pos['cant_neta'] > 0]
-
-    if not pos.empty:
-        inf = info_divs(pos['ticker'].tolist())
-        div_df = pd.DataFrame.from_dict(inf, orient='index').reset_index().rename(columns={'index':'ticker'})
-        res = pos.merge(div_df, on='ticker')
-        res_con_div = res[res['rate'] > 0].copy()
-
-        if not res_con_div.empty:
-            res_con_div['est_anual']     = res_con_div['cant_neta'] * res_con_div['rate']
-            res_con_div['est_mensual']   = res_con_div['est_anual'] / 12
-            total_anual   = res_con_div['est_anual'].sum()
-            total_mensual = total_anual / 12
-
-            # ── SUMMARY METRICS ───────────────────────────────────
-            c1, c2, c3 = st.columns(3)
-            with c1: metric_card("Total anual estimado",   f"US$ {total_anual:,.2f}",   color="green")
-            with c2: metric_card("Promedio mensual",        f"US$ {total_mensual:,.2f}", color="blue")
-            with c3: metric_card("Acciones que pagan div.", f"{len(res_con_div)}",
-                                 subtitle=f"de {len(pos)} en cartera", color="default")
-
-            st.markdown("<div style='height:20px'></div>", unsafe_allow_html=True)
-
-            # ── TABLE ─────────────────────────────────────────────
-            section_header("Detalle por activo")
-
-            cols_h = st.columns([1.2, 1, 1, 1, 1.2, 1.2, 1.2])
-            for col, lbl in zip(cols_h, ["Ticker","Acciones","Div/Acc","Yield","Est. Anual","Ex-Div","Pago"]):
-                col.markdown(
-                    f'<span style="font-size:0.65rem;text-transform:uppercase;letter-spacing:1px;'
-                    f'color:#334155;font-family:JetBrains Mono,monospace">{lbl}</span>',
-                    unsafe_allow_html=True
-                )
-            st.markdown("<div style='height:6px'></div>", unsafe_allow_html=True)
-
-            for _, r in res_con_div.sort_values('est_anual', ascending=False).iterrows():
-                cols = st.columns([1.2, 1, 1, 1, 1.2, 1.2, 1.2])
-                cols[0].markdown(f'<span style="color:#e2e8f0;font-family:JetBrains Mono,monospace;font-weight:500;font-size:0.9rem">{r["ticker"]}</span>', unsafe_allow_html=True)
-                cols[1].markdown(f'<span style="color:#94a3b8;font-family:JetBrains Mono,monospace;font-size:0.82rem">{r["cant_neta"]:.4f}</span>', unsafe_allow_html=True)
-                cols[2].markdown(f'<span style="color:#cbd5e1;font-family:JetBrains Mono,monospace;font-size:0.82rem">${r["rate"]:.4f}</span>', unsafe_allow_html=True)
-                yield_color = "#10b981" if r['yield'] > 3 else "#94a3b8"
-                cols[3].markdown(f'<span style="color:{yield_color};font-family:JetBrains Mono,monospace;font-size:0.82rem">{r["yield"]:.2f}%</span>', unsafe_allow_html=True)
-                cols[4].markdown(f'<span style="color:#10b981;font-family:JetBrains Mono,monospace;font-size:0.85rem;font-weight:500">${r["est_anual"]:,.2f}</span>', unsafe_allow_html=True)
-                ex_color  = "#f59e0b" if r['ex']  != "N/A" else "#334155"
-                pay_color = "#3b82f6" if r['pay'] != "N/A" else "#334155"
-                cols[5].markdown(f'<span style="color:{ex_color};font-family:JetBrains Mono,monospace;font-size:0.78rem">{r["ex"]}</span>', unsafe_allow_html=True)
-                cols[6].markdown(f'<span style="color:{pay_color};font-family:JetBrains Mono,monospace;font-size:0.78rem">{r["pay"]}</span>', unsafe_allow_html=True)
-                st.markdown("<div style='height:2px;background:#0a0f1e;margin:3px 0'></div>", unsafe_allow_html=True)
-
-            # ── SIN DIVIDENDO ─────────────────────────────────────
-            sin_div = res[res['rate'] == 0]
-            if not sin_div.empty:
-                st.markdown("<div style='height:16px'></div>", unsafe_allow_html=True)
-                tickers_sin = ", ".join(sin_div['ticker'].tolist())
-                st.markdown(
-                    f'<div style="color:#334155;font-size:0.8rem;font-family:JetBrains Mono,monospace;'
-                    f'padding:12px;border:1px solid #1a2540;border-radius:8px">'
-                    f'Sin dividendo: {tickers_sin}</div>',
-                    unsafe_allow_html=True
-                )
-        else:
-            st.info("Ninguna de tus acciones actuales paga dividendos.")
+precio_dolar, _ = dolar_actual()
+abiertas, _ = ver_posiciones(USER_ID, portfolio_id_sel, precio_dolar)
+divs        = ver_dividendos(USER_ID, portfolio_id_sel, precio_dolar)
+cobrados, resumen, calendario = divs['cobrados'], divs['resumen'], divs['calendario']
+
+if abiertas.empty and cobrados.empty:
+    st.info("Sin datos de operaciones.")
+    st.stop()
+
+hoy = pd.Timestamp.today().normalize()
+cobrado_12m   = cobrados.loc[cobrados['fecha'] > hoy - pd.DateOffset(years=1), 'monto_usd'].sum()
+total_anual   = calendario['monto_usd'].sum()
+tickers_pagan = calendario['ticker'].nunique()
+n_abiertas    = abiertas['ticker'].nunique() if not abiertas.empty else 0
+
+# ── SUMMARY METRICS ───────────────────────────────────────────────
+c1, c2, c3, c4 = st.columns(4)
+with c1: metric_card("Próximos 12 meses",   f"US$ {total_anual:,.2f}",      color="green")
+with c2: metric_card("Promedio mensual",    f"US$ {total_anual / 12:,.2f}", color="blue")
+with c3: metric_card("Cobrado últimos 12m", f"US$ {cobrado_12m:,.2f}",
+                     subtitle=f"Total histórico: US$ {cobrados['monto_usd'].sum():,.2f}", color="default")
+with c4: metric_card("Acciones que pagan div.", f"{tickers_pagan}",
+                     subtitle=f"de {n_abiertas} en cartera", color="default")
+
+st.markdown("<div style='height:20px'></div>", unsafe_allow_html=True)
+
+# ── CALENDARIO ────────────────────────────────────────────────────
+section_header("Calendario de cobros", "Estimado por fecha de pago a partir de la frecuencia histórica")
+if calendario.empty:
+    st.info("Ninguna de tus acciones actuales paga dividendos.")
+else:
+    meses = pd.period_range(hoy.to_period('M'), periods=13, freq='M')
+    cal = calendario.assign(mes=calendario['fecha_pago'].dt.to_period('M'))
+    tabla = cal.pivot_table(index='mes', columns='ticker', values='monto_usd', aggfunc='sum').reindex(meses).fillna(0)
+    fig_cal = go.Figure()
+    for tk in tabla.columns:
+        fig_cal.add_trace(go.Bar(
+            x=tabla.index.strftime('%b %Y'), y=tabla[tk], name=tk,
+            hovertemplate=f"<b>{tk}</b><br>%{{x}}<br>US$ %{{y:,.2f}}<extra></extra>",
+        ))
+    apply_plotly_style(fig_cal)
+    fig_cal.update_layout(barmode='stack', height=340, yaxis=dict(tickprefix="US$ "))
+    st.plotly_chart(fig_cal, use_container_width=True)
+
+    # ── TABLE ─────────────────────────────────────────────────────
+    section_header("Detalle por activo")
+    proximo = calendario.groupby('ticker').agg(
+        cantidad=('cantidad', 'first'), ex=('fecha_ex', 'min'), pago=('fecha_pago', 'min'),
+        est_anual=('monto_usd', 'sum'),
+    )
+    det = proximo.join(resumen.set_index('ticker')[['frecuencia', 'ultimo_monto']])
+    if not abiertas.empty:
+        valor = abiertas.groupby('ticker')['valor_mercado_usd'].sum()
+        det['yield'] = det['est_anual'] / det.index.map(valor).astype(float) * 100
     else:
-        st.info("Sin posiciones abiertas.")
+        det['yield'] = float('nan')
+
+    cols_h = st.columns([1.2, 1, 1.1, 1, 1, 1.2, 1.2, 1.2])
+    for col, lbl in zip(cols_h, ["Ticker","Acciones","Frecuencia","Div/Acc","Yield","Est. Anual","Próx. Ex","Próx. Pago"]):
+        col.markdown(
+            f'<span style="font-size:0.65rem;text-transform:uppercase;letter-spacing:1px;'
+            f'color:#334155;font-family:JetBrains Mono,monospace">{lbl}</span>',
+            unsafe_allow_html=True
+        )
+    st.markdown("<div style='height:6px'></div>", unsafe_allow_html=True)
+
+    for tk, r in det.sort_values('est_anual', ascending=False).iterrows():
+        cols = st.columns([1.2, 1, 1.1, 1, 1, 1.2, 1.2, 1.2])
+        cols[0].markdown(f'<span style="color:#e2e8f0;font-family:JetBrains Mono,monospace;font-weight:500;font-size:0.9rem">{tk}</span>', unsafe_allow_html=True)
+        cols[1].markdown(f'<span style="color:#94a3b8;font-family:JetBrains Mono,monospace;font-size:0.82rem">{r["cantidad"]:.4f}</span>', unsafe_allow_html=True)
+        cols[2].markdown(f'<span style="color:#94a3b8;font-family:JetBrains Mono,monospace;font-size:0.78rem">{FRECUENCIAS.get(r["frecuencia"], "-")}</span>', unsafe_allow_html=True)
+        cols[3].markdown(f'<span style="color:#cbd5e1;font-family:JetBrains Mono,monospace;font-size:0.82rem">${r["ultimo_monto"]:.4f}</span>', unsafe_allow_html=True)
+        yield_txt   = f'{r["yield"]:.2f}%' if pd.notna(r['yield']) else "N/A"
+        yield_color = "#10b981" if pd.notna(r['yield']) and r['yield'] > 3 else "#94a3b8"
+        cols[4].markdown(f'<span style="color:{yield_color};font-family:JetBrains Mono,monospace;font-size:0.82rem">{yield_txt}</span>', unsafe_allow_html=True)
+        cols[5].markdown(f'<span style="color:#10b981;font-family:JetBrains Mono,monospace;font-size:0.85rem;font-weight:500">${r["est_anual"]:,.2f}</span>', unsafe_allow_html=True)
+        cols[6].markdown(f'<span style="color:#f59e0b;font-family:JetBrains Mono,monospace;font-size:0.78rem">{r["ex"]:%Y-%m-%d}</span>', unsafe_allow_html=True)
+        cols[7].markdown(f'<span style="color:#3b82f6;font-family:JetBrains Mono,monospace;font-size:0.78rem">{r["pago"]:%Y-%m-%d}</span>', unsafe_allow_html=True)
+        st.markdown("<div style='height:2px;background:#0a0f1e;margin:3px 0'></div>", unsafe_allow_html=True)
+
+    # ── SIN DIVIDENDO ─────────────────────────────────────────────
+    sin_div = sorted(set(abiertas['ticker']) - set(calendario['ticker'])) if not abiertas.empty else []
+    if sin_div:
+        st.markdown("<div style='height:16px'></div>", unsafe_allow_html=True)
+        st.markdown(
+            f'<div style="color:#334155;font-size:0.8rem;font-family:JetBrains Mono,monospace;'
+            f'padding:12px;border:1px solid #1a2540;border-radius:8px">'
+            f'Sin dividendo: {", ".join(sin_div)}</div>',
+            unsafe_allow_html=True
+        )
+
+# ── COBRADOS ──────────────────────────────────────────────────────
+st.markdown("<div style='height:20px'></div>", unsafe_allow_html=True)
+section_header("Dividendos cobrados", "Tenencia al día previo a cada fecha ex × dividendo por acción")
+if cobrados.empty:
+    st.info("Todavía no cobraste dividendos con estas operaciones.")
 else:
-    st.info("Sin datos de operaciones.")
\ No newline at end of file
+    por_mes = cobrados.groupby(cobrados['fecha'].dt.to_period('M'))['monto_usd'].sum()
+    por_mes = por_mes.reindex(pd.period_range(por_mes.index.min(), hoy.to_period('M'), freq='M'), fill_value=0)
+    fig_cob = go.Figure(go.Bar(
+        x=por_mes.index.to_timestamp(), y=por_mes.values, marker_color='#10b981',
+        hovertemplate="%{x|%b %Y}<br>US$ %{y:,.2f}<extra></extra>",
+    ))
+    apply_plotly_style(fig_cob)
+    fig_cob.update_layout(height=280, showlegend=False, yaxis=dict(tickprefix="US$ "))
+    st.plotly_chart(fig_cob, use_container_width=True)
+
+    with st.expander("detalle de cobros"):
+        st.dataframe(
+            cobrados.sort_values('fecha', ascending=False).rename(columns={
+                'ticker':'Ticker','fecha':'Fecha ex','por_accion':'Por acción','cantidad':'Acciones',
+                'monto':'Monto','moneda':'Moneda','monto_usd':'Monto USD'
+            }).style.format({
+                'Fecha ex': lambda f: f.strftime('%Y-%m-%d'), 'Por acción': '{:,.4f}',
+                'Acciones': '{:,.4f}', 'Monto': '{:,.2f}', 'Monto USD': '${:,.2f}',
+            }),
+            use_container_width=True, hide_index=True
+        )
@@ -0,0 +1,137 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+from utils import apply_styles, metric_card, section_header, apply_plotly_style, portfolio_selector_sidebar
+from mercado import definiciones_usuario, correlaciones_tenencias
+from analitica import VENTANAS
+from cartera import ver_riesgo
+
+if 'user' not in st.session_state or st.session_state.user is None:
+    st.error("Debes iniciar sesión."); st.stop()
+USER_ID = st.session_state.user[0]
+
+st.set_page_config(layout="wide", page_title="Riesgo · Portfolio")
+apply_styles()
+st.markdown("""<style>
+.material-symbols-rounded,[data-testid="stNumberInputStepDown"] span,
+[data-testid="stNumberInputStepUp"] span{font-size:0!important}
+</style>""", unsafe_allow_html=True)
+
+# ── PORTFOLIO SELECTOR ───────────────────────────────────────────
+portfolio_id_sel, portfolio_label_sel = portfolio_selector_sidebar(USER_ID)
+
+tasa_libre = st.sidebar.number_input(
+    "Tasa libre de riesgo (% anual)", min_value=0.0, max_value=50.0, value=4.0, step=0.25
+) / 100
+
+# ── HEADER ────────────────────────────────────────────────────────
+st.markdown("<h1>Riesgo</h1>", unsafe_allow_html=True)
+st.markdown(
+    f'<div style="color:#475569;font-size:0.85rem;font-family:JetBrains Mono,monospace;'
+    f'margin-top:-8px;margin-bottom:24px">Volatilidad, caídas y sensibilidad · {portfolio_label_sel}</div>',
+    unsafe_allow_html=True
+)
+
+with st.spinner("Calculando..."):
+    riesgo = ver_riesgo(USER_ID, portfolio_id_sel, definiciones_usuario(USER_ID), tasa_libre)
+
+if riesgo is None or riesgo['resumen']['ruedas'] < 2:
+    st.info("Se necesitan más datos históricos para calcular el riesgo.")
+    st.stop()
+
+res = riesgo['resumen']
+
+# ── SUMMARY METRICS ───────────────────────────────────────────────
+def _fmt(x, pct=False):
+    if pd.isna(x): return "—"
+    return f"{x*100:.2f}%" if pct else f"{x:.2f}"
+
+c1, c2, c3, c4 = st.columns(4)
+with c1:
+    metric_card("Volatilidad anual", _fmt(res['volatilidad'], pct=True),
+                subtitle=f"{res['ruedas']} ruedas", color="amber")
+with c2:
+    sub = (f"{res['pico']:%d %b %Y} → {res['valle']:%d %b %Y}" if res['pico'] is not None else None)
+    metric_card("Caída máxima", _fmt(res['max_drawdown'], pct=True), subtitle=sub, color="red")
+with c3:
+    color = "green" if pd.notna(res['sharpe']) and res['sharpe'] >= 0 else "red"
+    metric_card("Sharpe", _fmt(res['sharpe']), subtitle=f"rf {tasa_libre*100:.2f}%", color=color)
+with c4:
+    color = "green" if pd.notna(res['sortino']) and res['sortino'] >= 0 else "red"
+    metric_card("Sortino", _fmt(res['sortino']), color=color)
+
+st.markdown("<div style='height:20px'></div>", unsafe_allow_html=True)
+
+# ── UNDERWATER ────────────────────────────────────────────────────
+section_header("Curva de caídas", "Distancia al máximo previo del índice TWR")
+dd = riesgo['drawdown'] * 100
+fig_dd = go.Figure(go.Scatter(
+    x=dd.index, y=dd.values, line=dict(color='#ef4444', width=1.5),
+    fill='tozeroy', fillcolor='rgba(239,68,68,0.08)',
+    hovertemplate="%{x|%d %b %Y}<br>%{y:.2f}%<extra></extra>",
+))
+apply_plotly_style(fig_dd)
+fig_dd.update_layout(height=300, showlegend=False, yaxis=dict(ticksuffix="%"))
+st.plotly_chart(fig_dd, use_container_width=True)
+
+col_b, col_c = st.columns(2)
+
+# ── BETA / CORRELACIÓN ────────────────────────────────────────────
+with col_b:
+    section_header("Sensibilidad a benchmarks", "Beta y correlación de retornos diarios")
+    betas = riesgo['betas']
+    if betas.empty:
+        st.info("Sin datos de benchmarks.")
+    else:
+        st.dataframe(
+            betas.rename_axis('Benchmark').reset_index().rename(columns={
+                'beta':'Beta','correlacion':'Correlación','ruedas':'Ruedas'
+            }).style.format({'Beta':'{:.2f}','Correlación':'{:.2f}','Ruedas':'{:,.0f}'}, na_rep='—'),
+            use_container_width=True, hide_index=True
+        )
+
+# ── CONTRIBUCIÓN AL RIESGO ────────────────────────────────────────
+with col_c:
+    section_header("Contribución al riesgo", "Pesos actuales · covarianza del último año")
+    contrib = riesgo['contribuciones']
+    if contrib.empty:
+        st.info("Sin posiciones abiertas.")
+    else:
+        fig_c = go.Figure()
+        fig_c.add_trace(go.Bar(
+            x=contrib['ticker'], y=contrib['peso'] * 100, name='Peso',
+            marker_color='#3b82f6', hovertemplate="%{x}<br>Peso %{y:.1f}%<extra></extra>",
+        ))
+        fig_c.add_trace(go.Bar(
+            x=contrib['ticker'], y=contrib['contribucion_%'], name='Riesgo',
+            marker_color='#f59e0b', hovertemplate="%{x}<br>Riesgo %{y:.1f}%<extra></extra>",
+        ))
+        apply_plotly_style(fig_c)
+        fig_c.update_layout(height=320, barmode='group', yaxis=dict(ticksuffix="%"))
+        st.plotly_chart(fig_c, use_container_width=True)
+
+# ── CORRELACIÓN ENTRE TENENCIAS ───────────────────────────────────
+st.markdown("<div style='height:12px'></div>", unsafe_allow_html=True)
+section_header("Correlación entre tenencias", "Retornos diarios en USD de las posiciones abiertas")
+
+tickers_abiertos = tuple(sorted(contrib['ticker'])) if not contrib.empty else ()
+if len(tickers_abiertos) < 2:
+    st.info("Se necesitan al menos dos posiciones abiertas.")
+else:
+    ventana = st.radio("Ventana", list(VENTANAS), index=1, horizontal=True, label_visibility="collapsed")
+    matrices = correlaciones_tenencias(tickers_abiertos)
+    if ventana not in matrices:
+        st.info("Sin precios suficientes para la ventana elegida.")
+    else:
+        cov, corr = matrices[ventana]
+        fig_corr = go.Figure(go.Heatmap(
+            z=corr.values, x=corr.columns, y=corr.index,
+            zmin=-1, zmax=1, colorscale=[[0, '#3b82f6'], [0.5, '#0a0f1e'], [1, '#ef4444']],
+            hovertemplate="%{y} · %{x}<br>ρ = %{z:.2f}<extra></extra>",
+        ))
+        apply_plotly_style(fig_corr)
+        fig_corr.update_layout(height=max(360, 22 * len(corr)), yaxis=dict(autorange='reversed'))
+        st.plotly_chart(fig_corr, use_container_width=True)
+
+        with st.expander("matriz de covarianza (anualizada)"):
+            st.dataframe(cov.style.format('{:.4f}', na_rep='—'), use_container_width=True)
@@ -0,0 +1,103 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+from datetime import date
+from utils import apply_styles, metric_card, section_header, apply_plotly_style, portfolio_selector_sidebar
+from mercado import dolar_actual, proyectar_cartera
+from analitica import METODOS_SIM
+from cartera import ver_posiciones
+from finanzas import ahorro_mensual_promedio
+
+if 'user' not in st.session_state or st.session_state.user is None:
+    st.error("Debes iniciar sesión."); st.stop()
+USER_ID = st.session_state.user[0]
+
+st.set_page_config(layout="wide", page_title="Proyección · Portfolio")
+apply_styles()
+st.markdown("""<style>
+.material-symbols-rounded,[data-testid="stNumberInputStepDown"] span,
+[data-testid="stNumberInputStepUp"] span{font-size:0!important}
+</style>""", unsafe_allow_html=True)
+
+# ── PORTFOLIO SELECTOR ───────────────────────────────────────────
+portfolio_id_sel, portfolio_label_sel = portfolio_selector_sidebar(USER_ID)
+
+# ── HEADER ────────────────────────────────────────────────────────
+st.markdown("<h1>Proyección</h1>", unsafe_allow_html=True)
+st.markdown(
+    f'<div style="color:#475569;font-size:0.85rem;font-family:JetBrains Mono,monospace;'
+    f'margin-top:-8px;margin-bottom:24px">Simulación Monte Carlo del valor de la cartera · {portfolio_label_sel}</div>',
+    unsafe_allow_html=True
+)
+
+precio_dolar, _ = dolar_actual()
+abiertas, _ = ver_posiciones(USER_ID, portfolio_id_sel, precio_dolar)
+abiertas = abiertas[abiertas['valor_mercado_usd'] > 0] if not abiertas.empty else abiertas
+
+if abiertas.empty:
+    st.info("Sin posiciones abiertas.")
+    st.stop()
+
+valor_actual = abiertas['valor_mercado_usd'].sum()
+por_ticker   = abiertas.groupby('ticker')['valor_mercado_usd'].sum()
+pesos        = tuple((tk, round(v / valor_actual, 4)) for tk, v in por_ticker.sort_index().items())
+
+# ── PARÁMETROS ────────────────────────────────────────────────────
+p1, p2, p3 = st.columns([2, 1, 1])
+anios  = p1.slider("Horizonte (años)", min_value=1, max_value=30, value=10)
+n_tray = p2.selectbox("Trayectorias", [1_000, 5_000, 10_000], index=2, format_func=lambda n: f"{n:,}")
+metodo = p3.selectbox("Modelo", list(METODOS_SIM), format_func=METODOS_SIM.get)
+
+a1, a2 = st.columns([1, 2])
+con_aporte = a1.checkbox("Aporte mensual", value=True,
+                         help="Por defecto, el ahorro promedio de los últimos 12 meses en Ingresos y Gastos")
+aporte = 0.0
+if con_aporte:
+    aporte = a2.number_input("US$ por mes", min_value=0.0, step=50.0,
+                             value=float(round(max(ahorro_mensual_promedio(USER_ID), 0.0), 2)))
+
+with st.spinner("Simulando..."):
+    bandas = proyectar_cartera(pesos, float(valor_actual), anios, n_tray, aporte, metodo)
+
+if bandas is None:
+    st.info("Sin historia de precios suficiente para simular.")
+    st.stop()
+
+fechas = pd.date_range(pd.Timestamp(date.today()), periods=len(bandas), freq='MS')
+final  = bandas.iloc[-1]
+
+# ── SUMMARY METRICS ───────────────────────────────────────────────
+st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
+c1, c2, c3, c4 = st.columns(4)
+with c1: metric_card("Valor actual",        f"US$ {valor_actual:,.0f}", color="default")
+with c2: metric_card(f"Mediana a {anios} años", f"US$ {final['p50']:,.0f}", color="green")
+with c3: metric_card("Escenario pesimista", f"US$ {final['p5']:,.0f}",  subtitle="percentil 5",  color="red")
+with c4: metric_card("Escenario optimista", f"US$ {final['p95']:,.0f}", subtitle="percentil 95", color="blue")
+
+st.markdown("<div style='height:20px'></div>", unsafe_allow_html=True)
+
+# ── FAN CHART ─────────────────────────────────────────────────────
+section_header("Bandas de percentiles", f"{n_tray:,} trayectorias · {METODOS_SIM[metodo].lower()}")
+fig = go.Figure()
+for bajo, alto, alpha in [('p5', 'p95', 0.10), ('p25', 'p75', 0.22)]:
+    fig.add_trace(go.Scatter(x=fechas, y=bandas[alto], line=dict(width=0), showlegend=False, hoverinfo='skip'))
+    fig.add_trace(go.Scatter(
+        x=fechas, y=bandas[bajo], line=dict(width=0), fill='tonexty',
+        fillcolor=f'rgba(16,185,129,{alpha})', name=f'{bajo[1:]}–{alto[1:]}%', hoverinfo='skip',
+    ))
+fig.add_trace(go.Scatter(
+    x=fechas, y=bandas['p50'], name='Mediana', line=dict(color='#10b981', width=2.5),
+    hovertemplate="%{x|%b %Y}<br>US$ %{y:,.0f}<extra></extra>",
+))
+fig.add_trace(go.Scatter(
+    x=fechas, y=bandas['aportado'], name='Aportado', line=dict(color='#64748b', width=1.5, dash='dot'),
+    hovertemplate="%{x|%b %Y}<br>Aportado US$ %{y:,.0f}<extra></extra>",
+))
+apply_plotly_style(fig)
+fig.update_layout(height=440, hovermode="x unified", yaxis=dict(tickprefix="US$ "))
+st.plotly_chart(fig, use_container_width=True)
+
+st.caption(
+    "Retornos diarios de las tenencias actuales en los últimos años, con los pesos de hoy. "
+    "Valores nominales en USD; no es una predicción."
+)
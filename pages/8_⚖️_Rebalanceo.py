@@ -0,0 +1,135 @@
+import streamlit as st
+import pandas as pd
+from utils import apply_styles, metric_card, section_header, portfolio_selector_sidebar, get_efectivo
+from mercado import dolar_actual, precios_actuales
+from analitica import calcular_rebalanceo
+from cartera import ver_posiciones, ver_objetivos, guardar_objetivos
+
+if 'user' not in st.session_state or st.session_state.user is None:
+    st.error("Debes iniciar sesión."); st.stop()
+USER_ID = st.session_state.user[0]
+
+st.set_page_config(layout="wide", page_title="Rebalanceo · Portfolio")
+apply_styles()
+st.markdown("""<style>
+.material-symbols-rounded,[data-testid="stNumberInputStepDown"] span,
+[data-testid="stNumberInputStepUp"] span{font-size:0!important}
+</style>""", unsafe_allow_html=True)
+
+# ── PORTFOLIO SELECTOR ───────────────────────────────────────────
+portfolio_id_sel, portfolio_label_sel = portfolio_selector_sidebar(USER_ID)
+
+# ── HEADER ────────────────────────────────────────────────────────
+st.markdown("<h1>Rebalanceo</h1>", unsafe_allow_html=True)
+st.markdown(
+    f'<div style="color:#475569;font-size:0.85rem;font-family:JetBrains Mono,monospace;'
+    f'margin-top:-8px;margin-bottom:24px">Órdenes para llegar a la asignación objetivo · {portfolio_label_sel}</div>',
+    unsafe_allow_html=True
+)
+
+precio_dolar, _ = dolar_actual()
+abiertas, _ = ver_posiciones(USER_ID, portfolio_id_sel, precio_dolar)
+efectivo_usd, efectivo_ars = get_efectivo(USER_ID, portfolio_id_sel)
+
+if not abiertas.empty:
+    abiertas = abiertas[abiertas['cantidad_total'] > 0.000001]
+    por_ticker = abiertas.groupby('ticker')[['valor_mercado_usd', 'cantidad_total']].sum()
+else:
+    por_ticker = pd.DataFrame(columns=['valor_mercado_usd', 'cantidad_total'])
+valores = por_ticker['valor_mercado_usd'].to_dict()
+# precio USD implícito en la valuación (ya incluye la conversión de .BA)
+precios = (por_ticker['valor_mercado_usd'] / por_ticker['cantidad_total']).to_dict()
+
+# ── PARÁMETROS ────────────────────────────────────────────────────
+o1, o2, o3, o4 = st.columns(4)
+fraccionario    = o1.toggle("Fracciones de acción", value=False)
+permitir_ventas = o2.toggle("Permitir ventas", value=True)
+incluir_ars     = o3.toggle("Usar efectivo ARS", value=False)
+banda           = o4.number_input("Tolerancia (pp)", min_value=0.0, max_value=50.0, value=0.0, step=0.5) / 100
+
+efectivo = efectivo_usd + (efectivo_ars / precio_dolar if incluir_ars else 0.0)
+
+# ── OBJETIVOS ─────────────────────────────────────────────────────
+section_header("Asignación objetivo", "Editá los pesos; el cálculo se actualiza al instante")
+guardados = ver_objetivos(USER_ID, portfolio_id_sel)
+total_actual = sum(valores.values()) + efectivo
+if guardados:
+    base = guardados
+else:
+    # sin objetivos guardados arranca en los pesos actuales (ninguna orden)
+    base = {tk: v / total_actual for tk, v in valores.items()} if total_actual > 0 else {}
+tickers_base = sorted(set(base) | set(valores))
+editor = st.data_editor(
+    pd.DataFrame({'Ticker': tickers_base, 'Objetivo %': [round(base.get(t, 0.0) * 100, 2) for t in tickers_base]}),
+    num_rows="dynamic", use_container_width=True, hide_index=True,
+    column_config={
+        'Ticker':     st.column_config.TextColumn(required=True),
+        'Objetivo %': st.column_config.NumberColumn(min_value=0.0, max_value=100.0, step=0.5, format="%.2f"),
+    },
+    key=f"objetivos_{portfolio_id_sel}",
+)
+editor = editor.dropna(subset=['Ticker'])
+editor['Ticker'] = editor['Ticker'].str.strip().str.upper()
+objetivos = (editor[editor['Ticker'] != ''].groupby('Ticker')['Objetivo %'].sum().fillna(0) / 100).to_dict()
+suma = sum(objetivos.values())
+
+s1, s2 = st.columns([3, 1])
+s1.markdown(
+    f'<div style="color:{"#ef4444" if suma > 1 + 1e-9 else "#64748b"};font-size:0.82rem;'
+    f'font-family:JetBrains Mono,monospace;padding-top:8px">Total asignado: {suma*100:.2f}% · '
+    f'efectivo objetivo: {max(0, 1 - suma)*100:.2f}%</div>',
+    unsafe_allow_html=True
+)
+if s2.button("Guardar objetivos", use_container_width=True, disabled=suma > 1 + 1e-9):
+    guardar_objetivos(USER_ID, portfolio_id_sel, objetivos)
+    st.success("✓ Objetivos guardados.")
+
+# Tickers nuevos: precio de la caché de cotizaciones (sin descargar lo que ya está valuado)
+nuevos = sorted(t for t, w in objetivos.items() if w > 0 and t not in precios)
+if nuevos:
+    for tk, cierre in precios_actuales(nuevos).items():
+        precios[tk] = cierre / precio_dolar if tk.endswith('.BA') else cierre
+
+if suma > 1 + 1e-9:
+    st.warning("Los objetivos suman más de 100%.")
+    st.stop()
+
+plan, restante = calcular_rebalanceo(
+    valores, precios, objetivos, efectivo,
+    fraccionario=fraccionario, permitir_ventas=permitir_ventas, banda=banda,
+)
+sin_precio = [t for t in nuevos if t not in precios]
+if sin_precio:
+    st.warning(f"Sin cotización para: {', '.join(sin_precio)}")
+
+st.markdown("<div style='height:12px'></div>", unsafe_allow_html=True)
+
+# ── RESUMEN ───────────────────────────────────────────────────────
+ordenes = plan[plan['operacion'] != '—']
+c1, c2, c3, c4 = st.columns(4)
+with c1: metric_card("Órdenes",   f"{len(ordenes)}", subtitle=f"de {len(plan)} tickers", color="default")
+with c2: metric_card("Compras",   f"US$ {plan.loc[plan['monto'] > 0, 'monto'].sum():,.2f}", color="green")
+with c3: metric_card("Ventas",    f"US$ {-plan.loc[plan['monto'] < 0, 'monto'].sum():,.2f}", color="red")
+with c4: metric_card("Efectivo restante", f"US$ {restante:,.2f}",
+                     subtitle=f"disponible US$ {efectivo:,.2f}", color="blue")
+
+st.markdown("<div style='height:20px'></div>", unsafe_allow_html=True)
+
+# ── ÓRDENES ───────────────────────────────────────────────────────
+section_header("Órdenes sugeridas")
+if ordenes.empty:
+    st.info("La cartera ya está dentro de la asignación objetivo.")
+else:
+    def _color_op(v):
+        return 'color:#10b981' if v == 'Compra' else 'color:#ef4444' if v == 'Venta' else ''
+    st.dataframe(
+        ordenes.rename(columns={
+            'ticker':'Ticker','operacion':'Operación','cantidad':'Cantidad','precio':'Precio USD',
+            'monto':'Monto USD','peso_actual':'Actual %','peso_objetivo':'Objetivo %','peso_final':'Final %',
+        })[['Ticker','Operación','Cantidad','Precio USD','Monto USD','Actual %','Objetivo %','Final %']]
+        .style.format({
+            'Cantidad': '{:,.4f}' if fraccionario else '{:,.0f}', 'Precio USD': '${:,.2f}', 'Monto USD': '${:,.2f}',
+            'Actual %': '{:.2%}', 'Objetivo %': '{:.2%}', 'Final %': '{:.2%}',
+        }).map(_color_op, subset=['Operación']),
+        use_container_width=True, hide_index=True
+    )
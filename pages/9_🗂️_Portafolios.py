@@ -0,0 +1,132 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+from utils import apply_styles, metric_card, section_header, apply_plotly_style, PIE_COLORS, ver_portafolios
+from mercado import dolar_actual
+from analitica import rendimiento_desde, METODOS
+from cartera import ver_comparacion, metodo_costo
+
+if 'user' not in st.session_state or st.session_state.user is None:
+    st.error("Debes iniciar sesión."); st.stop()
+USER_ID = st.session_state.user[0]
+
+st.set_page_config(layout="wide", page_title="Portafolios · Portfolio")
+apply_styles()
+st.markdown("""<style>
+.material-symbols-rounded,[data-testid="stNumberInputStepDown"] span,
+[data-testid="stNumberInputStepUp"] span{font-size:0!important}
+</style>""", unsafe_allow_html=True)
+
+# ── HEADER ────────────────────────────────────────────────────────
+st.markdown("<h1>Portafolios</h1>", unsafe_allow_html=True)
+st.markdown(
+    f'<div style="color:#475569;font-size:0.85rem;font-family:JetBrains Mono,monospace;'
+    f'margin-top:-8px;margin-bottom:24px">Comparación lado a lado · costo {METODOS[metodo_costo()]}</div>',
+    unsafe_allow_html=True
+)
+
+precio_dolar, _ = dolar_actual()
+with st.spinner("Calculando..."):
+    comp = ver_comparacion(USER_ID, precio_dolar)
+resumen = comp['resumen']
+
+if resumen.empty:
+    st.info("Sin operaciones cargadas.")
+    st.stop()
+
+pfs = ver_portafolios(USER_ID)
+nombres = {0: 'Sin asignar', **dict(zip(pfs['id'], pfs['nombre']))}
+colores = {pid: PIE_COLORS[i % len(PIE_COLORS)] for i, pid in enumerate(resumen['portfolio_id'])}
+
+# ── TARJETAS ──────────────────────────────────────────────────────
+for fila in range(0, len(resumen), 4):
+    cols = st.columns(4)
+    for col, (_, r) in zip(cols, resumen.iloc[fila:fila + 4].iterrows()):
+        with col:
+            twr_txt = "TWR —" if pd.isna(r['twr']) else f"TWR {r['twr']*100:+.2f}%"
+            metric_card(
+                nombres.get(r['portfolio_id'], f"#{r['portfolio_id']}"), f"US$ {r['valor_mercado_usd']:,.2f}",
+                subtitle=f"{twr_txt} · {r['posiciones']} activos",
+                color="green" if pd.isna(r['twr']) or r['twr'] >= 0 else "red",
+            )
+    st.markdown("<div style='height:12px'></div>", unsafe_allow_html=True)
+
+# ── TABLA ─────────────────────────────────────────────────────────
+section_header("Resumen", "Valores en USD")
+tabla = resumen.assign(portfolio_id=resumen['portfolio_id'].map(nombres))
+total_valor = tabla['valor_mercado_usd'].sum()
+tabla['peso'] = tabla['valor_mercado_usd'] / total_valor if total_valor > 0 else 0.0
+st.dataframe(
+    tabla.rename(columns={
+        'portfolio_id': 'Portafolio', 'posiciones': 'Activos', 'valor_mercado_usd': 'Valor',
+        'coste_total_usd': 'Coste', 'ganancia_no_realizada_usd': 'No realizado',
+        'ganancia_realizada_usd': 'Realizado', 'capital_neto_usd': 'Capital neto', 'twr': 'TWR', 'peso': 'Peso',
+    })[['Portafolio', 'Activos', 'Valor', 'Peso', 'Coste', 'No realizado', 'Realizado', 'Capital neto', 'TWR']]
+    .style.format({
+        'Valor': 'US$ {:,.2f}', 'Peso': '{:.1%}', 'Coste': 'US$ {:,.2f}', 'No realizado': 'US$ {:,.2f}',
+        'Realizado': 'US$ {:,.2f}', 'Capital neto': 'US$ {:,.2f}', 'TWR': '{:+.2%}',
+    }, na_rep="-"),
+    use_container_width=True, hide_index=True
+)
+
+st.divider()
+
+# ── EVOLUCIÓN ─────────────────────────────────────────────────────
+if comp['valor'] is not None:
+    periodos = {"3M": 90, "6M": 180, "1A": 365, "3A": 1095, "Total": None}
+    periodo_sel = st.radio("Período", list(periodos), index=4, horizontal=True, label_visibility="collapsed")
+    dias   = periodos[periodo_sel]
+    inicio = comp['valor'].index.min() if dias is None else comp['valor'].index.max() - pd.Timedelta(days=dias)
+
+    e1, e2 = st.columns(2)
+    with e1:
+        section_header("Valor", "USD por rueda")
+        valor = comp['valor'][comp['valor'].index >= inicio]
+        fig_v = go.Figure()
+        for pid in valor.columns:
+            fig_v.add_trace(go.Scatter(
+                x=valor.index, y=valor[pid], name=nombres.get(pid, f"#{pid}"), stackgroup='valor',
+                line=dict(width=1, color=colores.get(pid)),
+                hovertemplate="%{x|%d %b %Y}<br>US$ %{y:,.2f}<extra></extra>",
+            ))
+        fig_v = apply_plotly_style(fig_v)
+        fig_v.update_layout(height=380, yaxis_tickprefix="$", hovermode="x unified")
+        st.plotly_chart(fig_v, use_container_width=True)
+    with e2:
+        section_header("Rendimiento (TWR)", "% desde el inicio del período")
+        idx_pct = rendimiento_desde(comp['indice'], inicio)
+        fig_r = go.Figure()
+        for pid in idx_pct.columns:
+            serie = idx_pct[pid].dropna()
+            if serie.empty: continue
+            fig_r.add_trace(go.Scatter(
+                x=serie.index, y=serie.values, name=nombres.get(pid, f"#{pid}"),
+                line=dict(width=2, color=colores.get(pid)),
+                hovertemplate="%{x|%d %b %Y}<br>%{y:+.2f}%<extra></extra>",
+            ))
+        fig_r = apply_plotly_style(fig_r)
+        fig_r.update_layout(height=380, yaxis_ticksuffix="%", hovermode="x unified")
+        st.plotly_chart(fig_r, use_container_width=True)
+
+st.divider()
+
+# ── COMPOSICIÓN ───────────────────────────────────────────────────
+section_header("Composición", "Peso de cada activo dentro de su portafolio")
+abiertas = comp['abiertas']
+if abiertas.empty:
+    st.info("Sin posiciones abiertas.")
+else:
+    pesos = abiertas.groupby(['portfolio_id', 'ticker'])['valor_mercado_usd'].sum().unstack(fill_value=0)
+    pesos = pesos.div(pesos.sum(axis=1).where(lambda s: s > 0), axis=0).fillna(0)
+    orden = pesos.sum().sort_values(ascending=False).index
+    fig_c = go.Figure()
+    for i, tk in enumerate(orden):
+        fig_c.add_trace(go.Bar(
+            x=pesos[tk] * 100, y=[nombres.get(p, f"#{p}") for p in pesos.index], name=tk, orientation='h',
+            marker=dict(color=PIE_COLORS[i % len(PIE_COLORS)], line=dict(width=0)),
+            hovertemplate=f"<b>{tk}</b><br>%{{x:.1f}}%<extra></extra>",
+        ))
+    fig_c = apply_plotly_style(fig_c)
+    fig_c.update_layout(barmode='stack', height=max(260, len(pesos) * 60), xaxis_ticksuffix="%",
+                        yaxis=dict(gridcolor="rgba(0,0,0,0)"))
+    st.plotly_chart(fig_c, use_container_width=True)